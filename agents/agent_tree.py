@@ -0,0 +1,30 @@
+"""
+Helpers for walking the agent tree
+Reaches sub_agents and agents wrapped in AgentTool
+"""
+
+from typing import Any, Iterator, Set
+
+
+def iter_agents(agent: Any, _seen: Set[int] = None) -> Iterator[Any]:
+    """Yield `agent` and every agent reachable from it, once each"""
+    seen = _seen if _seen is not None else set()
+    if agent is None or id(agent) in seen:
+        return
+    seen.add(id(agent))
+    yield agent
+
+    for sub_agent in getattr(agent, "sub_agents", None) or []:
+        yield from iter_agents(sub_agent, seen)
+    for tool in getattr(agent, "tools", None) or []:
+        # AgentTool keeps the wrapped agent on .agent
+        wrapped = getattr(tool, "agent", None)
+        if wrapped is not None:
+            yield from iter_agents(wrapped, seen)
+
+
+def iter_llm_agents(agent: Any) -> Iterator[Any]:
+    """Yield only the agents that call a model (LlmAgent and subclasses)"""
+    for node in iter_agents(agent):
+        if hasattr(node, "model") and hasattr(node, "instruction"):
+            yield node
@@ -0,0 +1,214 @@
+"""
+Keyword fast path in front of root_agent
+Obvious intents from a logged-in user at the video menu ("menu", "more videos",
+"continue <title>", "new video <title>") call the menu tools directly instead of
+paying a model round-trip just to be routed. Once a video is selected the LLM
+owns the conversation, and anything ambiguous returns None and goes to it.
+"""
+
+import os
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from config import ACTIVE_VIDEO_KEY
+from services.tracing import current_span
+from tools.video_tools import MENU_CURSOR_KEY, create_new_video_tool, list_user_videos_tool, select_video_tool
+
+FAST_PATH_ENABLED = os.getenv("CONTINUITY_FAST_PATH", "1") != "0"
+FAST_PATH_AUTHOR = "root_agent"
+# Any of these set means a video workflow owns the turn ("more", "continue" mean something else there).
+# Only session-scoped keys work here: temp: keys are gone by the next turn.
+WORKFLOW_KEYS = (ACTIVE_VIDEO_KEY,)
+
+_MENU_RE = re.compile(r"^(?:show\s+)?(?:the\s+)?(?:menu|main menu|my videos|(?:show|list)\s+(?:my\s+)?videos)[.!]?$", re.IGNORECASE)
+_MORE_RE = re.compile(r"^(?:more|more videos|next page|show more(?: videos)?)[.!]?$", re.IGNORECASE)
+_CONTINUE_RE = re.compile(r"^(?:continue|resume|work on)\s+(?:video\s+)?[\"']?(.+?)[\"']?[.!]?$", re.IGNORECASE)
+_NEW_VIDEO_RE = re.compile(
+    # A title needs an explicit marker or quotes; "create a video about space" is a request for the LLM
+    r"^(?:new video|create (?:a )?(?:new )?video)"
+    r"(?:(?:\s+(?:called|titled|named)\s+|\s*:\s*)[\"']?(.+?)[\"']?|\s+[\"'](.+?)[\"'])[.!]?$",
+    re.IGNORECASE,
+)
+
+
+class _State:
+    """Session state view that records writes, like ToolContext.state"""
+
+    def __init__(self, base: Dict[str, Any]):
+        self._base = base
+        self.delta: Dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.delta:
+            return self.delta[key]
+        return self._base.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.delta:
+            return self.delta[key]
+        return self._base[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.delta[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key in self.delta:
+            return self.delta[key] is not None
+        return key in self._base
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        # Removal is recorded as None, which is how a state_delta clears a key
+        value = self.get(key, default)
+        if key in self._base:
+            self.delta[key] = None
+        else:
+            self.delta.pop(key, None)
+        return value
+
+
+class FastPathToolContext:
+    """Just enough of ToolContext for the video tools (they only touch .state)"""
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = _State(state)
+
+
+def match_intent(message: str) -> Optional[Tuple[str, str]]:
+    """
+    Classify a message as one of the fast-path intents.
+
+    Returns:
+        ("menu", ""), ("more", ""), ("continue", title_or_id), ("new_video", title) or None
+    """
+    text = " ".join(message.split())
+    if _MENU_RE.match(text):
+        return "menu", ""
+    if _MORE_RE.match(text):
+        return "more", ""
+    found = _NEW_VIDEO_RE.match(text)
+    if found:
+        return "new_video", (found.group(1) or found.group(2)).strip()
+    found = _CONTINUE_RE.match(text)
+    if found:
+        return "continue", found.group(1).strip()
+    return None
+
+
+# === Replies (same shape menu_agent is told to produce) ===
+
+def _format_menu(result: Dict[str, Any]) -> str:
+    videos = result.get("videos") or []
+    if not videos:
+        return "You don't have any videos yet. Let's create one!\nSay \"new video <title>\" to start."
+    lines = ["Your videos:"]
+    for i, video in enumerate(videos, 1):
+        lines.append(f"{i}. {video['title']} ({video['status'].replace('_', ' ')})")
+    if result.get("has_more"):
+        lines.append("(Say \"more videos\" to see more)")
+    lines.append("")
+    lines.append("What would you like to do?")
+    lines.append(" • Continue a video")
+    lines.append(" • Create new video")
+    return "\n".join(lines)
+
+
+async def _run_intent(intent: str, argument: str, context: FastPathToolContext) -> Optional[str]:
+    """Call the tool for `intent`; None means hand the turn to the LLM"""
+    user_id = context.state.get("user:verified_user_id")
+
+    if intent in ("menu", "more"):
+        cursor = ""
+        if intent == "more":
+            cursor = context.state.get(MENU_CURSOR_KEY)
+            if not cursor:
+                return None
+        result = await list_user_videos_tool(tool_context=context, cursor=cursor)
+        if not result.get("success"):
+            return None
+        context.state[MENU_CURSOR_KEY] = result.get("next_cursor") or None
+        return _format_menu(result)
+
+    if intent == "new_video":
+        result = await create_new_video_tool(tool_context=context, title=argument)
+        return result["message"] if result.get("success") else None
+
+    if intent == "continue":
+        from database.async_models import AsyncVideoModel
+
+        # Accept an exact video id or exactly one title match; fuzzier
+        # requests go to menu_agent, which can search and ask
+        video = await AsyncVideoModel.get_for_user(argument, user_id)
+        if video:
+            video_id = video["video_id"]
+        else:
+            matches = await AsyncVideoModel.find_for_user_by_title(user_id, argument)
+            if len(matches) != 1:
+                return None
+            video_id = matches[0]["video_id"]
+        result = await select_video_tool(tool_context=context, video_id=video_id)
+        return result["message"] if result.get("success") else None
+
+    return None
+
+
+async def try_fast_path(session_service: Any, app_name: str, session_id: str, message: str) -> Optional[str]:
+    """
+    Handle `message` without the model if it is an obvious intent.
+
+    The user message and the reply are appended to the session (with the
+    tools' state changes as state_delta) so history looks like a normal turn.
+
+    Returns:
+        reply text, or None to fall through to runner.run_async
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+    intent = match_intent(message)
+    if intent is None:
+        return None
+
+    session = await session_service.get_session(app_name=app_name, user_id=session_id, session_id=session_id)
+    if session is None or not session.state.get("user:email") or not session.state.get("user:verified_user_id"):
+        return None
+    if any(session.state.get(key) for key in WORKFLOW_KEYS):
+        return None
+
+    context = FastPathToolContext(session.state)
+    reply = await _run_intent(intent[0], intent[1], context)
+    if reply is None:
+        return None
+    span = current_span.get()
+    if span is not None:
+        span.attrs["fast_path_intent"] = intent[0]
+
+    await record_turn(session_service, session, message, reply, context.state.delta)
+    return reply
+
+
+async def record_turn(
+    session_service: Any, session: Any, message: str, reply: str,
+    state_delta: Dict[str, Any], author: str = FAST_PATH_AUTHOR,
+) -> None:
+    """Append a handled user message and its reply to the session, as the runner would"""
+    invocation_id = f"e-{uuid.uuid4()}"
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author="user",
+        content=types.Content(role="user", parts=[types.Part(text=message)]),
+        timestamp=time.time(),
+    ))
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author=author,
+        content=types.Content(role="model", parts=[types.Part(text=reply)]),
+        actions=EventActions(state_delta=dict(state_delta)),
+        timestamp=time.time(),
+    ))
+
+
+__all__ = ["FAST_PATH_ENABLED", "MENU_CURSOR_KEY", "FastPathToolContext", "match_intent", "record_turn", "try_fast_path"]
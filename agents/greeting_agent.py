@@ -40,7 +40,8 @@ def request_verification_tool(tool_context: ToolContext, email: str) -> Dict[str
         
         existing_user = UserModel.find_by_email(email)
         token = VerificationTokenModel.create_token(email)
-        success = AuthService.send_magic_link(email, token)
+        # Queued for the background sender - the turn doesn't wait on SMTP
+        success = AuthService.queue_magic_link(email, token)
         
         if success:
             # Store email in state for later
@@ -1,7 +1,7 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools import ToolContext
 from typing import Dict, Any, List
-from tools.video_tools import list_user_videos_tool, select_video_tool, create_new_video_tool
+from tools.video_tools import list_user_videos_tool, search_user_videos_tool, select_video_tool, create_new_video_tool
 
 menu_agent = LlmAgent(
     name="menu_agent",
@@ -16,6 +16,8 @@ menu_agent = LlmAgent(
     
     STEP 1: Get Videos
     → Use list_user_videos_tool
+    → If has_more is true, mention there are more videos; when the user asks
+      for more, call list_user_videos_tool again with cursor=next_cursor
     
     STEP 2: Format Display
 
@@ -32,7 +34,8 @@ menu_agent = LlmAgent(
     
     Step 4: Handle user choice
     → Get user choice 
-    → if user selects continue working on [video title], use select_video_tool tool to update state with user choice
+    → if user selects continue working on [video title], use search_user_videos_tool with the title they said
+      to get its video_id (ask which one if several match equally), then use select_video_tool tool to update state with user choice
     → if user selects create a new video, use create_new_video_tool tool to create new video on db
     → Escalate back to root_agent with choice
    
@@ -55,6 +58,7 @@ menu_agent = LlmAgent(
     """,
     tools=[
         list_user_videos_tool,
+        search_user_videos_tool,
         select_video_tool,
         create_new_video_tool
     ]
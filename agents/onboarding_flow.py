@@ -0,0 +1,192 @@
+"""
+Deterministic onboarding (name -> email -> token)
+Runs the greeting_agent tools straight from a small state machine kept in
+session state, so signing up costs no model calls. Input the machine cannot
+parse hands the rest of onboarding to the LLM greeting flow.
+
+Enable with CONTINUITY_ONBOARDING_FLOW=1.
+"""
+
+import os
+import re
+import time
+import uuid
+from typing import Any, Optional
+
+from google.adk.events import Event, EventActions
+
+from agents.fast_path import FastPathToolContext, record_turn
+from agents.greeting_agent import request_verification_tool, save_user_name_tool, verify_token_tool
+from database.async_models import run_in_db_executor
+from services.tracing import current_span
+from tools.auth_tools import check_and_restore_user_tool
+
+ONBOARDING_FLOW_ENABLED = os.getenv("CONTINUITY_ONBOARDING_FLOW", "0") == "1"
+ONBOARDING_AUTHOR = "greeting_agent"
+
+# Session-scoped keys (temp: keys do not survive between turns)
+STEP_KEY = "onboarding_step"
+NAME_KEY = "onboarding_name"
+EMAIL_KEY = "onboarding_email"
+
+# Steps - no step yet means the visitor has not said anything we acted on
+STEP_NAME = "name"
+STEP_EMAIL = "email"
+STEP_TOKEN = "token"
+STEP_LLM = "llm"            # Handed off to greeting_agent for the rest of onboarding
+
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+_TOKEN_RE = re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")
+_GREETING_RE = re.compile(r"^(?:hi|hello|hey|hiya|yo|start|get started|sign ?up|register)\b[\s!.,]*(?:there)?[\s!.]*$", re.IGNORECASE)
+_NAME_INTRO_RE = re.compile(r"^(?:(?:hi|hello|hey)[,!]?\s+)?(?:my name is|my name's|i am|i'm|im|call me|it's|this is)\s+(.+)$", re.IGNORECASE)
+_BARE_NAME_RE = re.compile(r"^[A-Za-zÀ-ÖØ-öø-ÿ][A-Za-zÀ-ÖØ-öø-ÿ'\-]*(?:\s+[A-Za-zÀ-ÖØ-öø-ÿ][A-Za-zÀ-ÖØ-öø-ÿ'\-]*){0,3}$")
+_RESEND_RE = re.compile(r"\b(?:resend|send (?:it |the code )?again|new code)\b", re.IGNORECASE)
+
+
+def parse_name(message: str, allow_bare: bool) -> Optional[str]:
+    """A name from "my name is X"/"I'm X", or a bare 1-4 word name if allowed"""
+    text = message.strip().rstrip(".!")
+    found = _NAME_INTRO_RE.match(text)
+    if found:
+        text = found.group(1).strip().rstrip(".!")
+    elif not allow_bare:
+        return None
+    return text if _BARE_NAME_RE.match(text) else None
+
+
+async def _call_tool(tool: Any, *args: Any) -> Any:
+    """Run a blocking greeting tool off the event loop"""
+    return await run_in_db_executor(tool, *args)
+
+
+# === Steps (None = free-form, hand the turn to the LLM) ===
+
+async def _start(message: str, context: FastPathToolContext) -> Optional[str]:
+    email = _EMAIL_RE.search(message)
+    if email:
+        result = await check_and_restore_user_tool(context, email.group(0))
+        if result["status"] == "existing_user":
+            context.state[STEP_KEY] = None
+            return f"{result['message']} Say \"menu\" to see your videos."
+        if result["status"] == "new_user":
+            context.state[EMAIL_KEY] = result["email"]
+            context.state[STEP_KEY] = STEP_NAME
+            return f"{result['message']} What's your name?"
+        return result["message"]
+
+    name = parse_name(message, allow_bare=False)
+    if name:
+        return await _save_name(name, context)
+
+    if _GREETING_RE.match(message):
+        context.state[STEP_KEY] = STEP_NAME
+        return "Hi! To get started, what's your name?"
+    return None
+
+
+async def _save_name(name: str, context: FastPathToolContext) -> str:
+    await _call_tool(save_user_name_tool, context, name)
+    context.state[NAME_KEY] = name.strip()
+
+    # Email already known from the login attempt - send the code straight away
+    email = context.state.get(EMAIL_KEY)
+    if email:
+        return await _send_code(email, context, greeting=f"Nice to meet you, {name.strip()}! ")
+
+    context.state[STEP_KEY] = STEP_EMAIL
+    return (
+        f"Nice to meet you, {name.strip()}! To save your videos and keep your progress, "
+        "may I have your email? For example: user@example.com"
+    )
+
+
+async def _send_code(email: str, context: FastPathToolContext, greeting: str = "") -> str:
+    result = await _call_tool(request_verification_tool, context, email)
+    if not result.get("success"):
+        context.state[STEP_KEY] = STEP_EMAIL
+        return f"{result.get('message', 'Something went wrong.')} Please try again."
+
+    context.state[EMAIL_KEY] = email
+    context.state[STEP_KEY] = STEP_TOKEN
+    return f"{greeting}I've sent a code to your email. Please check your inbox and enter the code here."
+
+
+async def _verify(token: str, context: FastPathToolContext) -> str:
+    # verify_token_tool reads the name from temp state, which did not survive the turn
+    name = context.state.get(NAME_KEY)
+    if name:
+        context.state["temp:pending_user_name"] = name
+
+    result = await _call_tool(verify_token_tool, context, token)
+    if not result.get("success"):
+        if result.get("error") == "invalid_token":
+            return "That code doesn't match. Please try again."
+        return f"{result.get('message', 'Something went wrong.')} Please try again."
+
+    for key in (STEP_KEY, NAME_KEY, EMAIL_KEY):
+        context.state[key] = None
+    return f"Email verified! Welcome to Continuity, {context.state.get('user:name') or 'there'}!"
+
+
+async def _advance(step: Optional[str], message: str, context: FastPathToolContext) -> Optional[str]:
+    if not step:
+        return await _start(message, context)
+
+    if step == STEP_NAME:
+        name = parse_name(message, allow_bare=True)
+        return await _save_name(name, context) if name else None
+
+    if step == STEP_EMAIL:
+        email = _EMAIL_RE.search(message)
+        return await _send_code(email.group(0), context) if email else None
+
+    if step == STEP_TOKEN:
+        token = _TOKEN_RE.search(message)
+        if token:
+            return await _verify(token.group(0), context)
+        if _RESEND_RE.search(message) and context.state.get(EMAIL_KEY):
+            return await _send_code(context.state.get(EMAIL_KEY), context)
+        return None
+
+    return None
+
+
+async def try_onboarding(session_service: Any, app_name: str, session_id: str, message: str) -> Optional[str]:
+    """
+    Handle a signup/login message for a visitor who is not logged in yet.
+
+    Returns:
+        reply text, or None to run the turn through root_agent
+    """
+    if not ONBOARDING_FLOW_ENABLED:
+        return None
+
+    session = await session_service.get_session(app_name=app_name, user_id=session_id, session_id=session_id)
+    if session is None or session.state.get("user:email"):
+        return None
+    step = session.state.get(STEP_KEY)
+    if step == STEP_LLM:
+        return None
+
+    context = FastPathToolContext(session.state)
+    reply = await _advance(step, " ".join(message.split()), context)
+
+    if reply is None:
+        if step:
+            # Mid-flow and we could not parse it - let greeting_agent finish onboarding
+            await session_service.append_event(session, Event(
+                invocation_id=f"e-{uuid.uuid4()}",
+                author=ONBOARDING_AUTHOR,
+                actions=EventActions(state_delta={STEP_KEY: STEP_LLM}),
+                timestamp=time.time(),
+            ))
+        return None
+
+    span = current_span.get()
+    if span is not None:
+        span.attrs["onboarding_step"] = f"{step or 'start'} -> {context.state.get(STEP_KEY) or 'done'}"
+    await record_turn(session_service, session, message, reply, context.state.delta, author=ONBOARDING_AUTHOR)
+    return reply
+
+
+__all__ = ["ONBOARDING_FLOW_ENABLED", "STEP_KEY", "parse_name", "try_onboarding"]
@@ -1,6 +1,7 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools import AgentTool
 from tools.auth_tools import check_and_restore_user_tool
+from tools.video_tools import leave_video_tool
 from agents.greeting_agent import greeting_agent
 from agents.menu_agent import menu_agent
 
@@ -15,6 +16,9 @@ root_agent = LlmAgent(
     - User email: {user:email?}
     - User name: {user:name?}
     
+    Earlier conversation (summarized, may be empty):
+    {history_summary?}
+    
     === ROUTING LOGIC ===
     
     1. Check authentication:
@@ -31,6 +35,7 @@ root_agent = LlmAgent(
        - User says "menu", "my videos", "show videos" → delegate to menu_agent
        - User says "continue [video]", "work on [video]" → delegate to video_workflow_agent
        - User says "new video", "create video" → delegate to video_workflow_agent
+       - User says "back to menu", "done with this video" → use leave_video_tool, then delegate to menu_agent
        - User says "limits", "usage", "costs" → use show_limits_tool
        - User says "about Continuity" → use about_continuity_tool
     
@@ -49,6 +54,7 @@ root_agent = LlmAgent(
     """,
     tools=[
         check_and_restore_user_tool,
+        leave_video_tool,
         AgentTool(greeting_agent),
         AgentTool(menu_agent),
         # AgentTool(video_workflow_agent),
@@ -0,0 +1,252 @@
+"""
+Synthetic Continuity dataset
+Fills a database with users, videos, scenes, image attempts, checkpoints and
+verification tokens in realistic proportions, deterministically from --seed:
+
+- videos: 70% in progress, 25% completed, 5% archived
+- in-progress videos have an approved image up to a random scene, a pending
+  attempt on the next one and nothing after; finished videos are fully approved
+- ~30% of approved scenes needed a second attempt (~10% a third), the
+  earlier attempts rejected
+- 60% of in-progress videos have a checkpoint
+- tokens: a third live, a third expired, a third consumed
+
+    python -m benchmarks.datagen --scale large --out bench.db
+
+Rows go in through plain SQL in large transactions; the schema's triggers
+keep the video counters and full-text indexes up to date as they would in
+production.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from database.migrations import run_migrations
+
+# (users, videos per user, scenes per video) - large is 10k users, ~100k videos, ~2M scenes
+SCALES = {
+    "small": (200, 10, 20),
+    "medium": (2_000, 10, 20),
+    "large": (10_000, 10, 20),
+}
+
+IMAGE_COST = 0.04
+_SUBJECTS = ["robot", "astronaut", "fox", "lighthouse keeper", "dragon", "detective", "chef", "pilot", "whale", "gardener"]
+_PLACES = ["harbour", "desert", "space station", "forest", "night market", "glacier", "rooftop", "library", "canyon", "reef"]
+_SHOTS = ["wide shot", "close-up", "tracking shot", "aerial view", "low angle", "over-the-shoulder shot"]
+_MOODS = ["at dusk", "in heavy rain", "under neon light", "at sunrise", "in thick fog", "at golden hour"]
+
+
+class _Writer:
+    """Buffers rows and writes them in one transaction per batch"""
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.videos: List[tuple] = []
+        self.scenes: List[tuple] = []
+        self.images: List[tuple] = []
+        self.checkpoints: List[tuple] = []
+
+    def pending(self) -> int:
+        return len(self.scenes) + len(self.images)
+
+    def flush(self) -> None:
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO videos (video_id, user_id, title, script, status, total_cost, images_generated_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                self.videos
+            )
+            self.conn.executemany(
+                "INSERT INTO scenes (scene_id, video_id, scene_number, visual_description, voiceover) VALUES (?, ?, ?, ?, ?)",
+                self.scenes
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO images (
+                    image_id, scene_id, image_path, is_character_reference, status,
+                    attempt_number, rejected_reason, generation_cost
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                self.images
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO checkpoints (video_id, next_scene, current_batch, character_reference_path, session_cost, last_updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                self.checkpoints
+            )
+        self.videos, self.scenes, self.images, self.checkpoints = [], [], [], []
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _description(rng: random.Random, n: int) -> str:
+    return (
+        f"Scene {n}: {rng.choice(_SHOTS)} of the {rng.choice(_SUBJECTS)} in the "
+        f"{rng.choice(_PLACES)} {rng.choice(_MOODS)}, cinematic lighting, consistent character design"
+    )
+
+
+def generate(
+    db_path: str,
+    users: int,
+    videos_per_user: int,
+    scenes_per_video: int,
+    seed: int = 7,
+    batch_size: int = 50_000,
+) -> Dict[str, Any]:
+    """
+    Fill a new database with synthetic data.
+
+    Video and scene counts per owner vary between half and one and a half
+    times the given means.
+
+    Returns:
+        Row counts and generation time
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")               # Throwaway data - durability does not matter here
+    run_migrations(conn)
+
+    now = datetime.utcnow()
+    user_rows = []
+    for i in range(users):
+        email = f"user{i}@bench.example"
+        user_rows.append((hashlib.sha256(email.encode()).hexdigest()[:12], email, f"User {i}"))
+    with conn:
+        conn.executemany("INSERT INTO users (user_id, email, user_name) VALUES (?, ?, ?)", user_rows)
+
+    writer = _Writer(conn, batch_size)
+    timestamps = []                                      # (created_at, updated_at, video_id)
+    user_costs = []
+    counts = {"videos": 0, "scenes": 0, "images": 0, "checkpoints": 0}
+
+    for user_id, _, _ in user_rows:
+        spent = 0.0
+        for v in range(rng.randint(max(1, videos_per_user // 2), max(1, videos_per_user * 3 // 2))):
+            video_id = _uuid(rng)
+            roll = rng.random()
+            status = "in_progress" if roll < 0.70 else "completed" if roll < 0.95 else "archived"
+            scene_total = rng.randint(max(1, scenes_per_video // 2), max(1, scenes_per_video * 3 // 2))
+            approved_until = scene_total if status != "in_progress" else rng.randint(0, scene_total)
+            subject = rng.choice(_SUBJECTS)
+            title = f"The {subject} of the {rng.choice(_PLACES)} {v}"
+
+            images_made = 0
+            for n in range(1, scene_total + 1):
+                scene_id = _uuid(rng)
+                writer.scenes.append((scene_id, video_id, n, _description(rng, n), f"Narration for scene {n}."))
+                if n <= approved_until:
+                    attempts = 1 + (rng.random() < 0.3) + (rng.random() < 0.1)
+                    final = "approved"
+                elif n == approved_until + 1:
+                    attempts = 1 + (rng.random() < 0.3)
+                    final = "pending"
+                else:
+                    attempts = 0
+                    final = None
+                for attempt in range(1, attempts + 1):
+                    last = attempt == attempts
+                    writer.images.append((
+                        _uuid(rng), scene_id, f"data/{video_id}/scene_{n}_{attempt}.png", int(n == 1 and last),
+                        final if last else "rejected", attempt, None if last else "Character looks different",
+                        IMAGE_COST,
+                    ))
+                images_made += attempts
+
+            cost = images_made * IMAGE_COST
+            spent += cost
+            writer.videos.append((
+                video_id, user_id, title,
+                f"A short film about a {subject}." if approved_until else None,
+                status, cost, images_made,
+            ))
+            if status == "in_progress" and rng.random() < 0.6:
+                counts["checkpoints"] += 1
+                writer.checkpoints.append((
+                    video_id, approved_until + 1, approved_until // 4,
+                    f"data/{video_id}/scene_1_1.png" if approved_until else None,
+                    round(cost * rng.random(), 2), None,
+                ))
+
+            created = now - timedelta(days=rng.uniform(1, 365))
+            updated = created + (now - created) * rng.random()
+            timestamps.append((created.strftime("%Y-%m-%d %H:%M:%S"), updated.strftime("%Y-%m-%d %H:%M:%S"), video_id))
+            counts["videos"] += 1
+            counts["scenes"] += scene_total
+            counts["images"] += images_made
+
+            if writer.pending() >= writer.batch_size:
+                writer.flush()
+        user_costs.append((spent, user_id))
+    writer.flush()
+
+    epoch = int(time.time())
+    tokens = []
+    for i in range(max(1, users // 2)):
+        kind = i % 3
+        expires_at = epoch + 3600 if kind == 0 else epoch - rng.randint(1, 86_400)
+        tokens.append((_uuid(rng), user_rows[i % users][1], expires_at, int(kind == 2)))
+
+    with conn:
+        # Spread activity over the last year (updated_at alone does not fire the touch trigger)
+        conn.executemany("UPDATE videos SET created_at = ?, updated_at = ? WHERE video_id = ?", timestamps)
+        conn.executemany("UPDATE users SET current_month_cost = current_month_cost + ? WHERE user_id = ?", user_costs)
+        conn.executemany("INSERT INTO verification_tokens (token, email, expires_at, used) VALUES (?, ?, ?, ?)", tokens)
+        # Checkpoints are written after the work they describe, or resume would distrust them
+        conn.execute(
+            "UPDATE checkpoints SET last_updated_at = ?",
+            ((datetime.utcnow() + timedelta(seconds=1)).isoformat(),)
+        )
+    conn.close()
+
+    counts.update({"users": users, "tokens": len(tokens), "seconds": time.perf_counter() - started})
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Continuity database")
+    parser.add_argument("--out", required=True, help="database file to create (must not exist)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, default=None, help="override the scale's user count")
+    parser.add_argument("--videos-per-user", type=int, default=None)
+    parser.add_argument("--scenes-per-video", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.out):
+        parser.error(f"{args.out} already exists")
+    users, videos, scenes = SCALES[args.scale]
+    directory = os.path.dirname(os.path.abspath(args.out))
+    os.makedirs(directory, exist_ok=True)
+    counts = generate(
+        args.out,
+        args.users or users,
+        args.videos_per_user or videos,
+        args.scenes_per_video or scenes,
+        seed=args.seed,
+    )
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
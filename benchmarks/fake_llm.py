@@ -0,0 +1,128 @@
+"""
+Deterministic stand-in for Gemini
+A scripted BaseLlm that returns canned text and function calls, so the agents
+run end to end offline and latency measurements only see our own overhead.
+"""
+
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Union
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+from pydantic import Field
+
+from agents.agent_tree import iter_llm_agents
+
+# ADK prepends this identity line to every agent's system instruction
+_AGENT_NAME_RE = re.compile(r'Your internal name is "([^"]+)"')
+
+
+@dataclass
+class FakeReply:
+    """Either plain text or a single function call"""
+    text: Optional[str] = None
+    function_call: Optional[str] = None
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Rule:
+    """Reply for `agent` when the latest user text matches `pattern`"""
+    agent: str
+    pattern: str
+    reply: Union[FakeReply, Callable[[re.Match], FakeReply]]
+
+    def match(self, agent: str, text: str) -> Optional[FakeReply]:
+        if agent != self.agent:
+            return None
+        found = re.search(self.pattern, text, re.IGNORECASE)
+        if not found:
+            return None
+        return self.reply(found) if callable(self.reply) else self.reply
+
+
+# Rules for the login -> menu -> select video flow driven by benchmarks/load_driver.py
+DEFAULT_RULES: List[Rule] = [
+    Rule("root_agent", r"my email is (\S+@\S+)",
+         lambda m: FakeReply(function_call="check_and_restore_user_tool", args={"email": m.group(1)})),
+    Rule("root_agent", r"\b(menu|my videos|show videos)\b",
+         lambda m: FakeReply(function_call="menu_agent", args={"request": m.group(0)})),
+    Rule("root_agent", r"\bcontinue\b.*",
+         lambda m: FakeReply(function_call="menu_agent", args={"request": m.group(0)})),
+    Rule("menu_agent", r"\bcontinue (\S+)",
+         lambda m: FakeReply(function_call="select_video_tool", args={"video_id": m.group(1)})),
+    Rule("menu_agent", r"\b(menu|my videos|show videos)\b",
+         FakeReply(function_call="list_user_videos_tool")),
+]
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    BaseLlm whose responses come from `rules` instead of a model.
+
+    - Last content is a function response -> short text echoing the result
+      (ends the tool loop like a real model would).
+    - Otherwise the first rule matching (agent name, latest user text) wins.
+    - No match -> `default_text`.
+    """
+
+    model: str = "scripted-fake"
+    rules: List[Any] = Field(default_factory=lambda: list(DEFAULT_RULES))
+    default_text: str = "OK."
+    latency_ms: float = 0.0                     # Simulated model time per call
+    calls: int = 0
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"scripted-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        reply = self._reply_for(llm_request)
+        if reply.function_call:
+            part = types.Part(function_call=types.FunctionCall(name=reply.function_call, args=reply.args))
+        else:
+            part = types.Part(text=reply.text)
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+    def _reply_for(self, llm_request: LlmRequest) -> FakeReply:
+        agent = _agent_name(llm_request)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        parts = (last.parts or []) if last else []
+
+        responses = [p.function_response for p in parts if p.function_response]
+        if responses:
+            result = json.dumps(responses[-1].response, default=str)
+            return FakeReply(text=f"{responses[-1].name}: {result[:200]}")
+
+        text = " ".join(p.text for p in parts if p.text)
+        for rule in self.rules:
+            reply = rule.match(agent, text)
+            if reply is not None:
+                return reply
+        return FakeReply(text=self.default_text)
+
+
+def _agent_name(llm_request: LlmRequest) -> str:
+    instruction = getattr(llm_request.config, "system_instruction", None) or ""
+    if not isinstance(instruction, str):
+        instruction = " ".join(getattr(p, "text", "") or "" for p in getattr(instruction, "parts", []) or [])
+    found = _AGENT_NAME_RE.search(instruction)
+    return found.group(1) if found else ""
+
+
+def install_fake_model(root_agent: Any, fake: BaseLlm) -> int:
+    """Point every LlmAgent reachable from `root_agent` at `fake`. Returns agents patched."""
+    patched = 0
+    for agent in iter_llm_agents(root_agent):
+        agent.model = fake
+        patched += 1
+    return patched
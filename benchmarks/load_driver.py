@@ -0,0 +1,240 @@
+"""
+Offline turn-latency load test
+Replays login -> menu -> select video -> resume across N concurrent sessions
+against the real agents and tools, with ScriptedLlm in place of Gemini, and
+reports p50/p95/p99 turn latency plus tool and DB time.
+
+    python -m benchmarks.load_driver --sessions 50 --rounds 3 --out results.json
+
+Everything runs against throwaway databases in a temp directory.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# (kind, template) - "say" sends a user message, "resume" rebuilds the video session
+DEFAULT_SCRIPT: List[Tuple[str, str]] = [
+    ("say", "Hi, my email is {email}"),
+    ("say", "menu"),
+    ("say", "continue {video_id}"),
+    ("resume", ""),
+]
+
+# Function-tool time of the turn running in the current task
+_turn_tool_ms: ContextVar[Optional[List[float]]] = ContextVar("turn_tool_ms", default=None)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no samples)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": max(values) if values else 0.0,
+    }
+
+
+class ToolTimer:
+    """Times function-tool calls through the agents' before/after tool callbacks"""
+
+    def __init__(self):
+        self._started: Dict[str, float] = {}
+
+    def install(self, root_agent: Any) -> None:
+        from agents.agent_tree import iter_llm_agents
+        for agent in iter_llm_agents(root_agent):
+            agent.before_tool_callback = self.before_tool
+            agent.after_tool_callback = self.after_tool
+
+    def before_tool(self, tool, args, tool_context):
+        # AgentTool time is the nested agent's whole turn - only count real tools
+        if getattr(tool, "agent", None) is None:
+            self._started[tool_context.function_call_id] = time.perf_counter()
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        started = self._started.pop(tool_context.function_call_id, None)
+        accumulator = _turn_tool_ms.get()
+        if started is not None and accumulator is not None:
+            accumulator[0] += (time.perf_counter() - started) * 1000
+        return None
+
+
+def seed_data(users: int, videos_per_user: int, scenes_per_video: int) -> List[Dict[str, Any]]:
+    """Create users with videos, scenes and a mix of approved images"""
+    from database.models import ImageModel, SceneModel, UserModel, VideoModel
+
+    accounts = []
+    for i in range(users):
+        email = f"loadtest{i}@example.com"
+        user = UserModel.find_by_email(email) or UserModel.create(email, user_name=f"Load {i}")
+        video_ids = []
+        for v in range(videos_per_user):
+            video = VideoModel.create(user["user_id"], f"Load video {i}-{v}")
+            video_ids.append(video["video_id"])
+            approved_until = (v * 7) % (scenes_per_video + 1)
+            scenes = SceneModel.bulk_create(video["video_id"], [
+                {"scene_number": n, "visual_description": f"Scene {n} of video {v}: " + "detail " * 30}
+                for n in range(1, scenes_per_video + 1)
+            ])
+            ImageModel.bulk_create(video["video_id"], [
+                {
+                    "scene_id": scene["scene_id"],
+                    "image_path": f"data/{scene['scene_id']}.png",
+                    "status": "approved" if scene["scene_number"] <= approved_until else "pending",
+                }
+                for scene in scenes
+            ])
+        accounts.append({"user_id": user["user_id"], "email": email, "video_ids": video_ids})
+    return accounts
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import DatabaseSessionService, InMemorySessionService
+    from google.genai import types
+
+    from agents.fast_path import try_fast_path
+    from agents.root_agent import root_agent
+    from benchmarks.fake_llm import ScriptedLlm, install_fake_model
+    from config import InMemoryContextStore, set_context_store, use_context_key
+    from database.connection import db_connection
+    from database.session_helpers import get_or_create_adk_session_for_video
+
+    set_context_store(InMemoryContextStore())
+    accounts = seed_data(args.sessions, args.videos, args.scenes)
+
+    fake = ScriptedLlm(latency_ms=args.model_latency_ms)
+    install_fake_model(root_agent, fake)
+    tool_timer = ToolTimer()
+    tool_timer.install(root_agent)
+
+    if args.in_memory_sessions:
+        session_service = InMemorySessionService()
+    else:
+        session_service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{args.adk_db}")
+    runner = Runner(app_name="continuity", agent=root_agent, session_service=session_service)
+
+    latencies: Dict[str, List[float]] = {}
+    turn_ms: List[float] = []
+    tool_ms: List[float] = []
+    errors: List[str] = []
+
+    async def virtual_user(index: int, account: Dict[str, Any]) -> None:
+        session_id = f"load_{index}"
+        await session_service.create_session(
+            app_name="continuity", user_id=session_id, session_id=session_id, state={}
+        )
+        with use_context_key(session_id):
+            for round_number in range(args.rounds):
+                video_id = account["video_ids"][round_number % len(account["video_ids"])]
+                for kind, template in DEFAULT_SCRIPT:
+                    accumulator = [0.0]
+                    token = _turn_tool_ms.set(accumulator)
+                    started = time.perf_counter()
+                    try:
+                        if kind == "resume":
+                            await get_or_create_adk_session_for_video(
+                                session_service, video_id, account["user_id"]
+                            )
+                        else:
+                            text = template.format(email=account["email"], video_id=video_id)
+                            reply = None
+                            if args.fast_path:
+                                reply = await try_fast_path(session_service, "continuity", session_id, text)
+                            if reply is None:
+                                message = types.Content(role="user", parts=[types.Part(text=text)])
+                                async for _ in runner.run_async(
+                                    user_id=session_id, session_id=session_id, new_message=message
+                                ):
+                                    pass
+                    except Exception as e:
+                        errors.append(f"{kind} {template!r}: {e}")
+                    finally:
+                        _turn_tool_ms.reset(token)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    step = template.split(" ")[0] if kind == "say" else kind
+                    latencies.setdefault(step, []).append(elapsed)
+                    turn_ms.append(elapsed)
+                    tool_ms.append(accumulator[0])
+
+    pool_before = db_connection.pool_stats()
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(i, a) for i, a in enumerate(accounts)))
+    wall_s = time.perf_counter() - started
+    pool_after = db_connection.pool_stats()
+
+    db_total_ms = pool_after["total_hold_ms"] - pool_before["total_hold_ms"]
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "rounds": args.rounds,
+            "videos_per_user": args.videos,
+            "scenes_per_video": args.scenes,
+            "model_latency_ms": args.model_latency_ms,
+            "session_service": "memory" if args.in_memory_sessions else "database",
+            "fast_path": args.fast_path,
+        },
+        "wall_time_s": wall_s,
+        "turns_per_s": len(turn_ms) / wall_s if wall_s else 0.0,
+        "turn_latency": summarize(turn_ms),
+        "per_step": {step: summarize(values) for step, values in latencies.items()},
+        "tool_time_per_turn": summarize(tool_ms),
+        "db_time": {
+            "total_ms": db_total_ms,
+            "mean_per_turn_ms": db_total_ms / len(turn_ms) if turn_ms else 0.0,
+            "checkouts": pool_after["checkouts"] - pool_before["checkouts"],
+            "checkout_waits": pool_after["waits"] - pool_before["waits"],
+            "checkout_wait_ms": pool_after["total_wait_ms"] - pool_before["total_wait_ms"],
+        },
+        "model_calls": fake.calls,
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline Continuity turn-latency load test")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--rounds", type=int, default=3, help="script repetitions per user")
+    parser.add_argument("--videos", type=int, default=5, help="videos per user")
+    parser.add_argument("--scenes", type=int, default=24, help="scenes per video")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="simulated model time per call")
+    parser.add_argument("--in-memory-sessions", action="store_true", help="use InMemorySessionService")
+    parser.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+                        help="send every turn to the model (measure the LLM routing path)")
+    parser.add_argument("--workdir", default=None, help="where to put the throwaway databases")
+    parser.add_argument("--out", default=None, help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="continuity-load-")
+    args.adk_db = os.path.join(workdir, "adk_sessions.db")
+    # Must be set before anything imports database.connection
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "continuity.db")
+
+    report = asyncio.run(run_load(args))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Persistence-layer benchmark suite
+Times the hot data paths against a synthetic database (benchmarks/datagen.py)
+and writes a JSON report that can be diffed against an earlier run.
+
+    python -m benchmarks.persistence_suite --scale medium --out after.json --baseline before.json
+    python -m benchmarks.persistence_suite --db bench.db --iterations 500
+
+Cases: user lookup by email (cold and cached), list_user_videos_tool,
+build_state_from_db, get_approved_images_for_video, save_checkpoint and
+VerificationTokenModel.verify_token. Keys are drawn with a fixed seed, so
+two runs on the same dataset time the same calls. The checkpoint and token
+cases write to the database, so compare runs on fresh copies of one dataset.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.datagen import SCALES, generate
+from benchmarks.load_driver import summarize
+
+
+def _sample(db_path: str, sql: str, count: int, rng: random.Random) -> List[Any]:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    if not rows:
+        return []
+    return [rows[rng.randrange(len(rows))] for _ in range(count)]
+
+
+def time_case(call: Callable[[Any], Any], keys: List[Any], before: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Call once per key (untimed `before` first), returning latency stats and ops/s"""
+    timings = []
+    for key in keys:
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        call(key)
+        timings.append((time.perf_counter() - started) * 1000)
+    result = summarize(timings)
+    total_s = sum(timings) / 1000
+    result["ops_per_s"] = len(timings) / total_s if total_s else 0.0
+    return result
+
+
+def run_suite(db_path: str, iterations: int, seed: int) -> Dict[str, Any]:
+    from database.models import VerificationTokenModel, UserModel, user_cache
+    from database.session_helpers import build_state_from_db, get_approved_images_for_video, save_checkpoint
+
+    rng = random.Random(seed)
+    emails = [r[0] for r in _sample(db_path, "SELECT email FROM users", iterations, rng)]
+    owners = [r[0] for r in _sample(db_path, "SELECT user_id FROM users", iterations, rng)]
+    videos = _sample(db_path, "SELECT video_id, user_id, scene_count FROM videos", iterations, rng)
+    in_progress = _sample(
+        db_path, "SELECT video_id, scene_count FROM videos WHERE status = 'in_progress'", iterations, rng
+    )
+    cases: Dict[str, Any] = {}
+
+    # Warm the page cache the way a running server would be
+    for email in emails[:20]:
+        UserModel.find_by_email(email)
+
+    cases["user_find_by_email"] = time_case(UserModel.find_by_email, emails, before=user_cache.clear)
+    cases["user_find_by_email_cached"] = time_case(UserModel.find_by_email, [emails[0]] * iterations)
+
+    try:
+        from tools.video_tools import list_user_videos_tool
+    except ImportError as e:
+        cases["list_user_videos_tool"] = {"skipped": f"needs google-adk ({e})"}
+    else:
+        def list_videos(user_id: str) -> Any:
+            context = SimpleNamespace(state={"user:verified_user_id": user_id})
+            return asyncio.run(list_user_videos_tool(context))
+        cases["list_user_videos_tool"] = time_case(list_videos, owners)
+
+    cases["build_state_from_db"] = time_case(lambda v: build_state_from_db(v[0], v[1]), videos)
+    cases["get_approved_images_for_video"] = time_case(lambda v: get_approved_images_for_video(v[0]), videos)
+
+    def checkpoint(video: Any) -> None:
+        video_id, scene_count = video
+        save_checkpoint(video_id, {
+            "next_scene": rng.randint(1, max(1, scene_count)),
+            "current_batch": 1,
+            "session_cost": 0.12,
+            "last_updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+    cases["save_checkpoint"] = time_case(checkpoint, in_progress)
+
+    tokens = [VerificationTokenModel.create_token(email) for email in emails]
+    cases["verify_token"] = time_case(VerificationTokenModel.verify_token, tokens)
+    cases["verify_token_invalid"] = time_case(VerificationTokenModel.verify_token, tokens)
+    return cases
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """after/before ratios per case (below 1.0 is faster)"""
+    deltas = {}
+    for name, after in report["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before or "p50_ms" not in before or "p50_ms" not in after:
+            continue
+        deltas[name] = {
+            metric: after[metric] / before[metric] if before[metric] else None
+            for metric in ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return deltas
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Continuity persistence layer")
+    parser.add_argument("--db", default=None, help="existing database from benchmarks.datagen (else one is generated)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="dataset size when generating")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per case")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="", help="free-form name for this run (e.g. a commit)")
+    parser.add_argument("--baseline", default=None, help="earlier JSON report to compare against")
+    parser.add_argument("--workdir", default=None, help="where to put a generated database")
+    parser.add_argument("--out", default=None, help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    dataset = None
+    db_path = args.db
+    if db_path is None:
+        workdir = args.workdir or tempfile.mkdtemp(prefix="continuity-bench-")
+        os.makedirs(workdir, exist_ok=True)
+        db_path = os.path.join(workdir, "continuity.db")
+        dataset = generate(db_path, *SCALES[args.scale], seed=args.seed)
+    # Must be set before anything imports database.connection
+    os.environ["DATABASE_PATH"] = db_path
+
+    conn = sqlite3.connect(db_path)
+    rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "videos", "scenes", "images", "checkpoints", "verification_tokens")}
+    conn.close()
+
+    report = {
+        "label": args.label,
+        "config": {
+            "db": db_path,
+            "scale": args.scale if args.db is None else None,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "rows": rows,
+            "db_bytes": os.path.getsize(db_path),
+            "generated": dataset,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "cases": run_suite(db_path, args.iterations, args.seed),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["compare"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Row materialization benchmark: dict(row) vs record types
+Reads every row of a seeded scenes table both ways and reports throughput
+(best of --repeats) and tracemalloc memory (held by the result list, and
+peak while building it).
+
+    python -m benchmarks.records_benchmark --rows 100000 --out records.json
+
+Runs against a throwaway database in a temp directory.
+"""
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+SCAN_SQL = """
+    SELECT scene_id, video_id, scene_number, visual_description, voiceover, created_at, updated_at
+    FROM scenes
+    ORDER BY video_id, scene_number
+"""
+
+
+def seed_scenes(rows: int, scenes_per_video: int) -> None:
+    """Fill the scenes table with `rows` scenes spread over videos of one user"""
+    from database.models import SceneModel, UserModel, VideoModel
+
+    user = UserModel.find_by_email("records@example.com") or UserModel.create("records@example.com")
+    for start in range(0, rows, scenes_per_video):
+        video = VideoModel.create(user["user_id"], f"Records video {start // scenes_per_video}")
+        SceneModel.bulk_create(video["video_id"], [
+            {
+                "scene_number": n,
+                "visual_description": f"Scene {n}: " + "a wide shot of the harbour at dusk " * 3,
+                "voiceover": f"Line {n}",
+            }
+            for n in range(1, min(scenes_per_video, rows - start) + 1)
+        ])
+
+
+def read_dicts(conn: Any) -> List[Dict[str, Any]]:
+    """Today's path: sqlite3.Row objects copied into dicts"""
+    return [dict(row) for row in conn.execute(SCAN_SQL).fetchall()]
+
+
+def read_records(conn: Any) -> List[Any]:
+    from database.records import SceneRecord, fetch_all
+    return fetch_all(conn, SceneRecord, SCAN_SQL)
+
+
+def measure(name: str, read: Callable[[Any], List[Any]], repeats: int) -> Dict[str, Any]:
+    from database.connection import db_connection
+
+    timings = []
+    with db_connection.get_connection() as conn:
+        read(conn)                                       # Warm the page cache
+        for _ in range(repeats):
+            gc.collect()
+            started = time.perf_counter()
+            rows = read(conn)
+            timings.append(time.perf_counter() - started)
+            del rows
+
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        rows = read(conn)
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    count = len(rows)
+    best = min(timings)
+    return {
+        "path": name,
+        "rows": count,
+        "best_s": best,
+        "rows_per_s": count / best if best else 0.0,
+        "held_bytes": held - baseline,
+        "peak_bytes": peak - baseline,
+        "held_bytes_per_row": (held - baseline) / count if count else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="dict(row) vs record types on the scenes table")
+    parser.add_argument("--rows", type=int, default=100_000, help="scenes to seed and read")
+    parser.add_argument("--scenes-per-video", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5, help="timed reads per path (best is reported)")
+    parser.add_argument("--workdir", default=None, help="where to put the throwaway database")
+    parser.add_argument("--out", default=None, help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="continuity-records-")
+    os.makedirs(workdir, exist_ok=True)
+    # Must be set before anything imports database.connection
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "continuity.db")
+
+    seed_scenes(args.rows, args.scenes_per_video)
+    dicts = measure("dict", read_dicts, args.repeats)
+    records = measure("record", read_records, args.repeats)
+
+    report = {
+        "config": {"rows": args.rows, "scenes_per_video": args.scenes_per_video, "repeats": args.repeats},
+        "results": [dicts, records],
+        "speedup": records["rows_per_s"] / dicts["rows_per_s"] if dicts["rows_per_s"] else 0.0,
+        "held_memory_ratio": records["held_bytes"] / dicts["held_bytes"] if dicts["held_bytes"] else 0.0,
+        "peak_memory_ratio": records["peak_bytes"] / dicts["peak_bytes"] if dicts["peak_bytes"] else 0.0,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,182 @@
+import hashlib
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Iterator, Optional
 
-# User data directory
+from database.cache import LRUCache
+
+# User data directory (created on first write, not at import)
 USER_DATA_DIR = Path.home() / ".continuity"
-USER_DATA_DIR.mkdir(exist_ok=True)
 
 # Files that track current context
 CURRENT_USER_FILE = USER_DATA_DIR / "current_user_id"
 CURRENT_VIDEO_FILE = USER_DATA_DIR / "current_video_id"
 
+CURRENT_USER = "current_user_id"
+CURRENT_VIDEO = "current_video_id"
+DEFAULT_CONTEXT_KEY = "cli"
+
+# Session state key for the video being worked on; unlike temp: keys it survives between turns
+ACTIVE_VIDEO_KEY = "active_video_id"
+
+
+# === Context stores ===
+
+class ContextStore(ABC):
+    """Where the current user/video of a conversation is remembered, keyed by session"""
+
+    @abstractmethod
+    def get(self, key: str, name: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, name: str, value: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str, name: str) -> None:
+        ...
+
+    @abstractmethod
+    def discard(self, key: str) -> None:
+        """Forget everything stored for `key` (its conversation has ended)"""
+        ...
+
+
+class InMemoryContextStore(ContextStore):
+    """
+    Per-session context held in process memory (server mode).
+    Bounded like the server's conversation map: least recently used keys are
+    evicted past `maxsize`, and a key expires `ttl_seconds` after its last write.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 3600.0):
+        self._values = LRUCache(maxsize, ttl_seconds)
+        # Serializes read-modify-write of one key's values
+        self._lock = threading.Lock()
+
+    def get(self, key: str, name: str) -> Optional[str]:
+        values = self._values.get(key)
+        return values.get(name) if values else None
+
+    def set(self, key: str, name: str, value: str) -> None:
+        with self._lock:
+            values = dict(self._values.get(key) or {})
+            values[name] = value
+            self._values.put(key, values)
+
+    def delete(self, key: str, name: str) -> None:
+        with self._lock:
+            values = dict(self._values.get(key) or {})
+            if values.pop(name, None) is None:
+                return
+            if values:
+                self._values.put(key, values)
+            else:
+                self._values.invalidate(key)
+
+    def discard(self, key: str) -> None:
+        self._values.invalidate(key)
+
+
+class FileContextStore(ContextStore):
+    """
+    Context persisted under ~/.continuity so the CLI remembers it across runs.
+    The default (CLI) key uses the original current_user_id/current_video_id files.
+    """
+
+    def __init__(self, directory: Path = USER_DATA_DIR):
+        self.directory = directory
+
+    SAFE_KEY = re.compile(r"[A-Za-z0-9_-]+")
+
+    def _path(self, key: str, name: str) -> Path:
+        if key == DEFAULT_CONTEXT_KEY:
+            return self.directory / name
+        # Keys come from clients; anything that is not a plain token is hashed
+        # so it can never leave (or collide with the CLI files in) the directory
+        if not self.SAFE_KEY.fullmatch(key):
+            key = "sha256-" + hashlib.sha256(key.encode()).hexdigest()
+        return self.directory / f"{name}.{key}"
+
+    def get(self, key: str, name: str) -> Optional[str]:
+        path = self._path(key, name)
+        if path.exists():
+            return path.read_text().strip()
+        return None
+
+    def set(self, key: str, name: str, value: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path(key, name).write_text(value)
+
+    def delete(self, key: str, name: str) -> None:
+        path = self._path(key, name)
+        if path.exists():
+            path.unlink()
+
+    def discard(self, key: str) -> None:
+        for name in (CURRENT_USER, CURRENT_VIDEO):
+            self.delete(key, name)
+
+
+# File-backed for the CLI by default; servers switch to memory with set_context_store()
+_context_store: ContextStore = (
+    InMemoryContextStore()
+    if os.getenv("CONTINUITY_CONTEXT_STORE", "file") == "memory"
+    else FileContextStore()
+)
+
+# Session the current task is serving (set per turn by the runner front end)
+_context_key: ContextVar[str] = ContextVar("continuity_context_key", default=DEFAULT_CONTEXT_KEY)
+
+
+def set_context_store(store: ContextStore) -> None:
+    """Replace the process-wide context store"""
+    global _context_store
+    _context_store = store
+
+
+def get_context_store() -> ContextStore:
+    return _context_store
+
+
+@contextmanager
+def use_context_key(key: str) -> Iterator[None]:
+    """Scope save_/load_ calls in this task (and tasks it spawns) to one session"""
+    token = _context_key.set(key)
+    try:
+        yield
+    finally:
+        _context_key.reset(token)
+
+
+# === Current user / video ===
+
 def save_current_user(user_id: str):
     """Save current logged-in user"""
-    CURRENT_USER_FILE.write_text(user_id)
+    _context_store.set(_context_key.get(), CURRENT_USER, user_id)
 
 def load_current_user():
     """Load current logged-in user (or None)"""
-    if CURRENT_USER_FILE.exists():
-        return CURRENT_USER_FILE.read_text().strip()
-    return None
+    return _context_store.get(_context_key.get(), CURRENT_USER)
+
+def clear_current_user():
+    """Forget current user (e.g. stale or deleted account)"""
+    _context_store.delete(_context_key.get(), CURRENT_USER)
 
 def save_current_video(video_id: str):
     """Save currently selected video"""
-    CURRENT_VIDEO_FILE.write_text(video_id)
+    _context_store.set(_context_key.get(), CURRENT_VIDEO, video_id)
 
 def load_current_video():
     """Load currently selected video (or None)"""
-    if CURRENT_VIDEO_FILE.exists():
-        return CURRENT_VIDEO_FILE.read_text().strip()
-    return None
+    return _context_store.get(_context_key.get(), CURRENT_VIDEO)
 
 def clear_current_video():
     """Clear current video (back to menu)"""
-    if CURRENT_VIDEO_FILE.exists():
-        CURRENT_VIDEO_FILE.unlink()
\ No newline at end of file
+    _context_store.delete(_context_key.get(), CURRENT_VIDEO)
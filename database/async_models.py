@@ -0,0 +1,152 @@
+"""
+Async data-access layer
+Runs the blocking model calls on a dedicated DB executor so the event loop never waits on SQLite
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .connection import db_connection
+from .models import ImageModel, SceneModel, UserModel, VideoModel, VerificationTokenModel
+from .records import ImageRecord, SceneRecord, UserRecord, VideoRecord, VideoSearchHit, VideoSummary
+
+T = TypeVar("T")
+
+# One worker per pooled connection - more threads would only queue on the pool
+_db_executor = ThreadPoolExecutor(
+    max_workers=db_connection.pool_size,
+    thread_name_prefix="continuity-db",
+)
+
+
+async def run_in_db_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking DB function on the DB executor and await its result.
+    The caller's contextvars (context store key, current trace span) go with it.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_db_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+class AsyncUserModel:
+    """Async counterpart of UserModel"""
+
+    @staticmethod
+    async def create(email: str, user_id: Optional[str] = None, user_name: Optional[str] = None) -> Dict[str, Any]:
+        return await run_in_db_executor(UserModel.create, email, user_id=user_id, user_name=user_name)
+
+    @staticmethod
+    async def find_by_email(email: str) -> Optional[UserRecord]:
+        return await run_in_db_executor(UserModel.find_by_email, email)
+
+    @staticmethod
+    async def find_by_id(user_id: str) -> Optional[UserRecord]:
+        return await run_in_db_executor(UserModel.find_by_id, user_id)
+
+    @staticmethod
+    async def add_cost(user_id: str, amount: float) -> None:
+        await run_in_db_executor(UserModel.add_cost, user_id, amount)
+
+    @staticmethod
+    async def set_plan_tier(user_id: str, plan_tier: str) -> None:
+        await run_in_db_executor(UserModel.set_plan_tier, user_id, plan_tier)
+
+
+class AsyncVideoModel:
+    """Async counterpart of VideoModel"""
+
+    @staticmethod
+    async def create(user_id: str, title: str, video_id: Optional[str] = None) -> Dict[str, Any]:
+        return await run_in_db_executor(VideoModel.create, user_id, title, video_id=video_id)
+
+    @staticmethod
+    async def get_by_id(video_id: str) -> Optional[VideoRecord]:
+        return await run_in_db_executor(VideoModel.get_by_id, video_id)
+
+    @staticmethod
+    async def get_for_user(video_id: str, user_id: str) -> Optional[VideoRecord]:
+        return await run_in_db_executor(VideoModel.get_for_user, video_id, user_id)
+
+    @staticmethod
+    async def find_for_user_by_title(user_id: str, title: str) -> List[VideoSummary]:
+        return await run_in_db_executor(VideoModel.find_for_user_by_title, user_id, title)
+
+    @staticmethod
+    async def search_for_user(user_id: str, query: str, limit: int = 5) -> List[VideoSearchHit]:
+        return await run_in_db_executor(VideoModel.search_for_user, user_id, query, limit)
+
+    @staticmethod
+    async def list_for_user(user_id: str, limit: int = 10, cursor: Optional[str] = None) -> List[VideoSummary]:
+        return await run_in_db_executor(VideoModel.list_for_user, user_id, limit, cursor)
+
+    @staticmethod
+    async def list_page(user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await run_in_db_executor(VideoModel.list_page, user_id, limit, cursor)
+
+    @staticmethod
+    async def update_last_session(video_id: str, session_id: str) -> None:
+        await run_in_db_executor(VideoModel.update_last_session, video_id, session_id)
+
+
+class AsyncSceneModel:
+    """Async counterpart of SceneModel"""
+
+    @staticmethod
+    async def bulk_create(video_id: str, scenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await run_in_db_executor(SceneModel.bulk_create, video_id, scenes)
+
+    @staticmethod
+    async def upsert_many(video_id: str, scenes: List[Dict[str, Any]]) -> Dict[int, str]:
+        return await run_in_db_executor(SceneModel.upsert_many, video_id, scenes)
+
+    @staticmethod
+    async def save_script(video_id: str, script: str, scenes: List[Dict[str, Any]]) -> Dict[int, str]:
+        return await run_in_db_executor(SceneModel.save_script, video_id, script, scenes)
+
+    @staticmethod
+    async def list_for_video(video_id: str) -> List[SceneRecord]:
+        return await run_in_db_executor(SceneModel.list_for_video, video_id)
+
+
+class AsyncImageModel:
+    """Async counterpart of ImageModel"""
+
+    @staticmethod
+    async def bulk_create(video_id: str, images: List[Dict[str, Any]]) -> List[str]:
+        return await run_in_db_executor(ImageModel.bulk_create, video_id, images)
+
+    @staticmethod
+    async def upsert_many(video_id: str, images: List[Dict[str, Any]]) -> Dict[str, int]:
+        return await run_in_db_executor(ImageModel.upsert_many, video_id, images)
+
+    @staticmethod
+    async def set_statuses(changes: List[Tuple[str, str, Optional[str]]]) -> int:
+        return await run_in_db_executor(ImageModel.set_statuses, changes)
+
+    @staticmethod
+    async def list_for_scene(scene_id: str) -> List[ImageRecord]:
+        return await run_in_db_executor(ImageModel.list_for_scene, scene_id)
+
+
+class AsyncVerificationTokenModel:
+    """Async counterpart of VerificationTokenModel"""
+
+    @staticmethod
+    async def create_token(email: str) -> str:
+        return await run_in_db_executor(VerificationTokenModel.create_token, email)
+
+    @staticmethod
+    async def verify_token(token: str) -> Optional[str]:
+        return await run_in_db_executor(VerificationTokenModel.verify_token, token)
+
+    @staticmethod
+    async def delete_expired_chunk(now: Optional[int] = None, limit: int = VerificationTokenModel.SWEEP_CHUNK_SIZE) -> int:
+        return await run_in_db_executor(VerificationTokenModel.delete_expired_chunk, now, limit)
+
+    @staticmethod
+    async def cleanup_expired_tokens(chunk_size: int = VerificationTokenModel.SWEEP_CHUNK_SIZE) -> int:
+        return await run_in_db_executor(VerificationTokenModel.cleanup_expired_tokens, chunk_size)
@@ -0,0 +1,158 @@
+"""
+Coalescing checkpoint writer
+Collapses repeated checkpoints per video and writes them behind the caller in one transaction
+"""
+
+import atexit
+import threading
+from typing import Any, Dict, Optional
+
+from . import prefetch
+from .connection import db_connection
+
+CHECKPOINT_UPSERT_SQL = """
+    INSERT INTO checkpoints (
+        video_id, next_scene, current_batch,
+        character_reference_path, session_cost, last_updated_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(video_id) DO UPDATE SET
+        next_scene = excluded.next_scene,
+        current_batch = excluded.current_batch,
+        character_reference_path = excluded.character_reference_path,
+        session_cost = excluded.session_cost,
+        last_updated_at = excluded.last_updated_at
+"""
+
+
+def write_checkpoints(checkpoints: Dict[str, Dict[str, Any]]) -> int:
+    """Upsert checkpoints keyed by video_id in a single transaction"""
+    if not checkpoints:
+        return 0
+    with db_connection.get_connection() as conn:
+        conn.executemany(
+            CHECKPOINT_UPSERT_SQL,
+            [
+                (
+                    video_id,
+                    checkpoint.get("next_scene"),
+                    checkpoint.get("current_batch"),
+                    checkpoint.get("character_reference_path"),
+                    checkpoint.get("session_cost"),
+                    checkpoint.get("last_updated_at"),
+                )
+                for video_id, checkpoint in checkpoints.items()
+            ],
+        )
+    for video_id in checkpoints:
+        prefetch.invalidate_video(video_id)
+    return len(checkpoints)
+
+
+class CheckpointWriter:
+    """
+    Write-behind queue for checkpoints.
+
+    Checkpoints for the same video submitted within `window_seconds` collapse
+    into one upsert, and every flush writes all pending videos in one
+    transaction. flush() is synchronous and also runs at interpreter exit.
+    A failing background flush is retried with exponential backoff (up to
+    `max_backoff_seconds`), logged once when it starts failing and once
+    when it recovers.
+    """
+
+    def __init__(self, window_seconds: float = 0.5, max_backoff_seconds: float = 30.0):
+        self.window_seconds = window_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"submitted": 0, "coalesced": 0, "flushes": 0, "rows_written": 0, "errors": 0}
+
+    def submit(self, video_id: str, checkpoint: Dict[str, Any]) -> None:
+        """Queue a checkpoint; a newer one for the same video replaces it"""
+        with self._lock:
+            if video_id in self._pending:
+                self._stats["coalesced"] += 1
+            self._pending[video_id] = checkpoint
+            self._stats["submitted"] += 1
+            if not self._stopped.is_set():
+                self._ensure_thread()
+        if self._stopped.is_set():
+            # Shutting down - nothing will write behind us any more
+            self.flush()
+            return
+        self._wakeup.set()
+
+    def has_pending(self, video_id: Optional[str] = None) -> bool:
+        with self._lock:
+            return video_id in self._pending if video_id else bool(self._pending)
+
+    def flush(self) -> int:
+        """Write everything pending now, in one transaction. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                written = write_checkpoints(batch)
+            except Exception:
+                with self._lock:
+                    # Put the batch back without clobbering anything newer
+                    for video_id, checkpoint in batch.items():
+                        self._pending.setdefault(video_id, checkpoint)
+                    self._stats["errors"] += 1
+                raise
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += written
+            return written
+
+    def close(self) -> None:
+        """Stop the background thread and flush what is left"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.window_seconds * 4)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _ensure_thread(self) -> None:
+        # Called with self._lock held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="checkpoint-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        failures = 0                                     # Failed flushes in a row
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Let more checkpoints for the same videos arrive before writing (longer while failing)
+            self._stopped.wait(min(self.max_backoff_seconds, self.window_seconds * 2 ** failures))
+            try:
+                self.flush()
+            except Exception as e:
+                failures += 1
+                if failures == 1:
+                    print(f"Checkpoint flush failed, retrying with backoff: {e}")
+                self._wakeup.set()
+                continue
+            if failures:
+                print(f"Checkpoint flush succeeded after {failures} failed attempts")
+                failures = 0
+
+
+checkpoint_writer = CheckpointWriter()
+atexit.register(checkpoint_writer.close)
@@ -1,98 +1,202 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Dict, Generator, Optional
+
+from .instrumentation import QUERY_STATS_ENABLED, InstrumentedConnection, QueryStats
+from .migrations import run_migrations
+
+# Connection tuning applied to every pooled connection
+DEFAULT_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16384                                   # ~16 MB page cache per connection
+
 
 class DatabaseConnection:
-    def __init__(self, db_path: str = "continuity.db"):
-        self.db_path = db_path
-        self._initialize_schema()
-    
-    def _initialize_schema(self):
-        """Create tables if they don't exist"""
-        with self.get_connection() as conn:
-            conn.executescript("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    email TEXT UNIQUE NOT NULL,
-                    user_name TEXT,
-                    current_month_cost REAL DEFAULT 0.0,         -- Monthly spending (for limits)
-                    plan_tier TEXT DEFAULT 'free',               -- free, basic, pro
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                
-                CREATE TABLE IF NOT EXISTS videos (
-                    video_id TEXT PRIMARY KEY,                   -- UUID as TEXT
-                    user_id TEXT NOT NULL, 
-                    last_session_id TEXT,                        -- ADK session ID
-                    title TEXT NOT NULL, 
-                    script TEXT,                                 -- Full script
-                    video_path TEXT,                             -- Final assembled video
-                    voiceover_path TEXT,                         -- Voiceover audio
-                    thumbnail_path TEXT,
-                    total_cost REAL DEFAULT 0.0,                 -- Cost for this video
-                    images_generated_count INTEGER DEFAULT 0,    -- Total images (including rejected) +
-                    status TEXT DEFAULT 'in_progress',           -- 'in_progress', 'completed', 'archived' +
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS scenes (
-                    scene_id TEXT PRIMARY KEY,                    -- UUID as TEXT
-                    video_id TEXT NOT NULL,   
-                    scene_number INTEGER NOT NULL,  
-                    visual_description TEXT NOT NULL,     
-                    voiceover TEXT,      
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
-                    UNIQUE(video_id, scene_number)
-                );
-                
-                CREATE TABLE IF NOT EXISTS images (
-                    image_id TEXT PRIMARY KEY,                   -- UUID as TEXT
-                    scene_id TEXT NOT NULL,
-                    image_path TEXT NOT NULL,
-                    clip_path TEXT,                              -- Future: video clip
-                    is_character_reference BOOLEAN DEFAULT 0,
-                    status TEXT DEFAULT 'pending',               -- 'pending', 'approved', 'rejected'
-                    attempt_number INTEGER DEFAULT 1,            -- 1st, 2nd, 3rd attempt
-                    rejected_reason TEXT,                        -- Why rejected
-                    generation_cost REAL DEFAULT 0,              -- Cost to generate this image
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (scene_id) REFERENCES scenes(scene_id) ON DELETE CASCADE
-                );
-                
-                CREATE TABLE IF NOT EXISTS verification_tokens (
-                    token TEXT PRIMARY KEY,                      -- UUID as TEXT
-                    email TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP NOT NULL,
-                    used INTEGER DEFAULT 0
-                );
-
-                CREATE TABLE IF NOT EXISTS checkpoints (
-                    video_id TEXT PRIMARY KEY,
-                    next_scene INTEGER,
-                    current_batch INTEGER,
-                    character_reference_path TEXT,
-                    session_cost REAL,
-                    last_updated_at TEXT
-                );
-            """)
-    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        checkout_timeout: float = 30.0,
+        instrument: Optional[bool] = None,
+    ):
+        self.db_path = db_path or os.getenv("DATABASE_PATH", "continuity.db")
+        # Every ":memory:" connection is its own database, so never pool more than one
+        self.pool_size = 1 if self.db_path == ":memory:" else max(1, pool_size)
+        self.checkout_timeout = checkout_timeout
+        # Per-statement timing is opt-in (DB_QUERY_STATS=1); plain connections otherwise
+        instrument = QUERY_STATS_ENABLED if instrument is None else instrument
+        self.query_stats: Optional[QueryStats] = QueryStats() if instrument else None
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=self.pool_size)
+        self._lock = threading.Lock()
+        # Schema is checked on first checkout, not at import - startup stays free of file I/O
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._opened = 0
+        self._waiters = 0                                # Callers blocked in _checkout
+        self._closed = False                             # close_all() ran: released connections close
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_hold_ms": 0.0,
+        }
+
+    def _initialize_schema(self, conn: sqlite3.Connection) -> None:
+        """Bring the schema up to date once per process (no DDL runs when it is already current)"""
+        with self._schema_lock:
+            if not self._schema_ready:
+                run_migrations(conn)
+                self._schema_ready = True
+
+    # === Pool internals ===
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection with WAL journaling and tuned pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,                     # Pooled connections move between threads
+            factory=InstrumentedConnection if self.query_stats is not None else sqlite3.Connection,
+        )
+        if self.query_stats is not None:
+            conn.query_stats = self.query_stats
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Take an idle connection, open a new one, or wait for one to be returned"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+
+        if conn is None:
+            with self._lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._open_connection()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+
+        if conn is None:
+            # Pool exhausted - block until another caller releases (or replaces) a connection
+            started = time.perf_counter()
+            with self._lock:
+                self._waiters += 1
+            try:
+                conn = self._idle.get(timeout=self.checkout_timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"No database connection available after {self.checkout_timeout}s "
+                    f"(pool_size={self.pool_size})"
+                )
+            finally:
+                with self._lock:
+                    self._waiters -= 1
+            waited_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats["waits"] += 1
+                self._stats["total_wait_ms"] += waited_ms
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited_ms)
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, healthy: bool = True) -> None:
+        """Return a connection to the pool, or drop it if it is no longer usable (or the pool is closed)"""
+        if healthy and not conn.in_transaction and not self._closed:
+            self._idle.put_nowait(conn)
+            return
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._opened -= 1
+                # A waiter only wakes on a connection arriving in the pool - open its replacement
+                replace = self._waiters > 0 and not self._closed
+                if replace:
+                    self._opened += 1
+        if replace:
+            try:
+                self._idle.put_nowait(self._open_connection())
+            except Exception:
+                # Leave the caller's own error alone; the waiter retries or times out
+                with self._lock:
+                    self._opened -= 1
+
+    # === Public API ===
+
     @contextmanager
     def get_connection(self) -> Generator[sqlite3.Connection, None, None]:
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Context manager for pooled database connections"""
+        conn = self._checkout()
+        started = time.perf_counter()
+        healthy = True
         try:
+            if not self._schema_ready:
+                self._initialize_schema(conn)
             yield conn
             conn.commit()
         except Exception:
-            conn.rollback()
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                healthy = False
             raise
         finally:
+            with self._lock:
+                self._stats["total_hold_ms"] += (time.perf_counter() - started) * 1000
+            self._release(conn, healthy)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Pool size and checkout-wait statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            opened = self._opened
+        idle = self._idle.qsize()
+        stats.update({
+            "pool_size": self.pool_size,
+            "open_connections": opened,
+            "idle_connections": idle,
+            "in_use": opened - idle,
+            "avg_wait_ms": stats["total_wait_ms"] / stats["waits"] if stats["waits"] else 0.0,
+        })
+        return stats
+
+    def query_stats_snapshot(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """Statement/transaction timings and the slow-query log (see database/instrumentation.py)"""
+        if self.query_stats is None:
+            return {"enabled": False}
+        return self.query_stats.snapshot(top)
+
+    def close_all(self) -> None:
+        """Close every idle connection; checked-out ones close when released"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
             conn.close()
+            with self._lock:
+                self._opened -= 1
 
 # Creating singleton instance
-db_connection = DatabaseConnection()
\ No newline at end of file
+db_connection = DatabaseConnection()
@@ -0,0 +1,377 @@
+"""
+Opt-in query instrumentation
+Pooled connections opened with InstrumentedConnection time every statement
+(execute plus fetches) and report it to a QueryStats collector: latency
+histograms keyed by normalized SQL, rows returned/changed, transaction
+duration and a slow-query log with EXPLAIN QUERY PLAN captured.
+
+Enable with DB_QUERY_STATS=1 (slow threshold: DB_SLOW_QUERY_MS, default 50);
+turn tracing (services/tracing.py) turns it on as well.
+Parameters are never stored in the log; they are only used for the plan.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Tracing needs per-statement timings too
+QUERY_STATS_ENABLED = os.getenv("DB_QUERY_STATS", "0") == "1" or bool(os.getenv("CONTINUITY_TRACE_FILE"))
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "50"))
+
+# Histogram bucket upper bounds; anything slower lands in the overflow bucket
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0)
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+# hook(sql, elapsed_ms, rows, error) runs for every finished statement, on the thread that ran it
+_statement_hooks: List[Callable[[str, float, int, bool], None]] = []
+
+
+def add_statement_hook(hook: Callable[[str, float, int, bool], None]) -> None:
+    if hook not in _statement_hooks:
+        _statement_hooks.append(hook)
+
+
+def remove_statement_hook(hook: Callable[[str, float, int, bool], None]) -> None:
+    if hook in _statement_hooks:
+        _statement_hooks.remove(hook)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace, literals and IN (?, ?, ...) lists so one query shape is one key"""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _SPACE_RE.sub(" ", sql).strip()
+    return _IN_LIST_RE.sub("(...)", sql)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (percentiles are bucket upper bounds)"""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        wanted = pct / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= wanted:
+                return min(BUCKETS_MS[i], self.max_ms) if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {}
+        for i, n in enumerate(self.counts):
+            if n:
+                buckets[f"<={BUCKETS_MS[i]}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"] = n
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class QueryStats:
+    """Thread-safe collector shared by every connection of one pool"""
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, slow_log_size: int = 100, max_plans: int = 256):
+        self.slow_query_ms = slow_query_ms
+        self.max_plans = max_plans
+        self._lock = threading.Lock()
+        self._statements: Dict[str, Dict[str, Any]] = {}
+        self._transactions = LatencyHistogram()
+        self._slow: deque = deque(maxlen=slow_log_size)
+        self._plans: Dict[str, List[str]] = {}
+
+    def record_statement(
+        self, sql: str, elapsed_ms: float, rows: int = 0, rows_changed: int = 0, error: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Count one finished statement.
+
+        Returns:
+            The slow-log entry if the statement was slow (its plan is filled in later), else None
+        """
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                entry = self._statements[key] = {
+                    "latency": LatencyHistogram(), "rows": 0, "rows_changed": 0, "errors": 0,
+                }
+            entry["latency"].add(elapsed_ms)
+            entry["rows"] += rows
+            entry["rows_changed"] += max(rows_changed, 0)
+            entry["errors"] += int(error)
+
+            if elapsed_ms < self.slow_query_ms or error:
+                return None
+            slow = {
+                "sql": key,
+                "ms": elapsed_ms,
+                "rows": rows,
+                "at": time.time(),
+                "thread": threading.current_thread().name,
+                "plan": self._plans.get(key),
+            }
+            self._slow.append(slow)
+            return slow
+
+    def record_transaction(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self._transactions.add(elapsed_ms)
+
+    def cached_plan(self, sql: str) -> Optional[List[str]]:
+        with self._lock:
+            return self._plans.get(normalize_sql(sql))
+
+    def set_plan(self, slow: Dict[str, Any], plan: List[str]) -> None:
+        with self._lock:
+            slow["plan"] = plan
+            if len(self._plans) < self.max_plans:
+                self._plans[slow["sql"]] = plan
+
+    def snapshot(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Current counters, heaviest statements (by total time) first.
+
+        Args:
+            top: Only return this many statements (all if None)
+        """
+        with self._lock:
+            statements = [
+                dict(entry["latency"].to_dict(), sql=key, rows=entry["rows"],
+                     rows_changed=entry["rows_changed"], errors=entry["errors"])
+                for key, entry in self._statements.items()
+            ]
+            transactions = self._transactions.to_dict()
+            slow = [dict(entry) for entry in self._slow]
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "enabled": True,
+            "slow_query_ms": self.slow_query_ms,
+            "statements": statements[:top] if top is not None else statements,
+            "transactions": transactions,
+            "slow_queries": slow,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._transactions = LatencyHistogram()
+            self._slow.clear()
+            self._plans.clear()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Times a statement from execute() until its results are exhausted, the
+    cursor runs something else, is closed or is dropped.
+    """
+
+    def __init__(self, connection: "InstrumentedConnection"):
+        super().__init__(connection)
+        # [sql, plan params, elapsed seconds, rows fetched]
+        self._statement: Optional[list] = None
+
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception:
+            self.connection._record(sql, None, time.perf_counter() - started, 0, 0, error=True)
+            raise
+        self._statement = [sql, parameters, time.perf_counter() - started, 0]
+        self.connection._track_transaction(started)
+        if self.description is None:
+            self._finish()                               # Nothing to fetch
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "InstrumentedCursor":
+        self._finish()
+        # Plan with the first parameter set, if we can look at it without consuming it
+        plan_params = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else None
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except Exception:
+            self.connection._record(sql, None, time.perf_counter() - started, 0, 0, error=True)
+            raise
+        self._statement = [sql, plan_params, time.perf_counter() - started, 0]
+        self.connection._track_transaction(started)
+        self._finish()
+        return self
+
+    def executescript(self, sql_script: str) -> "InstrumentedCursor":
+        self._finish()
+        return super().executescript(sql_script)
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1, done=row is None)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> list:
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), done=len(rows) < size)
+        return rows
+
+    def fetchall(self) -> list:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), done=True)
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, done=True)
+            raise
+        self._fetched(started, 1, done=False)
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _fetched(self, started: float, rows: int, done: bool) -> None:
+        statement = self._statement
+        if statement is None:
+            return
+        statement[2] += time.perf_counter() - started
+        statement[3] += rows
+        if done:
+            self._finish()
+
+    def _finish(self) -> None:
+        statement, self._statement = self._statement, None
+        if statement is not None:
+            sql, params, elapsed, rows = statement
+            self.connection._record(sql, params, elapsed, rows, self.rowcount)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection factory that hands out InstrumentedCursors"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.query_stats: Optional[QueryStats] = None
+        self._transaction_started: Optional[float] = None
+        # Slow statements whose plan is captured once the caller is done (commit/rollback)
+        self._pending_plans: List[Tuple[Dict[str, Any], str, Any]] = []
+
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:
+        return super().cursor(factory or InstrumentedCursor)
+
+    # The built-in shortcuts create plain cursors, so route them through cursor()
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str) -> sqlite3.Cursor:
+        return self.cursor().executescript(sql_script)
+
+    def commit(self) -> None:
+        try:
+            super().commit()
+        finally:
+            self._end_transaction()
+
+    def rollback(self) -> None:
+        try:
+            super().rollback()
+        finally:
+            self._end_transaction()
+
+    # === Called by InstrumentedCursor ===
+
+    def _record(self, sql: str, params: Any, elapsed: float, rows: int, rows_changed: int, error: bool = False) -> None:
+        if self.query_stats is None:
+            return
+        for hook in _statement_hooks:
+            hook(sql, elapsed * 1000, rows, error)
+        slow = self.query_stats.record_statement(sql, elapsed * 1000, rows, rows_changed, error)
+        if slow is not None and slow["plan"] is None and sql.lstrip().upper().startswith(_EXPLAINABLE):
+            self._pending_plans.append((slow, sql, params))
+
+    def _track_transaction(self, statement_started: float) -> None:
+        if self.in_transaction and self._transaction_started is None:
+            self._transaction_started = statement_started
+        elif not self.in_transaction and self._transaction_started is not None:
+            self._end_transaction()                      # Ended by an explicit COMMIT/ROLLBACK
+
+    def _end_transaction(self) -> None:
+        if self._transaction_started is not None and not self.in_transaction:
+            if self.query_stats is not None:
+                self.query_stats.record_transaction((time.perf_counter() - self._transaction_started) * 1000)
+            self._transaction_started = None
+        self._capture_plans()
+
+    def _capture_plans(self) -> None:
+        pending, self._pending_plans = self._pending_plans, []
+        for slow, sql, params in pending:
+            plan = self.query_stats.cached_plan(sql)
+            if plan is None:
+                try:
+                    plan = explain(self, sql, params)
+                except sqlite3.Error as e:
+                    plan = [f"(no plan: {e})"]
+            self.query_stats.set_plan(slow, plan)
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Any = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN as indented lines (run on a plain, uninstrumented cursor)"""
+    cursor = sqlite3.Cursor(conn)
+    cursor.row_factory = None
+    rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params if params is not None else ()).fetchall()
+    cursor.close()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
@@ -0,0 +1,40 @@
+"""
+Periodic database housekeeping
+Background tasks that keep hot tables small without blocking user turns
+"""
+
+import asyncio
+import os
+from typing import Optional
+
+from .async_models import AsyncVerificationTokenModel
+
+TOKEN_SWEEP_INTERVAL_SECONDS = float(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "300"))
+
+
+async def run_token_sweeper(interval_seconds: float = TOKEN_SWEEP_INTERVAL_SECONDS) -> None:
+    """
+    Sweep expired tokens now and then every `interval_seconds`, until cancelled.
+    Prints only when tokens were removed, or once when sweeping starts failing.
+    """
+    failing = False
+    while True:
+        try:
+            # Chunked in the model; runs on the DB executor so the event loop stays free
+            deleted = await AsyncVerificationTokenModel.cleanup_expired_tokens()
+            failing = False
+            if deleted:
+                print(f"Token sweep removed {deleted} expired tokens")
+        except Exception as e:
+            if not failing:
+                print(f"Token sweep failed, will retry: {e}")
+            failing = True
+        await asyncio.sleep(interval_seconds)
+
+
+def start_token_sweeper(interval_seconds: Optional[float] = None) -> asyncio.Task:
+    """Schedule the sweeper on the running loop; cancel the task to stop it"""
+    return asyncio.create_task(
+        run_token_sweeper(TOKEN_SWEEP_INTERVAL_SECONDS if interval_seconds is None else interval_seconds),
+        name="token-sweeper",
+    )
@@ -0,0 +1,537 @@
+"""
+Versioned schema migrations
+Applied schema version is tracked in PRAGMA user_version
+"""
+
+import logging
+import sqlite3
+from typing import List, Tuple
+
+# Logged, not printed: stdout belongs to the caller (e.g. benchmark JSON)
+logger = logging.getLogger(__name__)
+
+# (version, description, statements) - append only, never edit a shipped migration
+MIGRATIONS: List[Tuple[int, str, Tuple[str, ...]]] = [
+    (1, "baseline schema", (
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            user_name TEXT,
+            current_month_cost REAL DEFAULT 0.0,         -- Monthly spending (for limits)
+            plan_tier TEXT DEFAULT 'free',               -- free, basic, pro
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id TEXT PRIMARY KEY,                   -- UUID as TEXT
+            user_id TEXT NOT NULL,
+            last_session_id TEXT,                        -- ADK session ID
+            title TEXT NOT NULL,
+            script TEXT,                                 -- Full script
+            video_path TEXT,                             -- Final assembled video
+            voiceover_path TEXT,                         -- Voiceover audio
+            thumbnail_path TEXT,
+            total_cost REAL DEFAULT 0.0,                 -- Cost for this video
+            images_generated_count INTEGER DEFAULT 0,    -- Total images (including rejected) +
+            status TEXT DEFAULT 'in_progress',           -- 'in_progress', 'completed', 'archived' +
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scenes (
+            scene_id TEXT PRIMARY KEY,                    -- UUID as TEXT
+            video_id TEXT NOT NULL,
+            scene_number INTEGER NOT NULL,
+            visual_description TEXT NOT NULL,
+            voiceover TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE,
+            UNIQUE(video_id, scene_number)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS images (
+            image_id TEXT PRIMARY KEY,                   -- UUID as TEXT
+            scene_id TEXT NOT NULL,
+            image_path TEXT NOT NULL,
+            clip_path TEXT,                              -- Future: video clip
+            is_character_reference BOOLEAN DEFAULT 0,
+            status TEXT DEFAULT 'pending',               -- 'pending', 'approved', 'rejected'
+            attempt_number INTEGER DEFAULT 1,            -- 1st, 2nd, 3rd attempt
+            rejected_reason TEXT,                        -- Why rejected
+            generation_cost REAL DEFAULT 0,              -- Cost to generate this image
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (scene_id) REFERENCES scenes(scene_id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS verification_tokens (
+            token TEXT PRIMARY KEY,                      -- UUID as TEXT
+            email TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            used INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            video_id TEXT PRIMARY KEY,
+            next_scene INTEGER,
+            current_batch INTEGER,
+            character_reference_path TEXT,
+            session_cost REAL,
+            last_updated_at TEXT
+        )
+        """,
+    )),
+    (2, "hot-path indexes", (
+        # Menu listing: WHERE user_id = ? ORDER BY updated_at DESC, answered from the index alone
+        """
+        CREATE INDEX IF NOT EXISTS idx_videos_user_updated
+        ON videos(user_id, updated_at, video_id, title, status, created_at)
+        """,
+        # Scene walk for a video, carrying scene_id so the images join never touches the table
+        """
+        CREATE INDEX IF NOT EXISTS idx_scenes_video_number
+        ON scenes(video_id, scene_number, scene_id)
+        """,
+        # Approved images per scene
+        """
+        CREATE INDEX IF NOT EXISTS idx_images_scene_status
+        ON images(scene_id, status, image_path)
+        """,
+        # Token expiry sweep (expires_at < ? OR used = 1)
+        """
+        CREATE INDEX IF NOT EXISTS idx_verification_tokens_expires
+        ON verification_tokens(expires_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_verification_tokens_used
+        ON verification_tokens(used)
+        """,
+    )),
+    (3, "change tracking for checkpoint resume", (
+        "ALTER TABLE scenes ADD COLUMN updated_at TIMESTAMP",
+        "ALTER TABLE images ADD COLUMN updated_at TIMESTAMP",
+        "UPDATE scenes SET updated_at = created_at",
+        "UPDATE images SET updated_at = created_at",
+        """
+        CREATE INDEX IF NOT EXISTS idx_images_scene_updated
+        ON images(scene_id, updated_at, status)
+        """,
+        # Stamp every insert and every progress-relevant update
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_touch_insert AFTER INSERT ON scenes
+        BEGIN
+            UPDATE scenes SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_touch_update
+        AFTER UPDATE OF scene_number, visual_description, video_id ON scenes
+        BEGIN
+            UPDATE scenes SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_touch_insert AFTER INSERT ON images
+        BEGIN
+            UPDATE images SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_touch_update
+        AFTER UPDATE OF status, scene_id, image_path ON images
+        BEGIN
+            UPDATE images SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+        END
+        """,
+        # Deletes leave nothing to diff against, so they invalidate the checkpoint instead
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_invalidate_checkpoint AFTER DELETE ON scenes
+        BEGIN
+            UPDATE checkpoints SET last_updated_at = NULL WHERE video_id = OLD.video_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_invalidate_checkpoint AFTER DELETE ON images
+        BEGIN
+            UPDATE checkpoints SET last_updated_at = NULL
+            WHERE video_id = (SELECT video_id FROM scenes WHERE scene_id = OLD.scene_id);
+        END
+        """,
+    )),
+    (4, "email outbox", (
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            text_body TEXT NOT NULL,
+            html_body TEXT,
+            status TEXT DEFAULT 'pending',               -- 'pending', 'sending', 'sent', 'failed'
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL NOT NULL,               -- Epoch seconds (retry backoff)
+            last_error TEXT,
+            queued_at REAL NOT NULL,                     -- Epoch seconds
+            sent_at REAL
+        )
+        """,
+        # The sender only ever asks "what is due now"
+        """
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+        ON email_outbox(status, next_attempt_at)
+        """,
+    )),
+    (5, "epoch token expiry", (
+        # Integer epoch expiry compares without any per-row conversion; consumed
+        # tokens get expires_at = now, so one index serves both verify and sweep
+        """
+        CREATE TABLE verification_tokens_v5 (
+            token TEXT PRIMARY KEY,                      -- UUID as TEXT
+            email TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at INTEGER NOT NULL,                 -- Epoch seconds
+            used INTEGER DEFAULT 0
+        )
+        """,
+        """
+        INSERT INTO verification_tokens_v5 (token, email, created_at, expires_at, used)
+        SELECT token, email, created_at,
+               CASE WHEN used = 1 THEN 0
+                    ELSE COALESCE(CAST(strftime('%s', expires_at) AS INTEGER), 0) END,
+               used
+        FROM verification_tokens
+        """,
+        "DROP TABLE verification_tokens",
+        "ALTER TABLE verification_tokens_v5 RENAME TO verification_tokens",
+        """
+        CREATE INDEX IF NOT EXISTS idx_verification_tokens_expires
+        ON verification_tokens(expires_at)
+        """,
+    )),
+    (6, "denormalized video counts", (
+        "ALTER TABLE videos ADD COLUMN scene_count INTEGER DEFAULT 0",
+        "ALTER TABLE videos ADD COLUMN approved_image_count INTEGER DEFAULT 0",
+        """
+        UPDATE videos SET
+            scene_count = (SELECT COUNT(*) FROM scenes WHERE scenes.video_id = videos.video_id),
+            approved_image_count = (
+                SELECT COUNT(*) FROM images i JOIN scenes s ON i.scene_id = s.scene_id
+                WHERE s.video_id = videos.video_id AND i.status = 'approved'
+            )
+        """,
+        # Menu page: WHERE user_id = ? ORDER BY updated_at DESC, video_id DESC, covering the counts too
+        "DROP INDEX IF EXISTS idx_videos_user_updated",
+        """
+        CREATE INDEX IF NOT EXISTS idx_videos_user_updated
+        ON videos(user_id, updated_at, video_id, title, status, created_at, scene_count, approved_image_count)
+        """,
+        # Any edit to the video itself moves it to the top of the menu
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_touch_update
+        AFTER UPDATE OF title, script, status, last_session_id, video_path, voiceover_path,
+                        thumbnail_path, total_cost, images_generated_count ON videos
+        BEGIN
+            UPDATE videos SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+        END
+        """,
+        # Scene counts (images of a deleted or moved scene leave/join the video with it)
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_count_insert AFTER INSERT ON scenes
+        BEGIN
+            UPDATE videos SET scene_count = scene_count + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = NEW.video_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_count_delete AFTER DELETE ON scenes
+        BEGIN
+            UPDATE videos SET
+                scene_count = scene_count - 1,
+                approved_image_count = approved_image_count - (
+                    SELECT COUNT(*) FROM images WHERE scene_id = OLD.scene_id AND status = 'approved'
+                ),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = OLD.video_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_count_move
+        AFTER UPDATE OF video_id ON scenes WHEN OLD.video_id IS NOT NEW.video_id
+        BEGIN
+            UPDATE videos SET
+                scene_count = scene_count - 1,
+                approved_image_count = approved_image_count - (
+                    SELECT COUNT(*) FROM images WHERE scene_id = OLD.scene_id AND status = 'approved'
+                ),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = OLD.video_id;
+            UPDATE videos SET
+                scene_count = scene_count + 1,
+                approved_image_count = approved_image_count + (
+                    SELECT COUNT(*) FROM images WHERE scene_id = NEW.scene_id AND status = 'approved'
+                ),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = NEW.video_id;
+        END
+        """,
+        # Approved image counts
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_count_insert AFTER INSERT ON images
+        BEGIN
+            UPDATE videos SET
+                approved_image_count = approved_image_count + (NEW.status = 'approved'),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = (SELECT video_id FROM scenes WHERE scene_id = NEW.scene_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_count_update
+        AFTER UPDATE OF status, scene_id ON images
+        WHEN OLD.status IS NOT NEW.status OR OLD.scene_id IS NOT NEW.scene_id
+        BEGIN
+            UPDATE videos SET
+                approved_image_count = approved_image_count - (OLD.status = 'approved'),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = (SELECT video_id FROM scenes WHERE scene_id = OLD.scene_id);
+            UPDATE videos SET
+                approved_image_count = approved_image_count + (NEW.status = 'approved'),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = (SELECT video_id FROM scenes WHERE scene_id = NEW.scene_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_count_delete AFTER DELETE ON images
+        BEGIN
+            UPDATE videos SET
+                approved_image_count = approved_image_count - (OLD.status = 'approved'),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE video_id = (SELECT video_id FROM scenes WHERE scene_id = OLD.scene_id);
+        END
+        """,
+    )),
+    (7, "full-text search", (
+        # External-content FTS5 tables keyed on the base tables' rowids (see database/search.py)
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5(
+            title, script,
+            content='videos', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS scene_fts USING fts5(
+            visual_description,
+            content='scenes', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_fts_insert AFTER INSERT ON videos
+        BEGIN
+            INSERT INTO video_fts (rowid, title, script) VALUES (NEW.rowid, NEW.title, NEW.script);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_fts_delete AFTER DELETE ON videos
+        BEGIN
+            INSERT INTO video_fts (video_fts, rowid, title, script) VALUES ('delete', OLD.rowid, OLD.title, OLD.script);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_fts_update AFTER UPDATE OF title, script ON videos
+        BEGIN
+            INSERT INTO video_fts (video_fts, rowid, title, script) VALUES ('delete', OLD.rowid, OLD.title, OLD.script);
+            INSERT INTO video_fts (rowid, title, script) VALUES (NEW.rowid, NEW.title, NEW.script);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_fts_insert AFTER INSERT ON scenes
+        BEGIN
+            INSERT INTO scene_fts (rowid, visual_description) VALUES (NEW.rowid, NEW.visual_description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_fts_delete AFTER DELETE ON scenes
+        BEGIN
+            INSERT INTO scene_fts (scene_fts, rowid, visual_description) VALUES ('delete', OLD.rowid, OLD.visual_description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_fts_update AFTER UPDATE OF visual_description ON scenes
+        BEGIN
+            INSERT INTO scene_fts (scene_fts, rowid, visual_description) VALUES ('delete', OLD.rowid, OLD.visual_description);
+            INSERT INTO scene_fts (rowid, visual_description) VALUES (NEW.rowid, NEW.visual_description);
+        END
+        """,
+        # Index what is already there
+        "INSERT INTO video_fts (video_fts) VALUES ('rebuild')",
+        "INSERT INTO scene_fts (scene_fts) VALUES ('rebuild')",
+    )),
+    (8, "email outbox leases", (
+        # A claim is only ours until the lease runs out; only then may another
+        # sender put a 'sending' row back in the queue
+        "ALTER TABLE email_outbox ADD COLUMN lease_expires_at REAL",
+    )),
+    (9, "search index on stable keys", (
+        # VACUUM may renumber the implicit rowids of videos and scenes (TEXT primary
+        # keys), which silently detached the FTS index from its rows. Index on an
+        # ordinary column instead: it is data, so VACUUM leaves it alone.
+        "DROP TRIGGER IF EXISTS trg_videos_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_videos_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_videos_fts_update",
+        "DROP TRIGGER IF EXISTS trg_scenes_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_scenes_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_scenes_fts_update",
+        "DROP TABLE IF EXISTS video_fts",
+        "DROP TABLE IF EXISTS scene_fts",
+        "ALTER TABLE videos ADD COLUMN search_key INTEGER",
+        "UPDATE videos SET search_key = rowid",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_videos_search_key ON videos(search_key)",
+        "ALTER TABLE scenes ADD COLUMN search_key INTEGER",
+        "UPDATE scenes SET search_key = rowid",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_scenes_search_key ON scenes(search_key)",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5(
+            title, script,
+            content='videos', content_rowid='search_key',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS scene_fts USING fts5(
+            visual_description,
+            content='scenes', content_rowid='search_key',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        # New rows take the next key, then get indexed under it
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_fts_insert AFTER INSERT ON videos
+        BEGIN
+            UPDATE videos SET search_key = (SELECT COALESCE(MAX(search_key), 0) + 1 FROM videos)
+            WHERE rowid = NEW.rowid;
+            INSERT INTO video_fts (rowid, title, script)
+            SELECT search_key, title, script FROM videos WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_fts_delete AFTER DELETE ON videos
+        BEGIN
+            INSERT INTO video_fts (video_fts, rowid, title, script)
+            VALUES ('delete', OLD.search_key, OLD.title, OLD.script);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_videos_fts_update AFTER UPDATE OF title, script ON videos
+        BEGIN
+            INSERT INTO video_fts (video_fts, rowid, title, script)
+            VALUES ('delete', OLD.search_key, OLD.title, OLD.script);
+            INSERT INTO video_fts (rowid, title, script) VALUES (NEW.search_key, NEW.title, NEW.script);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_fts_insert AFTER INSERT ON scenes
+        BEGIN
+            UPDATE scenes SET search_key = (SELECT COALESCE(MAX(search_key), 0) + 1 FROM scenes)
+            WHERE rowid = NEW.rowid;
+            INSERT INTO scene_fts (rowid, visual_description)
+            SELECT search_key, visual_description FROM scenes WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_fts_delete AFTER DELETE ON scenes
+        BEGIN
+            INSERT INTO scene_fts (scene_fts, rowid, visual_description)
+            VALUES ('delete', OLD.search_key, OLD.visual_description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_fts_update AFTER UPDATE OF visual_description ON scenes
+        BEGIN
+            INSERT INTO scene_fts (scene_fts, rowid, visual_description)
+            VALUES ('delete', OLD.search_key, OLD.visual_description);
+            INSERT INTO scene_fts (rowid, visual_description) VALUES (NEW.search_key, NEW.visual_description);
+        END
+        """,
+        "INSERT INTO video_fts (video_fts) VALUES ('rebuild')",
+        "INSERT INTO scene_fts (scene_fts) VALUES ('rebuild')",
+    )),
+    (10, "millisecond change stamps", (
+        # Second-resolution stamps can't order a scene edit against a checkpoint in the same second
+        "DROP TRIGGER IF EXISTS trg_scenes_touch_insert",
+        "DROP TRIGGER IF EXISTS trg_scenes_touch_update",
+        "DROP TRIGGER IF EXISTS trg_images_touch_insert",
+        "DROP TRIGGER IF EXISTS trg_images_touch_update",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_touch_insert AFTER INSERT ON scenes
+        BEGIN
+            UPDATE scenes SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_scenes_touch_update
+        AFTER UPDATE OF scene_number, visual_description, video_id ON scenes
+        BEGIN
+            UPDATE scenes SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_touch_insert AFTER INSERT ON images
+        BEGIN
+            UPDATE images SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE rowid = NEW.rowid;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_images_touch_update
+        AFTER UPDATE OF status, scene_id, image_path ON images
+        BEGIN
+            UPDATE images SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE rowid = NEW.rowid;
+        END
+        """,
+    )),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> List[int]:
+    """
+    Apply pending migrations, one transaction per version.
+    No DDL runs when the schema is already current.
+
+    Returns:
+        List of versions applied by this call
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        # Take the write lock before re-checking so concurrent processes don't race
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("Applied migration %d: %s", version, description)
+        applied.append(version)
+
+    return applied
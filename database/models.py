@@ -1,8 +1,37 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import base64
+import json
 import uuid
-from datetime import datetime, timedelta
 import hashlib
+import time
+import os
+from . import prefetch
+from .cache import LRUCache
 from .connection import db_connection
+from .records import (
+    ImageRecord, OutboxMessage, SceneRecord, UserRecord, VideoRecord, VideoSearchHit, VideoSummary, fetch_all,
+    fetch_one,
+)
+from .search import build_match_query
+
+
+# Identity lookups repeat on every login/restore step; rows are cached under
+# ("id", user_id) and ("email", email). Misses are never cached; records are
+# immutable, so cached rows are handed out without copying.
+user_cache = LRUCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "300")),
+)
+
+
+def _cache_user(row: UserRecord, generation: int) -> None:
+    user_cache.put(("id", row["user_id"]), row, if_generation=generation)
+    user_cache.put(("email", row["email"]), row, if_generation=generation)
+
+
+def _invalidate_user(user_id: str, email: Optional[str] = None) -> None:
+    user_cache.invalidate_items(lambda key, row: row["user_id"] == user_id or key == ("email", email))
+
 
 class UserModel:
     """User data access layer"""
@@ -17,30 +46,82 @@ class UserModel:
                 "INSERT INTO users (user_id, email, user_name) VALUES (?, ?, ?)",
                 (user_id, email, user_name)
             )
+        _invalidate_user(user_id, email)
         
         return {"user_id": user_id, "email": email, "user_name": user_name}
 
     @staticmethod
-    def find_by_email(email: str) -> Optional[Dict[str, Any]]:
-        """Find user by email"""
+    def find_by_email(email: str) -> Optional[UserRecord]:
+        """Find user by email (cached)"""
+        cached = user_cache.get(("email", email))
+        if cached is not None:
+            return cached
+        
+        generation = user_cache.generation
         with db_connection.get_connection() as conn:
-            result = conn.execute(
-                "SELECT * FROM users WHERE email = ?",
+            row = fetch_one(
+                conn, UserRecord,
+                f"SELECT {UserRecord.SELECT} FROM users WHERE email = ?",
                 (email,)
-            ).fetchone()
+            )
         
-        return dict(result) if result else None
+        if row is not None:
+            _cache_user(row, generation)
+        return row
     
     @staticmethod
-    def find_by_id(user_id: str) -> Optional[Dict[str, Any]]:
-        """Find user by ID"""
+    def find_by_id(user_id: str) -> Optional[UserRecord]:
+        """Find user by ID (cached)"""
+        cached = user_cache.get(("id", user_id))
+        if cached is not None:
+            return cached
+        
+        generation = user_cache.generation
         with db_connection.get_connection() as conn:
-            result = conn.execute(
-                "SELECT * FROM users WHERE user_id = ?",
+            row = fetch_one(
+                conn, UserRecord,
+                f"SELECT {UserRecord.SELECT} FROM users WHERE user_id = ?",
                 (user_id,)
-            ).fetchone()
+            )
         
-        return dict(result) if result else None
+        if row is not None:
+            _cache_user(row, generation)
+        return row
+
+    @staticmethod
+    def add_cost(user_id: str, amount: float) -> None:
+        """Add to the user's spend for the current month"""
+        with db_connection.get_connection() as conn:
+            conn.execute(
+                "UPDATE users SET current_month_cost = current_month_cost + ? WHERE user_id = ?",
+                (amount, user_id)
+            )
+        _invalidate_user(user_id)
+        prefetch.invalidate_user(user_id)
+
+    @staticmethod
+    def set_plan_tier(user_id: str, plan_tier: str) -> None:
+        """Change the user's plan ('free', 'basic', 'pro')"""
+        with db_connection.get_connection() as conn:
+            conn.execute(
+                "UPDATE users SET plan_tier = ? WHERE user_id = ?",
+                (plan_tier, user_id)
+            )
+        _invalidate_user(user_id)
+
+
+def encode_video_cursor(updated_at: str, video_id: str) -> str:
+    """Opaque page cursor for the menu listing"""
+    return base64.urlsafe_b64encode(json.dumps([updated_at, video_id]).encode()).decode()
+
+
+def decode_video_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_video_cursor (ValueError if the cursor is malformed)"""
+    try:
+        updated_at, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(updated_at), str(video_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
 
 
 class VideoModel:
@@ -60,6 +141,7 @@ class VideoModel:
                 """,
                 (video_id, user_id, title)
             )
+        prefetch.invalidate_user(user_id)
         
         return {
             "video_id": video_id,
@@ -68,10 +150,465 @@ class VideoModel:
             "status": "in_progress"
         }
 
+    @staticmethod
+    def get_by_id(video_id: str) -> Optional[VideoRecord]:
+        """Find video by ID"""
+        with db_connection.get_connection() as conn:
+            return fetch_one(
+                conn, VideoRecord,
+                f"SELECT {VideoRecord.SELECT} FROM videos WHERE video_id = ?",
+                (video_id,)
+            )
+
+    @staticmethod
+    def get_for_user(video_id: str, user_id: str) -> Optional[VideoRecord]:
+        """Find video by ID, only if it belongs to the user"""
+        with db_connection.get_connection() as conn:
+            return fetch_one(
+                conn, VideoRecord,
+                f"SELECT {VideoRecord.SELECT} FROM videos WHERE video_id = ? AND user_id = ?",
+                (video_id, user_id)
+            )
+
+    @staticmethod
+    def find_for_user_by_title(user_id: str, title: str) -> List[VideoSummary]:
+        """User's videos whose title matches (case-insensitive), most recent first"""
+        with db_connection.get_connection() as conn:
+            return fetch_all(
+                conn, VideoSummary,
+                f"""
+                SELECT {VideoSummary.SELECT}
+                FROM videos
+                WHERE user_id = ? AND title = ? COLLATE NOCASE
+                ORDER BY updated_at DESC
+                """,
+                (user_id, title.strip())
+            )
+
+    @staticmethod
+    def search_for_user(user_id: str, query: str, limit: int = 5) -> List[VideoSearchHit]:
+        """
+        Rank a user's videos against free text (title > script > scene descriptions).
+        
+        Returns:
+            Best matches first, each with the best matching scene (if any) and a snippet
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+        with db_connection.get_connection() as conn:
+            return fetch_all(
+                conn, VideoSearchHit,
+                """
+                WITH hits AS (
+                    -- CROSS JOIN keeps this order: the user's own rows first, then an
+                    -- FTS probe per row, so other users' documents are never matched
+                    SELECT v.video_id, bm25(video_fts, 10.0, 1.0) AS score,
+                           NULL AS scene_number, snippet(video_fts, -1, '[', ']', '...', 8) AS snippet
+                    FROM videos v
+                    CROSS JOIN video_fts
+                    WHERE v.user_id = ? AND video_fts.rowid = v.search_key AND video_fts MATCH ?
+                    UNION ALL
+                    SELECT s.video_id, bm25(scene_fts) * 0.5 AS score,
+                           s.scene_number, snippet(scene_fts, 0, '[', ']', '...', 8) AS snippet
+                    FROM videos v
+                    CROSS JOIN scenes s
+                    CROSS JOIN scene_fts
+                    WHERE v.user_id = ? AND s.video_id = v.video_id
+                      AND scene_fts.rowid = s.search_key AND scene_fts MATCH ?
+                )
+                SELECT v.video_id, v.title, v.status, v.updated_at, v.scene_count,
+                       MIN(h.score) AS score, h.scene_number AS matched_scene, h.snippet
+                FROM hits h
+                JOIN videos v ON v.video_id = h.video_id
+                GROUP BY v.video_id
+                ORDER BY score
+                LIMIT ?
+                """,
+                (user_id, match, user_id, match, limit)
+            )
+
+    @staticmethod
+    def list_for_user(user_id: str, limit: int = 10, cursor: Optional[str] = None) -> List[VideoSummary]:
+        """Most recently updated videos for a user, with scene and approved image counts"""
+        return VideoModel.list_page(user_id, limit, cursor)["videos"]
+
+    @staticmethod
+    def list_page(user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of a user's videos, newest first (keyset pagination).
+        
+        Args:
+            user_id: Owner
+            limit: Page size
+            cursor: next_cursor from the previous page ("" or None for the first page)
+            
+        Returns:
+            dict with videos (VideoSummary records) and next_cursor (None on the last page)
+        """
+        after = decode_video_cursor(cursor) if cursor else None
+        with db_connection.get_connection() as conn:
+            if after is None:
+                rows = fetch_all(
+                    conn, VideoSummary,
+                    f"""
+                    SELECT {VideoSummary.SELECT}
+                    FROM videos
+                    WHERE user_id = ?
+                    ORDER BY updated_at DESC, video_id DESC
+                    LIMIT ?
+                    """,
+                    (user_id, limit + 1)
+                )
+            else:
+                rows = fetch_all(
+                    conn, VideoSummary,
+                    f"""
+                    SELECT {VideoSummary.SELECT}
+                    FROM videos
+                    WHERE user_id = ?
+                    AND (updated_at, video_id) < (?, ?)
+                    ORDER BY updated_at DESC, video_id DESC
+                    LIMIT ?
+                    """,
+                    (user_id, after[0], after[1], limit + 1)
+                )
+        
+        videos = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = videos[-1]
+            next_cursor = encode_video_cursor(last["updated_at"], last["video_id"])
+        return {"videos": videos, "next_cursor": next_cursor}
+
+    @staticmethod
+    def update_last_session(video_id: str, session_id: str) -> None:
+        """Update video's last_session_id"""
+        with db_connection.get_connection() as conn:
+            conn.execute(
+                "UPDATE videos SET last_session_id = ? WHERE video_id = ?",
+                (session_id, video_id)
+            )
+        prefetch.invalidate_video(video_id)
+
+
+def _charge_video(conn, video_id: str, images_added: int, cost: float) -> Optional[str]:
+    """
+    Add generated images and their cost to the video (and the owner's monthly
+    spend) inside the caller's transaction. Returns the owner's user_id.
+    """
+    row = conn.execute("SELECT user_id FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Video {video_id} not found")
+    if images_added or cost:
+        conn.execute(
+            """
+            UPDATE videos
+            SET images_generated_count = images_generated_count + ?, total_cost = total_cost + ?
+            WHERE video_id = ?
+            """,
+            (images_added, cost, video_id)
+        )
+    if cost:
+        conn.execute(
+            "UPDATE users SET current_month_cost = current_month_cost + ? WHERE user_id = ?",
+            (cost, row["user_id"])
+        )
+    return row["user_id"]
+
+
+class SceneModel:
+    """Scene data access layer (bulk writes, one transaction each)"""
+    
+    UPSERT_SQL = """
+        INSERT INTO scenes (scene_id, video_id, scene_number, visual_description, voiceover)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(video_id, scene_number) DO UPDATE SET
+            visual_description = excluded.visual_description,
+            voiceover = excluded.voiceover
+    """
+    
+    @staticmethod
+    def _rows(video_id: str, scenes: List[Dict[str, Any]]) -> List[tuple]:
+        return [
+            (
+                scene.get("scene_id") or str(uuid.uuid4()),
+                video_id,
+                scene["scene_number"],
+                scene["visual_description"],
+                scene.get("voiceover"),
+            )
+            for scene in scenes
+        ]
+    
+    @staticmethod
+    def bulk_create(video_id: str, scenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert many scenes at once.
+        
+        Args:
+            video_id: Owning video
+            scenes: dicts with scene_number, visual_description and optional voiceover/scene_id
+            
+        Returns:
+            The inserted scenes with their scene_id
+        """
+        rows = SceneModel._rows(video_id, scenes)
+        with db_connection.get_connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO scenes (scene_id, video_id, scene_number, visual_description, voiceover)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+        prefetch.invalidate_video(video_id)
+        
+        return [
+            {"scene_id": r[0], "video_id": r[1], "scene_number": r[2], "visual_description": r[3], "voiceover": r[4]}
+            for r in rows
+        ]
+    
+    @staticmethod
+    def upsert_many(video_id: str, scenes: List[Dict[str, Any]]) -> Dict[int, str]:
+        """
+        Insert or update scenes by scene_number (existing scenes keep their scene_id).
+        
+        Returns:
+            scene_number -> scene_id for the given scenes
+        """
+        with db_connection.get_connection() as conn:
+            conn.executemany(SceneModel.UPSERT_SQL, SceneModel._rows(video_id, scenes))
+            ids = SceneModel._ids_for(conn, video_id, [scene["scene_number"] for scene in scenes])
+        prefetch.invalidate_video(video_id)
+        return ids
+    
+    @staticmethod
+    def save_script(video_id: str, script: str, scenes: List[Dict[str, Any]]) -> Dict[int, str]:
+        """
+        Store a whole script in one commit: the script text, every scene
+        (upserted by number) and removal of scenes the new script no longer has.
+        
+        Returns:
+            scene_number -> scene_id
+        """
+        numbers = [scene["scene_number"] for scene in scenes]
+        with db_connection.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE videos SET script = ? WHERE video_id = ?", (script, video_id))
+            conn.executemany(SceneModel.UPSERT_SQL, SceneModel._rows(video_id, scenes))
+            dropped = f"video_id = ? AND scene_number NOT IN ({','.join('?' * len(numbers))})"
+            # Foreign keys are not enforced, so the dropped scenes' images go first
+            # (while their scene still maps them to this video's counters)
+            conn.execute(
+                f"DELETE FROM images WHERE scene_id IN (SELECT scene_id FROM scenes WHERE {dropped})",
+                (video_id, *numbers)
+            )
+            conn.execute(f"DELETE FROM scenes WHERE {dropped}", (video_id, *numbers))
+            ids = SceneModel._ids_for(conn, video_id, numbers)
+        prefetch.invalidate_video(video_id)
+        return ids
+    
+    @staticmethod
+    def _ids_for(conn, video_id: str, numbers: List[int]) -> Dict[int, str]:
+        wanted = set(numbers)
+        rows = conn.execute(
+            "SELECT scene_number, scene_id FROM scenes WHERE video_id = ? ORDER BY scene_number",
+            (video_id,)
+        ).fetchall()
+        return {row["scene_number"]: row["scene_id"] for row in rows if row["scene_number"] in wanted}
+    
+    @staticmethod
+    def list_for_video(video_id: str) -> List[SceneRecord]:
+        """All scenes of a video in order"""
+        with db_connection.get_connection() as conn:
+            return fetch_all(
+                conn, SceneRecord,
+                f"""
+                SELECT {SceneRecord.SELECT}
+                FROM scenes
+                WHERE video_id = ?
+                ORDER BY scene_number
+                """,
+                (video_id,)
+            )
+
+
+class ImageModel:
+    """Image data access layer (bulk writes keep the video's counters in the same commit)"""
+    
+    # target status -> statuses it may be reached from
+    TRANSITIONS = {
+        "approved": ("pending",),
+        "rejected": ("pending", "approved"),
+    }
+    
+    @staticmethod
+    def _row(image: Dict[str, Any]) -> tuple:
+        return (
+            image.get("image_id") or str(uuid.uuid4()),
+            image["scene_id"],
+            image["image_path"],
+            image.get("clip_path"),
+            1 if image.get("is_character_reference") else 0,
+            image.get("status", "pending"),
+            image.get("attempt_number"),
+            image["scene_id"],
+            image.get("rejected_reason"),
+            float(image.get("generation_cost") or 0.0),
+        )
+    
+    @staticmethod
+    def bulk_create(video_id: str, images: List[Dict[str, Any]]) -> List[str]:
+        """
+        Insert a batch of generated images and charge them to the video in one commit.
+        attempt_number defaults to the scene's next attempt.
+        
+        Args:
+            video_id: Video the scenes belong to
+            images: dicts with scene_id, image_path and optional generation_cost, status,
+                    attempt_number, is_character_reference, clip_path, image_id
+            
+        Returns:
+            image_ids in input order
+        """
+        rows = [ImageModel._row(image) for image in images]
+        with db_connection.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                """
+                INSERT INTO images (
+                    image_id, scene_id, image_path, clip_path, is_character_reference, status,
+                    attempt_number, rejected_reason, generation_cost
+                )
+                VALUES (?, ?, ?, ?, ?, ?,
+                        COALESCE(?, (SELECT COUNT(*) + 1 FROM images WHERE scene_id = ?)), ?, ?)
+                """,
+                rows
+            )
+            user_id = _charge_video(conn, video_id, len(rows), sum(r[9] for r in rows))
+        _invalidate_user(user_id)
+        prefetch.invalidate_video(video_id)
+        prefetch.invalidate_user(user_id)
+        
+        return [r[0] for r in rows]
+    
+    @staticmethod
+    def upsert_many(video_id: str, images: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Insert or update images by image_id. Only new images count towards
+        images_generated_count; cost changes are charged as a delta.
+        An existing image keeps its status unless one is passed, and then only
+        via a valid transition (see set_statuses).
+        
+        Returns:
+            dict with inserted and updated counts
+        """
+        rows = [ImageModel._row(image) for image in images]
+        ids = [r[0] for r in rows]
+        with db_connection.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            current = {
+                row["image_id"]: row
+                for row in conn.execute(
+                    f"SELECT image_id, status, generation_cost FROM images WHERE image_id IN ({','.join('?' * len(ids))})",
+                    ids
+                )
+            } if ids else {}
+            existing = {image_id: row["generation_cost"] or 0.0 for image_id, row in current.items()}
+            conn.executemany(
+                """
+                INSERT INTO images (
+                    image_id, scene_id, image_path, clip_path, is_character_reference, status,
+                    attempt_number, rejected_reason, generation_cost
+                )
+                VALUES (?, ?, ?, ?, ?, ?,
+                        COALESCE(?, (SELECT COUNT(*) + 1 FROM images WHERE scene_id = ?)), ?, ?)
+                ON CONFLICT(image_id) DO UPDATE SET
+                    scene_id = excluded.scene_id,
+                    image_path = excluded.image_path,
+                    clip_path = COALESCE(excluded.clip_path, images.clip_path),
+                    is_character_reference = excluded.is_character_reference,
+                    generation_cost = excluded.generation_cost
+                """,
+                rows
+            )
+            ImageModel._apply_transitions(conn, [
+                (image["image_id"], image["status"], image.get("rejected_reason"))
+                for image in images
+                if image.get("image_id") in current and image.get("status") not in (None, current[image["image_id"]]["status"])
+            ])
+            inserted = len([image_id for image_id in dict.fromkeys(ids) if image_id not in existing])
+            # Last write per id wins, so charge against the final cost of each id
+            final_cost = {r[0]: r[9] for r in rows}
+            cost_delta = sum(cost - existing.get(image_id, 0.0) for image_id, cost in final_cost.items())
+            user_id = _charge_video(conn, video_id, inserted, cost_delta)
+        _invalidate_user(user_id)
+        prefetch.invalidate_video(video_id)
+        prefetch.invalidate_user(user_id)
+        
+        return {"inserted": inserted, "updated": len(final_cost) - inserted}
+    
+    @staticmethod
+    def set_statuses(changes: List[Tuple[str, str, Optional[str]]]) -> int:
+        """
+        Apply review decisions in one commit.
+        
+        Args:
+            changes: (image_id, new_status, rejected_reason) - new_status is
+                     'approved' (from pending) or 'rejected' (from pending/approved)
+            
+        Returns:
+            Number of images whose status changed (invalid transitions are skipped)
+        """
+        with db_connection.get_connection() as conn:
+            changed = ImageModel._apply_transitions(conn, changes)
+        if changed:
+            # Only image ids are known here - drop every warm video result
+            prefetch.invalidate_all()
+        return changed
+    
+    @staticmethod
+    def _apply_transitions(conn, changes: List[Tuple[str, str, Optional[str]]]) -> int:
+        """Status updates allowed by TRANSITIONS, on the caller's connection (ValueError for unknown targets)"""
+        by_status: Dict[str, List[tuple]] = {}
+        for image_id, status, reason in changes:
+            if status not in ImageModel.TRANSITIONS:
+                raise ValueError(f"Cannot move an image to status {status!r}")
+            by_status.setdefault(status, []).append(
+                (status, reason if status == "rejected" else None, image_id)
+            )
+        
+        changed = 0
+        for status, rows in by_status.items():
+            allowed = ImageModel.TRANSITIONS[status]
+            cursor = conn.executemany(
+                f"""
+                UPDATE images SET status = ?, rejected_reason = ?
+                WHERE image_id = ? AND status IN ({','.join('?' * len(allowed))})
+                """,
+                [row + allowed for row in rows]
+            )
+            changed += cursor.rowcount
+        return changed
+    
+    @staticmethod
+    def list_for_scene(scene_id: str) -> List[ImageRecord]:
+        """Every attempt for a scene, oldest first"""
+        with db_connection.get_connection() as conn:
+            return fetch_all(
+                conn, ImageRecord,
+                f"SELECT {ImageRecord.SELECT} FROM images WHERE scene_id = ? ORDER BY attempt_number",
+                (scene_id,)
+            )
+
 
 class VerificationTokenModel:
     """Manage email verification tokens"""
     
+    TOKEN_TTL_SECONDS = 3600
+    SWEEP_CHUNK_SIZE = 500
+    
     @staticmethod
     def create_token(email: str) -> str:
         """
@@ -85,14 +622,14 @@ class VerificationTokenModel:
             token: UUID token string
         """
         token = str(uuid.uuid4())
-        expires_at = datetime.utcnow() + timedelta(hours=1)
+        expires_at = int(time.time()) + VerificationTokenModel.TOKEN_TTL_SECONDS
         with db_connection.get_connection() as conn:
             conn.execute(
                 """
                 INSERT INTO verification_tokens (token, email, expires_at)
                 VALUES (?, ?, ?)
                 """,
-                (token, email, expires_at.isoformat())
+                (token, email, expires_at)
             )
         
         return token
@@ -101,7 +638,7 @@ class VerificationTokenModel:
     def verify_token(token: str) -> Optional[str]:
         """
         Verify a token and return the associated email if valid.
-        Marks token as used after successful verification.
+        Consumes the token in the same statement, so it can only succeed once.
         
         Args:
             token: UUID token string
@@ -109,46 +646,178 @@ class VerificationTokenModel:
         Returns:
             email if token is valid, None otherwise
         """
+        now = int(time.time())
         with db_connection.get_connection() as conn:
-            # Check if token exists, not used, and not expired
+            # Consumed tokens expire now, so the next sweep removes them
             result = conn.execute(
                 """
-                SELECT email FROM verification_tokens
+                UPDATE verification_tokens
+                SET used = 1, expires_at = ?
                 WHERE token = ?
                 AND used = 0
-                AND datetime(expires_at) > datetime('now')
+                AND expires_at > ?
+                RETURNING email
                 """,
-                (token,)
+                (now, token, now)
             ).fetchone()
-            
-            if result:
-                email = result["email"]
-                
-                # Mark token as used
-                conn.execute(
-                    "UPDATE verification_tokens SET used = 1 WHERE token = ?",
-                    (token,)
+        
+        return result["email"] if result else None
+    
+    @staticmethod
+    def delete_expired_chunk(now: Optional[int] = None, limit: int = SWEEP_CHUNK_SIZE) -> int:
+        """Delete up to `limit` expired or consumed tokens in one short transaction"""
+        now = int(time.time()) if now is None else now
+        with db_connection.get_connection() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM verification_tokens
+                WHERE rowid IN (
+                    SELECT rowid FROM verification_tokens
+                    WHERE expires_at < ?
+                    LIMIT ?
                 )
-                
-                return email
-            
-            return None
+                """,
+                (now, limit)
+            )
+            return cursor.rowcount
     
     @staticmethod
-    def cleanup_expired_tokens() -> int:
+    def cleanup_expired_tokens(chunk_size: int = SWEEP_CHUNK_SIZE) -> int:
         """
-        Delete expired tokens from database.
-        Run periodically to keep table clean.
+        Delete expired (and consumed) tokens, chunk by chunk.
+        database/maintenance.py runs this periodically.
         
         Returns:
             Number of tokens deleted
         """
+        now = int(time.time())
+        total = 0
+        while True:
+            deleted = VerificationTokenModel.delete_expired_chunk(now, chunk_size)
+            total += deleted
+            if deleted < chunk_size:
+                return total
+
+
+class EmailOutboxModel:
+    """Persistent queue of outgoing emails (delivered by services/email_outbox.py)"""
+
+    # Longer than any batch takes to send; a sender that crashed mid-batch
+    # gets its messages back in the queue once this runs out
+    LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "600"))
+
+    @staticmethod
+    def enqueue(recipient: str, subject: str, text_body: str, html_body: Optional[str] = None) -> int:
+        """Queue an email for immediate delivery. Returns message_id."""
+        now = time.time()
         with db_connection.get_connection() as conn:
             cursor = conn.execute(
                 """
-                DELETE FROM verification_tokens
-                WHERE datetime(expires_at) < datetime('now')
-                OR used = 1
+                INSERT INTO email_outbox (recipient, subject, text_body, html_body, next_attempt_at, queued_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (recipient, subject, text_body, html_body, now, now)
+            )
+            return cursor.lastrowid
+
+    @staticmethod
+    def claim_due(limit: int = 20, now: Optional[float] = None) -> List[OutboxMessage]:
+        """
+        Atomically move up to `limit` due messages to 'sending' and return them.
+        The claim is leased for LEASE_SECONDS; until then no other sender requeues it.
+        """
+        now = time.time() if now is None else now
+        with db_connection.get_connection() as conn:
+            rows = fetch_all(
+                conn, OutboxMessage,
+                f"""
+                UPDATE email_outbox SET status = 'sending', lease_expires_at = ?
+                WHERE message_id IN (
+                    SELECT message_id FROM email_outbox
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING {OutboxMessage.SELECT}
+                """,
+                (now + EmailOutboxModel.LEASE_SECONDS, now, limit)
+            )
+        
+        # RETURNING order is unspecified
+        return sorted(rows, key=lambda row: row["next_attempt_at"])
+
+    @staticmethod
+    def mark_sent(message_ids: List[int], sent_at: Optional[float] = None) -> None:
+        """Record successful delivery"""
+        sent_at = time.time() if sent_at is None else sent_at
+        with db_connection.get_connection() as conn:
+            conn.executemany(
+                "UPDATE email_outbox SET status = 'sent', attempts = attempts + 1, sent_at = ? WHERE message_id = ?",
+                [(sent_at, message_id) for message_id in message_ids]
+            )
+
+    @staticmethod
+    def mark_retry(message_id: int, next_attempt_at: float, error: str) -> None:
+        """Put a message back in the queue after a failed attempt"""
+        with db_connection.get_connection() as conn:
+            conn.execute(
                 """
+                UPDATE email_outbox
+                SET status = 'pending', attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                WHERE message_id = ?
+                """,
+                (next_attempt_at, error, message_id)
+            )
+
+    @staticmethod
+    def mark_failed(message_id: int, error: str) -> None:
+        """Give up on a message"""
+        with db_connection.get_connection() as conn:
+            conn.execute(
+                "UPDATE email_outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE message_id = ?",
+                (error, message_id)
             )
-            return cursor.rowcount
\ No newline at end of file
+
+    @staticmethod
+    def release(message_ids: List[int], next_attempt_at: float, error: str) -> None:
+        """Put claimed messages back in the queue without spending an attempt (SMTP server unreachable)"""
+        with db_connection.get_connection() as conn:
+            conn.executemany(
+                """
+                UPDATE email_outbox
+                SET status = 'pending', next_attempt_at = ?, last_error = ?
+                WHERE message_id = ? AND status = 'sending'
+                """,
+                [(next_attempt_at, error, message_id) for message_id in message_ids]
+            )
+
+    @staticmethod
+    def requeue_in_flight(now: Optional[float] = None) -> int:
+        """Return messages whose 'sending' lease ran out (e.g. the sender crashed) to the queue"""
+        now = time.time() if now is None else now
+        with db_connection.get_connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE email_outbox SET status = 'pending', lease_expires_at = NULL
+                WHERE status = 'sending' AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+                """,
+                (now,)
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def next_due_at() -> Optional[float]:
+        """When the earliest pending message becomes due (None if the queue is empty)"""
+        with db_connection.get_connection() as conn:
+            row = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM email_outbox WHERE status = 'pending'"
+            ).fetchone()
+        
+        return row[0]
+
+    @staticmethod
+    def count_by_status() -> Dict[str, int]:
+        with db_connection.get_connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall()
+        
+        return {row[0]: row[1] for row in rows}
@@ -0,0 +1,151 @@
+"""
+Login prefetch
+As soon as a returning user is identified, the reads their first turn needs -
+the first page of their video menu, and the record and rebuilt session state
+of the video they were last working on - start on the DB executor. Tools take
+these warm results (waiting for a read still in flight) instead of querying
+again. Any write to a video or user drops what was prefetched for it.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .cache import LRUCache
+
+PREFETCH_ENABLED = os.getenv("LOGIN_PREFETCH", "1") != "0"
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "120"))
+MENU_PAGE_SIZE = 10                                      # list_user_videos_tool's default page
+
+# ("videos", user_id) -> first list_page; ("video", video_id) -> VideoRecord;
+# ("state", video_id, user_id) -> build_state_from_db result (handed out once)
+warm_cache = LRUCache(maxsize=256, ttl_seconds=PREFETCH_TTL_SECONDS)
+_inflight: Dict[Hashable, Tuple[object, Future]] = {}
+_inflight_lock = threading.Lock()
+
+
+def _submit(key: Hashable, func: Callable[..., Any], *args: Any) -> None:
+    """Run func on the DB executor and cache its result under key (unless the key is dropped meanwhile)"""
+    from .async_models import _db_executor
+
+    token = object()
+
+    def fill() -> Any:
+        # Caching happens inside the task, so awaiting the future also waits for it
+        value = None
+        try:
+            value = func(*args)
+            return value
+        finally:
+            with _inflight_lock:
+                # _drop() removes the keys it invalidates, so a read it overtook is not kept
+                current = _inflight.get(key)
+                if current is not None and current[0] is token:
+                    del _inflight[key]
+                    if value is not None:
+                        warm_cache.put(key, value)
+
+    with _inflight_lock:
+        if key in _inflight or warm_cache.get(key) is not None:
+            return
+        _inflight[key] = (token, _db_executor.submit(contextvars.copy_context().run, fill))
+
+
+def start_login_prefetch(user_id: str, video_id: Optional[str] = None) -> None:
+    """
+    Start loading a returning user's menu (and their current video) in the background.
+    Returns immediately; nothing is awaited.
+    """
+    if not PREFETCH_ENABLED:
+        return
+    from .models import VideoModel
+    from .session_helpers import build_state_from_db
+
+    _submit(("videos", user_id), VideoModel.list_page, user_id, MENU_PAGE_SIZE)
+    if video_id:
+        _submit(("video", video_id), VideoModel.get_for_user, video_id, user_id)
+        _submit(("state", video_id, user_id), build_state_from_db, video_id, user_id)
+
+
+async def _warm(key: Hashable, take: bool = False) -> Optional[Any]:
+    """The prefetched value for key, waiting if its read is still running; None if not prefetched"""
+    # One look under the lock: a fill moves its key from _inflight to the cache
+    # atomically, so it cannot slip between the two lookups
+    with _inflight_lock:
+        value = warm_cache.pop(key) if take else warm_cache.get(key)
+        entry = _inflight.get(key) if value is None else None
+    if value is not None:
+        return value
+    if entry is None:
+        return None
+    try:
+        await asyncio.wrap_future(entry[1])
+    except Exception:
+        return None                                      # The caller reads it normally and sees the error
+    # The fill has cached the value by now, unless a write dropped the key meanwhile
+    return warm_cache.pop(key) if take else warm_cache.get(key)
+
+
+# === Warm results for tools ===
+
+async def warm_menu_page(user_id: str, limit: int) -> Optional[Dict[str, Any]]:
+    """First page of the user's videos in list_page's shape, if prefetched and big enough"""
+    from .models import encode_video_cursor
+
+    page = await _warm(("videos", user_id))
+    if page is None:
+        return None
+    videos = page["videos"]
+    if limit >= MENU_PAGE_SIZE:
+        # A bigger page can only be served if the prefetch already saw every video
+        return page if limit == MENU_PAGE_SIZE or page["next_cursor"] is None else None
+    if len(videos) <= limit:
+        return {"videos": videos, "next_cursor": None}
+    last = videos[limit - 1]
+    return {"videos": videos[:limit], "next_cursor": encode_video_cursor(last["updated_at"], last["video_id"])}
+
+
+async def warm_video(video_id: str, user_id: str) -> Optional[Any]:
+    """Prefetched VideoRecord, only if it belongs to user_id"""
+    video = await _warm(("video", video_id))
+    return video if video is not None and video["user_id"] == user_id else None
+
+
+async def take_warm_state(video_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """Prefetched build_state_from_db result; each one is handed out once"""
+    return await _warm(("state", video_id, user_id), take=True)
+
+
+# === Invalidation (called by the models after writes) ===
+
+def _drop(predicate: Callable[[Hashable], bool]) -> None:
+    """Forget matching warm results; matching reads still running will not be cached"""
+    with _inflight_lock:
+        for key in [key for key in _inflight if predicate(key)]:
+            del _inflight[key]
+        warm_cache.invalidate_where(predicate)
+
+
+def invalidate_video(video_id: str) -> None:
+    """A video, its scenes, images or checkpoint changed (menu order and counts may too)"""
+    _drop(lambda key: key[0] == "videos" or key[1] == video_id)
+
+
+def invalidate_user(user_id: str) -> None:
+    """The user's videos or costs changed"""
+    _drop(lambda key: key == ("videos", user_id) or (key[0] == "state" and key[2] == user_id))
+
+
+def invalidate_all() -> None:
+    """A write that cannot be traced to one video (e.g. image review by image_id)"""
+    _drop(lambda key: True)
+
+
+def prefetch_stats() -> Dict[str, Any]:
+    stats = warm_cache.stats()
+    with _inflight_lock:
+        stats["inflight"] = len(_inflight)
+    return stats
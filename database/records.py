@@ -0,0 +1,162 @@
+"""
+Compact row types
+Tuple-backed records used in place of dict(row): one slot per selected column
+and no per-row key storage. They read like the dicts they replace
+(record["title"], record.get("title"), "title" in record, dict(record)) and
+are immutable; to_dict() is for tools and session state that need plain JSON.
+"""
+
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
+
+R = TypeVar("R", bound="Record")
+
+
+class Record(tuple):
+    """
+    Base row type. Subclasses list their columns in COLUMNS, in SELECT order,
+    and get an attribute per column plus SELECT (the comma-joined column list).
+
+    Iterating a record yields values, like any tuple; use keys()/items() for names.
+    """
+
+    __slots__ = ()
+    COLUMNS: Tuple[str, ...] = ()
+    SELECT = ""
+    _INDEX: Dict[str, int] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls._INDEX = {name: i for i, name in enumerate(cls.COLUMNS)}
+        cls.SELECT = ", ".join(cls.COLUMNS)
+        for i, name in enumerate(cls.COLUMNS):
+            setattr(cls, name, property(itemgetter(i)))
+
+    # === Construction ===
+
+    @classmethod
+    def of(cls: Type[R], **fields: Any) -> R:
+        """Build a record from keyword values (missing columns are None)"""
+        unknown = set(fields) - set(cls.COLUMNS)
+        if unknown:
+            raise TypeError(f"{cls.__name__} has no column(s) {sorted(unknown)}")
+        return tuple.__new__(cls, [fields.get(name) for name in cls.COLUMNS])
+
+    @classmethod
+    def row_factory(cls: Type[R], cursor: Any, row: tuple) -> R:
+        """sqlite3 row_factory: builds the record straight from the raw row tuple"""
+        return tuple.__new__(cls, row)
+
+    # === Mapping-style access ===
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, str):
+            try:
+                return tuple.__getitem__(self, self._INDEX[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._INDEX
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._INDEX.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.COLUMNS
+
+    def values(self) -> Tuple[Any, ...]:
+        return tuple(self)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self.COLUMNS, self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.COLUMNS, self))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.COLUMNS, self))
+        return f"{type(self).__name__}({fields})"
+
+
+def fetch_all(conn: Any, record_type: Type[R], sql: str, params: Sequence[Any] = ()) -> List[R]:
+    """Run a SELECT whose columns are record_type.COLUMNS (in order) and return records"""
+    cursor = conn.cursor()
+    cursor.row_factory = record_type.row_factory
+    return cursor.execute(sql, params).fetchall()
+
+
+def fetch_one(conn: Any, record_type: Type[R], sql: str, params: Sequence[Any] = ()) -> Optional[R]:
+    """Like fetch_all, for a single row (None if there is none)"""
+    cursor = conn.cursor()
+    cursor.row_factory = record_type.row_factory
+    return cursor.execute(sql, params).fetchone()
+
+
+# === Row types (columns match the migrated schema) ===
+
+class UserRecord(Record):
+    __slots__ = ()
+    COLUMNS = ("user_id", "email", "user_name", "current_month_cost", "plan_tier", "created_at")
+
+
+class VideoRecord(Record):
+    __slots__ = ()
+    COLUMNS = (
+        "video_id", "user_id", "last_session_id", "title", "script", "video_path",
+        "voiceover_path", "thumbnail_path", "total_cost", "images_generated_count",
+        "status", "created_at", "updated_at", "scene_count", "approved_image_count", "search_key",
+    )
+
+
+class VideoSummary(Record):
+    """Menu listing row (answered from idx_videos_user_updated alone)"""
+    __slots__ = ()
+    COLUMNS = ("video_id", "title", "status", "created_at", "updated_at", "scene_count", "approved_image_count")
+
+
+class VideoSearchHit(Record):
+    __slots__ = ()
+    COLUMNS = ("video_id", "title", "status", "updated_at", "scene_count", "score", "matched_scene", "snippet")
+
+
+class SceneRecord(Record):
+    __slots__ = ()
+    COLUMNS = (
+        "scene_id", "video_id", "scene_number", "visual_description", "voiceover", "created_at", "updated_at",
+        "search_key",
+    )
+
+
+class SceneSummary(Record):
+    """Scene number and the first 120 characters of its prompt"""
+    __slots__ = ()
+    COLUMNS = ("scene_number", "short_prompt")
+
+
+class ImageRecord(Record):
+    __slots__ = ()
+    COLUMNS = (
+        "image_id", "scene_id", "image_path", "clip_path", "is_character_reference", "status",
+        "attempt_number", "rejected_reason", "generation_cost", "created_at", "updated_at",
+    )
+
+
+class ApprovedImage(Record):
+    __slots__ = ()
+    COLUMNS = ("scene_number", "image_path")
+
+
+class CheckpointRecord(Record):
+    __slots__ = ()
+    COLUMNS = ("video_id", "next_scene", "current_batch", "character_reference_path", "session_cost", "last_updated_at")
+
+
+class OutboxMessage(Record):
+    """A claimed email_outbox row: what the sender needs to deliver or retry it"""
+    __slots__ = ()
+    COLUMNS = (
+        "message_id", "recipient", "subject", "text_body", "html_body", "attempts", "next_attempt_at", "queued_at",
+    )
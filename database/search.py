@@ -0,0 +1,67 @@
+"""
+Full-text search helpers
+video_fts (title, script) and scene_fts (visual_description) are external-content
+FTS5 tables keyed on the search_key column of videos and scenes (not their
+implicit rowids, which VACUUM may renumber), kept in sync by triggers.
+`python -m database.search` checks the index and rebuilds it if needed.
+"""
+
+import argparse
+import re
+import sqlite3
+from typing import Optional
+
+FTS_TABLES = ("video_fts", "scene_fts")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turn free user text into a safe FTS5 query: every word must match,
+    the last one as a prefix ("robot que" finds "Robot Quest").
+
+    Returns:
+        MATCH expression, or None if the text has no searchable words
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]]
+    terms.append(f'"{words[-1]}"*')
+    return " ".join(terms)
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    """Re-index both FTS tables from their content tables (caller commits)"""
+    for table in FTS_TABLES:
+        conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+
+
+def check_search_index(conn: sqlite3.Connection) -> bool:
+    """True if both FTS indexes match their content tables"""
+    try:
+        for table in FTS_TABLES:
+            conn.execute(f"INSERT INTO {table} ({table}, rank) VALUES ('integrity-check', 1)")
+    except sqlite3.DatabaseError:
+        return False
+    return True
+
+
+def main() -> None:
+    from .connection import db_connection
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the Continuity search index")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if the index looks consistent")
+    args = parser.parse_args()
+
+    with db_connection.get_connection() as conn:
+        healthy = check_search_index(conn)
+        print(f"Search index {'consistent' if healthy else 'OUT OF SYNC'}")
+        if args.rebuild or not healthy:
+            rebuild_search_index(conn)
+            print("Search index rebuilt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+ADK session history compaction
+Folds old events of DatabaseSessionService sessions into a short summary kept in
+session state, keeps the most recent events verbatim and vacuums the session DB.
+
+Offline usage:
+    python -m database.session_compaction --db adk_sessions.db --keep 50
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+ADK_SESSION_DB_PATH = os.getenv("ADK_SESSION_DB_PATH", "adk_sessions.db")
+
+DEFAULT_KEEP_EVENTS = 50                 # Events kept verbatim per session
+COMPACT_THRESHOLD = 200                  # Only compact sessions with more events than this
+SUMMARY_LINE_CHARS = 160
+SUMMARY_MAX_LINES = 40
+
+# Session-scoped state keys written by compaction
+SUMMARY_STATE_KEY = "history_summary"
+COMPACTED_COUNT_STATE_KEY = "history_compacted_events"
+
+
+def _event_line(author: str, content: Optional[str]) -> Optional[str]:
+    """One summary line for an event: its text parts, or the tool it called"""
+    if not content:
+        return None
+    try:
+        parts = json.loads(content).get("parts") or []
+    except (ValueError, AttributeError):
+        return None
+
+    texts = []
+    for part in parts:
+        if part.get("text"):
+            texts.append(" ".join(part["text"].split()))
+        elif part.get("function_call"):
+            texts.append(f"[called {part['function_call'].get('name')}]")
+    if not texts:
+        return None
+    return f"{author}: {' '.join(texts)}"[:SUMMARY_LINE_CHARS]
+
+
+def _db_bytes(conn: sqlite3.Connection) -> int:
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def compact_session(
+    conn: sqlite3.Connection,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    keep_events: int = DEFAULT_KEEP_EVENTS,
+) -> Dict[str, int]:
+    """
+    Fold all but the last `keep_events` events of one session into its state.
+
+    The kept window always starts at a user message (moving back, so it may
+    hold more than `keep_events`), so a tool call is never separated from its
+    response. A session with no user message to cut at is left alone. Session state already holds every applied
+    state delta, so only the conversational text needs summarizing.
+
+    Returns:
+        dict with events_removed and bytes_removed (event payload bytes)
+    """
+    rows = conn.execute(
+        """
+        SELECT id, author, content, length(content) + length(actions) AS size
+        FROM events
+        WHERE app_name = ? AND user_id = ? AND session_id = ?
+        ORDER BY timestamp
+        """,
+        (app_name, user_id, session_id)
+    ).fetchall()
+
+    if len(rows) <= keep_events:
+        return {"events_removed": 0, "bytes_removed": 0}
+
+    # Move the cut back to the start of a user turn, so the kept window only grows
+    cut = len(rows) - keep_events
+    while cut > 0 and rows[cut][1] != "user":
+        cut -= 1
+    dropped = rows[:cut]
+    if not dropped:
+        return {"events_removed": 0, "bytes_removed": 0}
+
+    state_row = conn.execute(
+        "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+        (app_name, user_id, session_id)
+    ).fetchone()
+    state = json.loads(state_row[0]) if state_row and state_row[0] else {}
+
+    lines = [line for line in (_event_line(r[1], r[2]) for r in dropped) if line]
+    previous = state.get(SUMMARY_STATE_KEY)
+    if previous:
+        lines = previous.splitlines() + lines
+    state[SUMMARY_STATE_KEY] = "\n".join(lines[-SUMMARY_MAX_LINES:])
+    state[COMPACTED_COUNT_STATE_KEY] = state.get(COMPACTED_COUNT_STATE_KEY, 0) + len(dropped)
+
+    bytes_removed = sum(r[3] or 0 for r in dropped)
+
+    # update_time is left alone so a process holding this session can still append
+    conn.execute(
+        "UPDATE sessions SET state = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+        (json.dumps(state), app_name, user_id, session_id)
+    )
+    conn.executemany(
+        "DELETE FROM events WHERE id = ? AND app_name = ? AND user_id = ? AND session_id = ?",
+        [(r[0], app_name, user_id, session_id) for r in dropped]
+    )
+    return {"events_removed": len(dropped), "bytes_removed": bytes_removed}
+
+
+def compact_sessions(
+    db_path: str = ADK_SESSION_DB_PATH,
+    keep_events: int = DEFAULT_KEEP_EVENTS,
+    threshold: int = COMPACT_THRESHOLD,
+    user_id: Optional[str] = None,
+    vacuum: bool = True,
+) -> Dict[str, Any]:
+    """
+    Compact every session (or one user's sessions) above `threshold` events.
+
+    Returns:
+        stats: sessions_compacted, events_removed, bytes_removed,
+        db_bytes_before, db_bytes_after, bytes_reclaimed
+    """
+    stats = {
+        "sessions_compacted": 0,
+        "events_removed": 0,
+        "bytes_removed": 0,
+    }
+    if not os.path.exists(db_path):
+        return stats
+
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        stats["db_bytes_before"] = _db_bytes(conn)
+
+        query = """
+            SELECT app_name, user_id, session_id
+            FROM events
+            {where}
+            GROUP BY app_name, user_id, session_id
+            HAVING COUNT(*) > ?
+        """
+        if user_id:
+            candidates = conn.execute(query.format(where="WHERE user_id = ?"), (user_id, threshold)).fetchall()
+        else:
+            candidates = conn.execute(query.format(where=""), (threshold,)).fetchall()
+
+        for app_name, session_user_id, session_id in candidates:
+            with conn:
+                result = compact_session(conn, app_name, session_user_id, session_id, keep_events)
+            if result["events_removed"]:
+                stats["sessions_compacted"] += 1
+                stats["events_removed"] += result["events_removed"]
+                stats["bytes_removed"] += result["bytes_removed"]
+
+        if vacuum and stats["events_removed"]:
+            conn.execute("VACUUM")
+        stats["db_bytes_after"] = _db_bytes(conn)
+        stats["bytes_reclaimed"] = stats["db_bytes_before"] - stats["db_bytes_after"]
+    finally:
+        conn.close()
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compact ADK session history")
+    parser.add_argument("--db", default=ADK_SESSION_DB_PATH, help="ADK session database path")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP_EVENTS, help="events to keep per session")
+    parser.add_argument("--threshold", type=int, default=None,
+                        help="only compact sessions with more events than this (default: --keep)")
+    parser.add_argument("--user", default=None, help="only compact this user's sessions")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM afterwards")
+    args = parser.parse_args(argv)
+
+    stats = compact_sessions(
+        db_path=args.db,
+        keep_events=args.keep,
+        threshold=args.keep if args.threshold is None else args.threshold,
+        user_id=args.user,
+        vacuum=not args.no_vacuum,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ Reconstructs ADK session state from persistent DB
 
 import uuid
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 try:
     from google.adk.sessions import DatabaseSessionService
@@ -16,55 +16,49 @@ except Exception:
     Runner = Any
     types = Any
 
-from .models import UserModel
+from .models import SceneModel, UserModel, VideoModel
 from .connection import db_connection
+from .records import ApprovedImage, CheckpointRecord, SceneRecord, SceneSummary, UserRecord, VideoRecord, fetch_all
+from .async_models import run_in_db_executor
+from .checkpoint_writer import checkpoint_writer, write_checkpoints
+from .cache import LRUCache
+from .prefetch import take_warm_state, warm_video
+
+
+# (user_id, video_id) -> ADK session id. Only the id: a Session object goes stale
+# as soon as another turn appends to it, and ADK rejects appends to stale sessions.
+session_cache = LRUCache(maxsize=256, ttl_seconds=600)
 
 
 # === Sync DB helpers ===
 
-def get_user(user_id: str) -> Optional[Dict[str, Any]]:
+def get_user(user_id: str) -> Optional[UserRecord]:
     """Get user by ID"""
     return UserModel.find_by_id(user_id)
 
 
-def get_video(video_id: str) -> Optional[Dict[str, Any]]:
+def get_video(video_id: str) -> Optional[VideoRecord]:
     """Get video by ID"""
-    with db_connection.get_connection() as conn:
-        row = conn.execute(
-            "SELECT * FROM videos WHERE video_id = ?", 
-            (video_id,)
-        ).fetchone()
-        return dict(row) if row else None
+    return VideoModel.get_by_id(video_id)
 
 
 def update_video_last_session(video_id: str, session_id: str) -> None:
     """Update video's last_session_id"""
-    with db_connection.get_connection() as conn:
-        conn.execute(
-            "UPDATE videos SET last_session_id = ? WHERE video_id = ?",
-            (session_id, video_id)
-        )
+    VideoModel.update_last_session(video_id, session_id)
+    # Any cached session for this video is no longer the current one
+    session_cache.invalidate_where(lambda key: key[1] == video_id)
 
 
-def get_scenes_for_video(video_id: str) -> list:
+def get_scenes_for_video(video_id: str) -> List[SceneRecord]:
     """Get all scenes for a video"""
-    with db_connection.get_connection() as conn:
-        rows = conn.execute(
-            """
-            SELECT scene_number, visual_description 
-            FROM scenes 
-            WHERE video_id = ? 
-            ORDER BY scene_number
-            """,
-            (video_id,)
-        ).fetchall()
-        return [dict(r) for r in rows]
+    return SceneModel.list_for_video(video_id)
 
 
-def get_approved_images_for_video(video_id: str) -> list:
+def get_approved_images_for_video(video_id: str) -> List[ApprovedImage]:
     """Get approved images with scene numbers"""
     with db_connection.get_connection() as conn:
-        rows = conn.execute(
+        return fetch_all(
+            conn, ApprovedImage,
             """
             SELECT s.scene_number, i.image_path 
             FROM images i 
@@ -74,49 +68,148 @@ def get_approved_images_for_video(video_id: str) -> list:
             ORDER BY s.scene_number
             """,
             (video_id,)
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
 
 
-def save_checkpoint(video_id: str, checkpoint: dict) -> None:
-    """Save checkpoint to DB"""
+def get_resume_snapshot(video_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read everything a session rebuild needs in one read transaction.
+    
+    If the video has a checkpoint, its batch, cost and character reference
+    are always carried. Progress starts from its next_scene unless a scene
+    before it changed after last_updated_at; otherwise (or without a
+    checkpoint) the first scene without an approved image is computed in SQL
+    over the whole video.
+    
+    Returns:
+        dict with video, user, checkpoint, total_scenes, next_scene and
+        scenes_summary, or None if the video does not exist
+    """
+    # Read-your-writes: a queued checkpoint for this video must land first
+    if checkpoint_writer.has_pending(video_id):
+        checkpoint_writer.flush()
+    
     with db_connection.get_connection() as conn:
-        # Create table if not exists
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS checkpoints (
-                video_id TEXT PRIMARY KEY,
-                next_scene INTEGER,
-                current_batch INTEGER,
-                character_reference_path TEXT,
-                session_cost REAL,
-                last_updated_at TEXT
+        # One snapshot for every read, so progress and summaries always agree
+        conn.execute("BEGIN")
+        
+        row = conn.execute(
+            """
+            SELECT v.status,
+                   COALESCE(length(v.script) > 0, 0) AS script_completed,
+                   u.user_id, u.email, u.user_name, u.current_month_cost,
+                   c.next_scene AS cp_next_scene,
+                   c.current_batch AS cp_current_batch,
+                   c.character_reference_path AS cp_character_reference_path,
+                   c.session_cost AS cp_session_cost,
+                   c.video_id AS cp_video_id,
+                   strftime('%Y-%m-%d %H:%M:%f', c.last_updated_at) AS cp_since,
+                   (SELECT COUNT(*) FROM scenes s WHERE s.video_id = v.video_id) AS total_scenes
+            FROM videos v
+            LEFT JOIN users u ON u.user_id = ?
+            LEFT JOIN checkpoints c ON c.video_id = v.video_id
+            WHERE v.video_id = ?
+            """,
+            (user_id, video_id)
+        ).fetchone()
+        
+        if not row:
+            return None
+        
+        # The checkpoint only decides where the scan starts; its fields always carry over
+        start_scene = 1
+        checkpoint = None
+        if row["cp_video_id"] is not None:
+            checkpoint = CheckpointRecord.of(
+                video_id=video_id,
+                next_scene=row["cp_next_scene"],
+                current_batch=row["cp_current_batch"],
+                character_reference_path=row["cp_character_reference_path"],
+                session_cost=row["cp_session_cost"],
+                last_updated_at=row["cp_since"],
             )
-        """)
         
-        # Upsert checkpoint
-        conn.execute(
+        if row["cp_since"] is not None and row["cp_next_scene"] is not None:
+            # Millisecond stamps on both sides, so a change in the same second still counts
+            regressed = conn.execute(
+                """
+                SELECT 1
+                FROM scenes s
+                WHERE s.video_id = ?
+                AND s.scene_number < ?
+                AND (
+                    s.updated_at > ?
+                    OR EXISTS (
+                        SELECT 1 FROM images i
+                        WHERE i.scene_id = s.scene_id
+                        AND i.updated_at > ?
+                        AND i.status != 'approved'
+                    )
+                )
+                LIMIT 1
+                """,
+                (video_id, row["cp_next_scene"], row["cp_since"], row["cp_since"])
+            ).fetchone()
+            
+            if not regressed:
+                start_scene = row["cp_next_scene"]
+        
+        next_scene = conn.execute(
             """
-            INSERT INTO checkpoints (
-                video_id, next_scene, current_batch, 
-                character_reference_path, session_cost, last_updated_at
+            SELECT MIN(s.scene_number)
+            FROM scenes s
+            WHERE s.video_id = ?
+            AND s.scene_number >= ?
+            AND NOT EXISTS (
+                SELECT 1 FROM images i
+                WHERE i.scene_id = s.scene_id
+                AND i.status = 'approved'
             )
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(video_id) DO UPDATE SET
-                next_scene = excluded.next_scene,
-                current_batch = excluded.current_batch,
-                character_reference_path = excluded.character_reference_path,
-                session_cost = excluded.session_cost,
-                last_updated_at = excluded.last_updated_at
             """,
-            (
-                video_id,
-                checkpoint.get("next_scene"),
-                checkpoint.get("current_batch"),
-                checkpoint.get("character_reference_path"),
-                checkpoint.get("session_cost"),
-                checkpoint.get("last_updated_at"),
-            ),
+            (video_id, start_scene)
+        ).fetchone()[0]
+        
+        scenes_summary = fetch_all(
+            conn, SceneSummary,
+            """
+            SELECT scene_number, substr(COALESCE(visual_description, ''), 1, 120) AS short_prompt
+            FROM scenes
+            WHERE video_id = ?
+            ORDER BY scene_number
+            """,
+            (video_id,)
         )
+    
+    total_scenes = row["total_scenes"]
+    if next_scene is None:
+        # All scenes approved (or none yet) - next one to generate is past the end
+        next_scene = total_scenes + 1
+    
+    user = None
+    if row["user_id"] is not None:
+        user = {
+            "user_id": row["user_id"],
+            "email": row["email"],
+            "user_name": row["user_name"],
+            "current_month_cost": row["current_month_cost"],
+        }
+    
+    return {
+        "video": {
+            "status": row["status"],
+            "script_completed": bool(row["script_completed"]),
+        },
+        "user": user,
+        "checkpoint": checkpoint,
+        "total_scenes": total_scenes,
+        "next_scene": next_scene,
+        "scenes_summary": scenes_summary,
+    }
+
+
+def save_checkpoint(video_id: str, checkpoint: dict) -> None:
+    """Save checkpoint to DB immediately (bypasses the write-behind queue)"""
+    write_checkpoints({video_id: checkpoint})
 
 
 # === Main session rebuild functions ===
@@ -124,23 +217,15 @@ def save_checkpoint(video_id: str, checkpoint: dict) -> None:
 def build_state_from_db(video_id: str, user_id: str) -> Dict[str, Any]:
     """Rebuild minimal ADK session state from DB"""
     
-    video = get_video(video_id)
-    user = get_user(user_id)
-    scenes = get_scenes_for_video(video_id)
-    approved_images = get_approved_images_for_video(video_id)
-    
-    # Determine next scene to generate
-    approved_scene_nums = {img['scene_number'] for img in approved_images}
-    total_scenes = len(scenes)
-    next_scene = 1
+    snapshot = get_resume_snapshot(video_id, user_id)
+    if not snapshot:
+        raise ValueError(f"Video not found: {video_id}")
     
-    for s in scenes:
-        if s['scene_number'] not in approved_scene_nums:
-            next_scene = s['scene_number']
-            break
-    else:
-        # All scenes approved
-        next_scene = total_scenes + 1
+    video = snapshot["video"]
+    user = snapshot["user"]
+    checkpoint = snapshot["checkpoint"] or {}
+    total_scenes = snapshot["total_scenes"]
+    next_scene = snapshot["next_scene"]
     
     state = {
         # Workflow identity
@@ -152,17 +237,19 @@ def build_state_from_db(video_id: str, user_id: str) -> Dict[str, Any]:
         "temp:next_scene_to_generate": next_scene,
         "temp:total_scenes": total_scenes,
         "temp:images_in_progress": [],
-        "temp:current_batch_number": 0,
+        "temp:current_batch_number": checkpoint.get("current_batch") or 0,
         
         # Completion flags
-        "temp:script_completed": bool(video.get("script")),
+        "temp:script_completed": video["script_completed"],
         "temp:scenes_completed": total_scenes > 0,
         
         # References
-        "temp:character_reference_path": video.get("character_reference_path"),
+        "temp:character_reference_path": (
+            checkpoint.get("character_reference_path") or video.get("character_reference_path")
+        ),
         
         # Cost tracking
-        "temp:session_cost": 0.0,
+        "temp:session_cost": checkpoint.get("session_cost") or 0.0,
         "user:total_lifetime_cost": user.get("current_month_cost", 0.0) if user else 0.0,
         
         # User identity
@@ -174,14 +261,8 @@ def build_state_from_db(video_id: str, user_id: str) -> Dict[str, Any]:
         "temp:last_updated_at": datetime.utcnow().isoformat() + "Z",
     }
     
-    # Small scene summary (first 120 chars of each prompt)
-    state["temp:scenes_summary"] = [
-        {
-            "scene_number": s["scene_number"], 
-            "short_prompt": (s["visual_description"] or "")[:120]
-        }
-        for s in scenes
-    ]
+    # Small scene summary (first 120 chars of each prompt) - session state must be plain JSON
+    state["temp:scenes_summary"] = [scene.to_dict() for scene in snapshot["scenes_summary"]]
     
     return state
 
@@ -195,11 +276,25 @@ async def get_or_create_adk_session_for_video(
     """
     Resume ADK session for video or create new one with DB state.
     
+    The session id is kept in session_cache keyed by (user_id, video_id), so
+    switching back to a recently used video skips the video lookup and goes
+    straight to the session; the session itself is always fetched fresh.
+    Entries expire after the cache TTL and are dropped whenever the video's
+    last_session_id changes.
+    
     Returns: ADK Session object
     """
     
-    # Get video from DB
-    video = get_video(video_id)
+    cache_key = (user_id, video_id)
+    cached_id = session_cache.get(cache_key)
+    if cached_id is not None:
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=cached_id)
+        if session is not None:
+            return session
+        session_cache.invalidate(cache_key)
+    
+    # Get video from the login prefetch, or the DB (off the event loop)
+    video = await warm_video(video_id, user_id) or await run_in_db_executor(get_video, video_id)
     if not video:
         raise ValueError(f"Video not found: {video_id}")
     
@@ -213,14 +308,19 @@ async def get_or_create_adk_session_for_video(
                 user_id=user_id,
                 session_id=last_session_id
             )
+            if not session:
+                raise ValueError("Session not found")
             print(f"Resumed session: {last_session_id}")
+            session_cache.put(cache_key, session.id)
             return session
         except Exception as e:
             print(f"Could not resume session {last_session_id}: {e}")
             print("Building new session from DB...")
     
-    # Build state from DB
-    initial_state = build_state_from_db(video_id, user_id)
+    # Build state from DB (already rebuilt at login for the video being resumed)
+    initial_state = await take_warm_state(video_id, user_id)
+    if initial_state is None:
+        initial_state = await run_in_db_executor(build_state_from_db, video_id, user_id)
     
     # Create new session
     new_session_id = f"video_{video_id}__{uuid.uuid4().hex[:8]}"
@@ -233,16 +333,20 @@ async def get_or_create_adk_session_for_video(
     )
     
     # Save session_id to DB
-    update_video_last_session(video_id, new_session_id)
+    await run_in_db_executor(update_video_last_session, video_id, new_session_id)
     
+    session_cache.put(cache_key, session.id)
     print(f"Created new session: {new_session_id}")
     return session
 
 
-def persist_state_checkpoint(video_id: str, state: Dict[str, Any]) -> None:
+def persist_state_checkpoint(video_id: str, state: Dict[str, Any], durable: bool = False) -> None:
     """
     Save checkpoint to DB after important events.
     Call this when user approves batch, selects character, etc.
+    
+    Checkpoints are queued and coalesced per video; pass durable=True
+    (e.g. on interruption) to write everything pending before returning.
     """
     checkpoint = {
         "video_id": video_id,
@@ -252,8 +356,15 @@ def persist_state_checkpoint(video_id: str, state: Dict[str, Any]) -> None:
         "session_cost": state.get("temp:session_cost"),
         "last_updated_at": datetime.utcnow().isoformat() + "Z",
     }
-    save_checkpoint(video_id, checkpoint)
-    print(f"Checkpoint saved for video {video_id}")
+    checkpoint_writer.submit(video_id, checkpoint)
+    if durable:
+        checkpoint_writer.flush()
+        print(f"Checkpoint saved for video {video_id}")
+
+
+async def persist_state_checkpoint_async(video_id: str, state: Dict[str, Any], durable: bool = False) -> None:
+    """Async variant of persist_state_checkpoint for use from tools and the runner loop"""
+    await run_in_db_executor(persist_state_checkpoint, video_id, state, durable)
 
 
 # Export public functions
@@ -261,4 +372,5 @@ __all__ = [
     "build_state_from_db",
     "get_or_create_adk_session_for_video",
     "persist_state_checkpoint",
+    "persist_state_checkpoint_async",
 ]
\ No newline at end of file
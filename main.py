@@ -1,21 +1,92 @@
-from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
-from agents.root_agent import root_agent
-from config import load_current_user, load_current_video, save_current_user
-from database.connection import db_connection
-from google.genai import types
+# .env first: the modules below read their settings (DATABASE_PATH, DB_*, tracing, caches) at import
+from dotenv import load_dotenv
+load_dotenv()
+
+from config import ACTIVE_VIDEO_KEY, clear_current_user, load_current_user, load_current_video, save_current_user
+from database.models import UserModel
+from database.async_models import run_in_db_executor
+from database.checkpoint_writer import checkpoint_writer
+from database.prefetch import start_login_prefetch
+from database.maintenance import start_token_sweeper
+from database.session_compaction import ADK_SESSION_DB_PATH, COMPACT_THRESHOLD, compact_sessions
+from services.email_outbox import email_sender
+from services.tracing import current_span, install_tracing, tracer
 import asyncio
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+SESSION_DB_URL = f"sqlite+aiosqlite:///{ADK_SESSION_DB_PATH}"
+
+# Imported by load_runtime(), in this order (also the --profile-startup breakdown)
+RUNTIME_MODULES = (
+    "google.genai.types",
+    "google.adk.sessions",
+    "google.adk.runners",
+    "agents.root_agent",
+    "agents.fast_path",
+    "agents.onboarding_flow",
+)
+
+# === Lazy runtime ===
+# google.adk, google.genai and the agent tree take seconds to import, so they load
+# on first use (or in the background while the CLI waits for the first message)
+
+_runtime: Optional[Dict[str, Any]] = None
+_runtime_lock = threading.Lock()
+
+
+def load_runtime() -> Dict[str, Any]:
+    """
+    Import the agent stack and build the session service and runner (once).
+
+    Returns:
+        {"session_service": ..., "runner": ...}
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            for name in RUNTIME_MODULES:
+                importlib.import_module(name)
+            from google.adk.runners import Runner
+            from google.adk.sessions import DatabaseSessionService
+            from agents.root_agent import root_agent
+
+            # Wrapped (and agents instrumented) only when CONTINUITY_TRACE_FILE is set
+            session_service = install_tracing(root_agent, DatabaseSessionService(db_url=SESSION_DB_URL))
+            runner = Runner(app_name="continuity", agent=root_agent, session_service=session_service)
+            _runtime = {"session_service": session_service, "runner": runner}
+    return _runtime
+
+
+def get_session_service() -> Any:
+    return load_runtime()["session_service"]
+
+
+def get_runner() -> Any:
+    return load_runtime()["runner"]
+
+
+def warm_runtime() -> threading.Thread:
+    """Start loading the runtime on a daemon thread; the first turn waits for it if needed"""
+    def load() -> None:
+        try:
+            load_runtime()
+        except Exception as e:
+            # The first turn retries and reports it
+            print(f"\n(Background agent load failed: {e})")
 
-session_service = DatabaseSessionService(db_url="sqlite+aiosqlite:///adk_sessions.db")
-runner = Runner(app_name="continuity", agent=root_agent, session_service=session_service)
+    thread = threading.Thread(target=load, name="continuity-runtime", daemon=True)
+    thread.start()
+    return thread
 
 def load_user_details_from_db(user_id: str) -> dict:
-    """Load user details from database"""
-    with db_connection.get_connection() as conn:
-        row = conn.execute(
-            "SELECT email, user_name FROM users WHERE user_id = ?",
-            (user_id,)
-        ).fetchone()
+    """Load user details from database (through the user cache)"""
+    row = UserModel.find_by_id(user_id)
     
     if row:
         return {
@@ -24,21 +95,25 @@ def load_user_details_from_db(user_id: str) -> dict:
         }
     return {}
 
-# Chat loop
-# Save current_user_id and current_video_id to files when they change
-async def main():
-    print("=" * 60)
-    print("CONTINUITY - AI Video Creation Assistant")
-    print("=" * 60)
+async def identify_user(anonymous_session_id: str = "temp_session") -> Tuple[str, List[str], Dict[str, Any]]:
+    """
+    Work out who is talking and what they were doing, without touching the agent stack.
+    Context (current user/video) is read from the active context store key;
+    visitors who are not logged in get `anonymous_session_id`.
+
+    Returns:
+        (session_id, notices to show the user, initial session state)
+    """
+    notices = []
 
     # 1. Check if we have a current user
     user_id = load_current_user()
 
     if user_id:
         # Verify user exists in database
-        user_details = load_user_details_from_db(user_id)
+        user_details = await run_in_db_executor(load_user_details_from_db, user_id)
         if user_details and user_details.get("email"):
-            print(f"Welcome back, {user_details.get('name', 'there')}!")
+            notices.append(f"Welcome back, {user_details.get('name', 'there')}!")
             initial_state = {
                 "user:verified_user_id": user_id,
                 "user:email": user_details.get("email", ""),
@@ -46,24 +121,46 @@ async def main():
             }
         else:
             # User file exists but no DB record - clean up
-            print("👋 Hi there, Welcome to Continuity!")
-            print("(Previous session data was corrupted, starting fresh)")
-            from config import CURRENT_USER_FILE
-            if CURRENT_USER_FILE.exists():
-                CURRENT_USER_FILE.unlink()
+            notices.append("👋 Hi there, Welcome to Continuity!")
+            notices.append("(Previous session data was corrupted, starting fresh)")
+            clear_current_user()
             initial_state = {}
     else:
-        print("👋 Hi there, Welcome to Continuity!")
+        notices.append("👋 Hi there, Welcome to Continuity!")
         initial_state = {}
     
     # 2. Check if we were working on a video
     video_id = load_current_video()
     if video_id:
-        print(f"Resuming video: {video_id}")
+        notices.append(f"Resuming video: {video_id}")
         initial_state["temp:selected_video_id"] = video_id
-    
-    # 3. Create or get session
-    session_id = user_id or "temp_session"
+        initial_state[ACTIVE_VIDEO_KEY] = video_id
+
+    # 3. Load their menu and current video in the background while the session opens
+    if initial_state.get("user:verified_user_id"):
+        start_login_prefetch(user_id, video_id)
+
+    return user_id or anonymous_session_id, notices, initial_state
+
+
+async def open_session(session_id: str, initial_state: Dict[str, Any]) -> List[str]:
+    """
+    Compact and resume the ADK session, or create it with `initial_state`.
+
+    Returns:
+        Notices to show the user
+    """
+    notices = []
+
+    # Keep the reused per-user session bounded (VACUUM is left to the offline command)
+    compaction = await run_in_db_executor(
+        compact_sessions, user_id=session_id, threshold=COMPACT_THRESHOLD, vacuum=False
+    )
+    if compaction["events_removed"]:
+        notices.append(f"(Compacted {compaction['events_removed']} old conversation events)")
+
+    # Importing the agent stack blocks, so wait for it off the event loop
+    session_service = await asyncio.to_thread(get_session_service)
 
     # Try to get existing session or create new one
     try:
@@ -83,6 +180,136 @@ async def main():
             state=initial_state
         )
 
+    return notices
+
+
+async def prepare_session(anonymous_session_id: str = "temp_session") -> Tuple[str, List[str]]:
+    """
+    Identify the returning user (if any) and resume or create their session.
+
+    Returns:
+        (session_id, notices to show the user)
+    """
+    session_id, notices, initial_state = await identify_user(anonymous_session_id)
+    notices.extend(await open_session(session_id, initial_state))
+    return session_id, notices
+
+
+async def stream_turn(session_id: str, message: str) -> AsyncIterator[str]:
+    """
+    Run one user turn through root_agent and yield text parts as they arrive.
+    Callers wrap the iteration in tracer.turn(...): a span opened inside this
+    generator could not be closed cleanly if the consumer stops early.
+    """
+    runtime = _runtime or await asyncio.to_thread(load_runtime)
+    from agents.fast_path import try_fast_path
+    from agents.onboarding_flow import try_onboarding
+    from google.genai import types
+
+    session_service = runtime["session_service"]
+    turn = current_span.get()
+    # Obvious menu intents and scripted signup steps skip the model round-trip
+    reply = await try_fast_path(session_service, "continuity", session_id, message)
+    route = "fast_path"
+    if reply is None:
+        reply = await try_onboarding(session_service, "continuity", session_id, message)
+        route = "onboarding"
+    if reply is not None:
+        if turn is not None:
+            turn.attrs["route"] = route
+        yield reply
+        return
+
+    if turn is not None:
+        turn.attrs["route"] = "runner"
+    user_msg = types.Content(role="user", parts=[types.Part(text=message)])
+    async for event in runtime["runner"].run_async(
+        user_id=session_id,
+        session_id=session_id,
+        new_message=user_msg,
+    ):
+        if event.content and event.content.parts:
+            for part in event.content.parts:
+                if part.text:
+                    yield part.text
+
+
+# === Startup profile ===
+
+def _import_times(top: int) -> List[Tuple[float, float, str]]:
+    """(self_ms, cumulative_ms, module) of the slowest imports, from `python -X importtime`"""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main; main.load_runtime()"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True,
+    )
+    rows = []
+    for line in child.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((int(parts[0]) / 1000, int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def profile_startup(top: int = 15) -> None:
+    """Print how long each startup step and runtime import takes (python main.py --profile-startup)"""
+    from database.connection import db_connection
+
+    steps = []
+
+    def step(name: str, fn: Any, *args: Any) -> Any:
+        started = time.perf_counter()
+        result = fn(*args)
+        steps.append((name, (time.perf_counter() - started) * 1000))
+        return result
+
+    def schema_check() -> None:
+        with db_connection.get_connection():
+            pass
+
+    step("schema check", schema_check)
+    session_id, _, initial_state = step("identify user", asyncio.run, identify_user())
+    banner_ms = sum(ms for _, ms in steps)
+    try:
+        for name in RUNTIME_MODULES:
+            step(f"import {name}", importlib.import_module, name)
+        step("build session service + runner", load_runtime)
+        step("open session", asyncio.run, open_session(session_id, initial_state))
+    except ImportError as e:
+        print(f"(Agent runtime unavailable: {e})")
+
+    print(f"{'step':<40} {'ms':>10}")
+    for name, ms in steps:
+        print(f"{name:<40} {ms:>10.1f}")
+    print(f"{'time to welcome banner':<40} {banner_ms:>10.1f}")
+    print(f"{'total':<40} {sum(ms for _, ms in steps):>10.1f}")
+
+    print(f"\nSlowest module imports (python -X importtime, top {top}):")
+    print(f"{'self ms':>10} {'cumulative ms':>14}  module")
+    for self_ms, cumulative_ms, module in _import_times(top):
+        print(f"{self_ms:>10.1f} {cumulative_ms:>14.1f}  {module}")
+
+
+# Chat loop
+# Save current_user_id and current_video_id to files when they change
+async def main():
+    print("=" * 60)
+    print("CONTINUITY - AI Video Creation Assistant")
+    print("=" * 60)
+
+    # The banner only needs the user lookup; the agent stack loads while they type
+    session_id, notices, initial_state = await identify_user()
+    for notice in notices:
+        print(notice)
+    warm_runtime()
+    session_open = False
+
+    # Expired verification tokens are purged in the background (runs between turns)
+    sweeper = start_token_sweeper()
+    # Mail queued by an earlier run (or a magic link sent mid-login) goes out without waiting for a new one
+    email_sender.start()
+
     # 4. Start chat loop
     while True:
         try:
@@ -92,29 +319,28 @@ async def main():
                 continue
 
             if message.lower() in ['quit', 'exit']:
+                await run_in_db_executor(checkpoint_writer.flush)
                 print("\n👋 Goodbye! Your progress is saved.")
                 break
 
-            user_msg = types.Content(role="user", parts=[types.Part(text=message)])
+            if not session_open:
+                for notice in await open_session(session_id, initial_state):
+                    print(notice)
+                session_open = True
 
             # Run agent
             print("\n🤖 Agent: ", end="", flush=True)
             responses = []
-            async for event in runner.run_async(
-                user_id=session_id,
-                session_id=session_id,
-                new_message=user_msg,
-            ):
-                if event.content and event.content.parts:
-                    for part in event.content.parts:
-                        if part.text:
-                            responses.append(part.text)
-                            print(part.text, end="", flush=True)
+            with tracer.turn(session_id, message_chars=len(message)):
+                async for text in stream_turn(session_id, message):
+                    responses.append(text)
+                    print(text, end="", flush=True)
             
             if not responses:
                 print("(No response)")
 
         except KeyboardInterrupt:
+            checkpoint_writer.flush()
             print("\n\n👋 Interrupted. Your progress is saved. Goodbye!")
             break
         except Exception as e:
@@ -122,5 +348,10 @@ async def main():
             import traceback
             traceback.print_exc()
 
+    sweeper.cancel()
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if "--profile-startup" in sys.argv[1:]:
+        profile_startup()
+    else:
+        asyncio.run(main())
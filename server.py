@@ -0,0 +1,264 @@
+"""
+Continuity multi-user server
+Serves the same Runner/root_agent/DatabaseSessionService as main.py to many
+concurrent conversations over HTTP, streaming agent text as it arrives.
+
+    python server.py --host 0.0.0.0 --port 8080
+
+POST /chat  {"session": "<client conversation id>", "message": "..."}
+    -> 200 application/x-ndjson, one JSON object per line:
+       {"notice": "..."}   once, when the conversation is first opened
+       {"text": "..."}     for every agent text part, as it is produced
+       {"done": true}      at the end of the turn (or {"error": "..."})
+GET /stats  -> pool, query, cache, email and server counters
+"""
+
+# .env first: the modules below read their settings (DATABASE_PATH, DB_*, tracing, caches) at import
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from config import InMemoryContextStore, get_context_store, set_context_store, use_context_key
+from database.cache import LRUCache
+from database.connection import db_connection
+from database.checkpoint_writer import checkpoint_writer
+from database.maintenance import start_token_sweeper
+from database.models import user_cache
+from database.prefetch import prefetch_stats
+from database.session_helpers import session_cache
+from main import load_runtime, prepare_session, stream_turn
+from services.email_outbox import email_sender
+from services.tracing import tracer
+
+MAX_INFLIGHT_PER_USER = int(os.getenv("MAX_INFLIGHT_PER_USER", "1"))
+MAX_BODY_BYTES = 64 * 1024
+# Conversations idle longer than this are re-identified on their next message
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "10000"))
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class ChatServer:
+    """asyncio HTTP front end around the shared runner"""
+
+    def __init__(self, max_inflight_per_user: int = MAX_INFLIGHT_PER_USER):
+        self.max_inflight_per_user = max_inflight_per_user
+        # Client conversation id -> (ADK session id, context key) (opened once, until it ages out)
+        self._sessions = LRUCache(CONVERSATION_CACHE_SIZE, CONVERSATION_TTL_SECONDS)
+        self._opening = LRUCache(CONVERSATION_CACHE_SIZE, CONVERSATION_TTL_SECONDS)
+        # ADK session id -> turns running (only sessions with a turn in flight are kept)
+        self._inflight: Dict[str, int] = {}
+        self._stats = {"turns": 0, "rejected": 0, "errors": 0, "active_turns": 0}
+
+    # === HTTP plumbing ===
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                request = await self._read_request(reader)
+            except ValueError:
+                await self._send_json(writer, 400, {"error": "malformed HTTP request"})
+                return
+            if request is None:
+                return
+            method, path, body = request
+            if body is None:
+                await self._send_json(writer, 413, {"error": "request body too large"})
+            elif path == "/chat":
+                if method != "POST":
+                    await self._send_json(writer, 405, {"error": "use POST"})
+                else:
+                    await self._chat(writer, body)
+            elif path == "/stats" and method == "GET":
+                await self._send_json(writer, 200, self.stats())
+            else:
+                await self._send_json(writer, 404, {"error": "not found"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes]]:
+        """(method, path, body); body is None if too large. ValueError if the request is malformed."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length < 0:
+            raise ValueError(f"negative Content-Length: {length}")
+        if length > MAX_BODY_BYTES:
+            return method.upper(), path.split("?", 1)[0], None
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], body
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _send_chunk(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        line = (json.dumps(payload) + "\n").encode()
+        writer.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        await writer.drain()
+
+    # === Chat ===
+
+    async def _chat(self, writer: asyncio.StreamWriter, body: bytes) -> None:
+        try:
+            request = json.loads(body or b"{}")
+            conversation = str(request["session"]).strip()
+            message = str(request["message"]).strip()
+        except (ValueError, KeyError, TypeError):
+            await self._send_json(writer, 400, {"error": "expected JSON with 'session' and 'message'"})
+            return
+        if not conversation or not message:
+            await self._send_json(writer, 400, {"error": "'session' and 'message' must be non-empty"})
+            return
+
+        try:
+            session_id, context_key, notices = await self._open(conversation)
+        except Exception as e:
+            self._stats["errors"] += 1
+            await self._send_json(writer, 500, {"error": str(e)})
+            return
+
+        with use_context_key(context_key):
+            # Cap in-flight turns per ADK session - the verified user's, or this anonymous
+            # conversation's - since a session takes one writer at a time however many
+            # conversation ids a client opens for it
+            if self._inflight.get(session_id, 0) >= self.max_inflight_per_user:
+                self._stats["rejected"] += 1
+                await self._send_json(writer, 429, {"error": "a turn is already in progress for this session"})
+                return
+            self._inflight[session_id] = self._inflight.get(session_id, 0) + 1
+            self._stats["active_turns"] += 1
+
+            try:
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/x-ndjson\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
+                    b"Connection: close\r\n\r\n"
+                )
+                try:
+                    for notice in notices:
+                        await self._send_chunk(writer, {"notice": notice})
+                    with tracer.turn(session_id, message_chars=len(message)):
+                        async for text in stream_turn(session_id, message):
+                            await self._send_chunk(writer, {"text": text})
+                    await self._send_chunk(writer, {"done": True})
+                    self._stats["turns"] += 1
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    await self._send_chunk(writer, {"error": str(e)})
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+            finally:
+                self._stats["active_turns"] -= 1
+                self._inflight[session_id] -= 1
+                if not self._inflight[session_id]:
+                    del self._inflight[session_id]
+
+    async def _open(self, conversation: str) -> Tuple[str, str, list]:
+        """
+        Resume or create the ADK session behind a client conversation (once while it is cached).
+
+        The conversation's context key (and anonymous session id) is minted here, so
+        clients never choose the key their login/video context is stored under.
+
+        Returns:
+            (ADK session id, context key, notices)
+        """
+        opened = self._sessions.get(conversation)
+        if opened is not None:
+            return opened[0], opened[1], []
+        lock = self._opening.get(conversation)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._opening.put(conversation, lock)
+        try:
+            async with lock:
+                opened = self._sessions.get(conversation)
+                if opened is not None:
+                    return opened[0], opened[1], []
+                context_key = f"web_{uuid.uuid4().hex}"
+                try:
+                    with use_context_key(context_key):
+                        session_id, notices = await prepare_session(anonymous_session_id=context_key)
+                except Exception:
+                    # Nothing will ever use this key again
+                    get_context_store().discard(context_key)
+                    raise
+                self._sessions.put(conversation, (session_id, context_key))
+        finally:
+            self._opening.invalidate(conversation)
+        return session_id, context_key, notices
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "server": dict(self._stats, open_sessions=self._sessions.stats()["size"]),
+            "db_pool": db_connection.pool_stats(),
+            "db_queries": db_connection.query_stats_snapshot(top=20),
+            "session_cache": session_cache.stats(),
+            "user_cache": user_cache.stats(),
+            "prefetch": prefetch_stats(),
+            "checkpoints": checkpoint_writer.stats(),
+            "email": email_sender.stats(),
+        }
+
+
+async def serve(host: str, port: int) -> None:
+    # Many users share this process - keep their context apart and off disk, for as
+    # long as their conversation is open
+    set_context_store(InMemoryContextStore(CONVERSATION_CACHE_SIZE, CONVERSATION_TTL_SECONDS))
+    # Load the agent stack up front so the first request does not pay for the imports
+    await asyncio.to_thread(load_runtime)
+    chat_server = ChatServer()
+    server = await asyncio.start_server(chat_server.handle, host, port)
+    print(f"Continuity server listening on http://{host}:{port}")
+    sweeper = start_token_sweeper()
+    # Deliver mail left in the outbox by an earlier run without waiting for a new magic link
+    email_sender.start()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+        checkpoint_writer.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Continuity multi-user server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nServer stopped. Progress is saved.")
+
+
+if __name__ == "__main__":
+    main()
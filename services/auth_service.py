@@ -4,45 +4,22 @@ import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+MAGIC_LINK_SUBJECT = 'Continuity - Verify Your Email'
+
 
 class AuthService:
     """Handle email verification via magic links"""
     
     @staticmethod
-    def send_magic_link(email: str, token: str) -> bool:
-        """
-        Send magic link email to user.
-        
-        Args:
-            email: User's email address
-            token: Verification token (UUID)
-            
-        Returns:
-            True if email sent successfully, False otherwise
-        """
-        try:
-            gmail_address = os.getenv("GMAIL_ADDRESS")
-            gmail_password = os.getenv("GMAIL_APP_PASSWORD")
-            
-            
-            if not gmail_address or not gmail_password:
-                print(gmail_address)
-                print(gmail_password)
-                raise ValueError("Gmail credentials not found in .env file")
-            
-            # email message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = 'Continuity - Verify Your Email'
-            msg['From'] = gmail_address
-            msg['To'] = email
-            
-            # email body (plain text and HTML versions)
-            text_body = f"""Welcome to Continuity!
+    def build_magic_link(token: str) -> Tuple[str, str, str]:
+        """Subject, plain text and HTML body of the verification email"""
+        # email body (plain text and HTML versions)
+        text_body = f"""Welcome to Continuity!
 
             Click the link below to verify your email and start creating videos:
 
@@ -54,7 +31,7 @@ class AuthService:
             Continuity - AI Video Generation
             """
                         
-            html_body = f"""
+        html_body = f"""
             <html>
             <body style="font-family: Arial, sans-serif; line-height: 1.6;">
                 <h2>Welcome to Continuity!</h2>
@@ -73,6 +50,58 @@ class AuthService:
             </body>
             </html>
             """
+        
+        return MAGIC_LINK_SUBJECT, text_body, html_body
+
+    @staticmethod
+    def queue_magic_link(email: str, token: str) -> bool:
+        """
+        Queue the magic link email in the outbox and return immediately.
+        The background sender in services/email_outbox.py delivers it.
+        
+        Returns:
+            True if the email was queued, False otherwise
+        """
+        from database.models import EmailOutboxModel
+        from services.email_outbox import email_sender
+        
+        try:
+            subject, text_body, html_body = AuthService.build_magic_link(token)
+            EmailOutboxModel.enqueue(email, subject, text_body, html_body)
+            email_sender.wake()
+            return True
+        except Exception as e:
+            print(f"Failed to queue email: {e}")
+            return False
+    
+    @staticmethod
+    def send_magic_link(email: str, token: str) -> bool:
+        """
+        Send magic link email to user.
+        
+        Args:
+            email: User's email address
+            token: Verification token (UUID)
+            
+        Returns:
+            True if email sent successfully, False otherwise
+        """
+        try:
+            gmail_address = os.getenv("GMAIL_ADDRESS")
+            gmail_password = os.getenv("GMAIL_APP_PASSWORD")
+            
+            
+            if not gmail_address or not gmail_password:
+                print(gmail_address)
+                print(gmail_password)
+                raise ValueError("Gmail credentials not found in .env file")
+            
+            # email message
+            subject, text_body, html_body = AuthService.build_magic_link(token)
+            msg = MIMEMultipart('alternative')
+            msg['Subject'] = subject
+            msg['From'] = gmail_address
+            msg['To'] = email
             
             msg.attach(MIMEText(text_body, 'plain'))
             msg.attach(MIMEText(html_body, 'html'))
@@ -0,0 +1,327 @@
+"""
+Background email delivery from the email_outbox table
+One sender thread keeps an authenticated SMTP connection open, sends due
+messages in batches, retries failures with exponential backoff and records
+queue-to-delivery latency.
+"""
+
+import atexit
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional
+
+from database.models import EmailOutboxModel
+from database.records import OutboxMessage
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class SMTPUnavailable(Exception):
+    """Could not connect or log in to the SMTP server (the messages are fine; the server is not)"""
+
+
+class EmailSender:
+    """
+    Delivers queued emails on a background thread.
+
+    - The SMTP connection is reused across messages and batches and closed
+      after `idle_timeout` seconds without work.
+    - Transient failures (4xx, dropped connections) are retried after
+      `backoff_seconds * 2**attempts` (capped); permanent 5xx rejections and
+      messages out of attempts are marked failed.
+    - If the server cannot be reached or refuses the login, the batch goes
+      back in the queue without spending attempts and the sender backs off
+      (same schedule) until a connection succeeds.
+    - Messages live in the database, so nothing is lost on restart.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        starttls: Optional[bool] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        sender: Optional[str] = None,
+        batch_size: int = 20,
+        max_attempts: int = 5,
+        backoff_seconds: float = 2.0,
+        max_backoff_seconds: float = 300.0,
+        idle_timeout: float = 60.0,
+        poll_seconds: float = 30.0,
+    ):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self._username = username
+        self._password = password
+        self._sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.idle_timeout = idle_timeout
+        self.poll_seconds = poll_seconds
+
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._unavailable_streak = 0                     # Connect/login failures in a row
+        self._retry_connect_at = 0.0
+        self._latencies_ms: deque = deque(maxlen=1000)   # queued -> delivered
+        self._stats = {"sent": 0, "retried": 0, "failed": 0, "batches": 0, "connections_opened": 0,
+                       "connect_failures": 0}
+
+    # === Credentials (read late so .env / test overrides apply) ===
+
+    @property
+    def username(self) -> Optional[str]:
+        return self._username if self._username is not None else os.getenv("GMAIL_ADDRESS")
+
+    @property
+    def password(self) -> Optional[str]:
+        return self._password if self._password is not None else os.getenv("GMAIL_APP_PASSWORD")
+
+    @property
+    def sender(self) -> str:
+        return self._sender or os.getenv("SMTP_FROM") or self.username or "continuity@localhost"
+
+    # === Public API ===
+
+    def start(self) -> None:
+        """Start the background thread (it delivers whatever is already queued)"""
+        with self._lock:
+            if not self._stopped.is_set():
+                self._ensure_thread()
+
+    def wake(self) -> None:
+        """Tell the sender there is new mail (starts the thread if needed)"""
+        self.start()
+        self._wakeup.set()
+
+    def send_due(self) -> int:
+        """Send everything due now, batch by batch. Returns messages delivered."""
+        delivered = 0
+        with self._send_lock:
+            while time.time() >= self._retry_connect_at:
+                batch = EmailOutboxModel.claim_due(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    delivered += self._send_batch(batch)
+                except SMTPUnavailable:
+                    break                                # Everything else waits out the backoff
+                finally:
+                    with self._lock:
+                        self._stats["batches"] += 1
+        return delivered
+
+    def close(self) -> None:
+        """Stop the thread and drop the SMTP connection (unsent mail stays queued)"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._send_lock:
+            self._disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = list(self._latencies_ms)
+        stats["connected"] = self._smtp is not None
+        stats["latency_ms"] = {
+            "count": len(latencies),
+            "avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": max(latencies) if latencies else 0.0,
+        }
+        return stats
+
+    # === Delivery ===
+
+    def _send_batch(self, batch: List[OutboxMessage]) -> int:
+        sent_ids = []
+        try:
+            for index, row in enumerate(batch):
+                try:
+                    error = self._send_one(row)
+                except SMTPUnavailable as e:
+                    self._back_off([unsent["message_id"] for unsent in batch[index:]], e)
+                    raise
+                if error is None:
+                    sent_ids.append(row["message_id"])
+                    now = time.time()
+                    with self._lock:
+                        self._latencies_ms.append((now - row["queued_at"]) * 1000)
+                elif isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500:
+                    self._fail(row, error)
+                else:
+                    self._retry(row, error)
+        finally:
+            if sent_ids:
+                EmailOutboxModel.mark_sent(sent_ids)
+                with self._lock:
+                    self._stats["sent"] += len(sent_ids)
+        return len(sent_ids)
+
+    def _send_one(self, row: OutboxMessage) -> Optional[Exception]:
+        """Send one message, reconnecting once if the reused connection went away"""
+        message = self._build_message(row)
+        for attempt in range(2):
+            smtp = self._connection()                    # SMTPUnavailable propagates to _send_batch
+            try:
+                smtp.send_message(message)
+                self._last_used = time.time()
+                return None
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._disconnect()
+                if attempt:
+                    return e
+            except smtplib.SMTPRecipientsRefused as e:
+                # Single recipient - surface its own code (e.g. 550 vs 450)
+                code, response = next(iter(e.recipients.values()))
+                return smtplib.SMTPResponseException(code, response)
+            except Exception as e:
+                if not isinstance(e, smtplib.SMTPResponseException):
+                    self._disconnect()
+                return e
+        return None
+
+    def _retry(self, row: OutboxMessage, error: Exception) -> None:
+        attempts = row["attempts"] + 1
+        if attempts >= self.max_attempts:
+            self._fail(row, error)
+            return
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (attempts - 1)))
+        EmailOutboxModel.mark_retry(row["message_id"], time.time() + delay, str(error))
+        with self._lock:
+            self._stats["retried"] += 1
+        print(f"Email {row['message_id']} to {row['recipient']} failed, retrying in {delay:.0f}s: {error}")
+
+    def _back_off(self, message_ids: List[int], error: SMTPUnavailable) -> None:
+        """Requeue unsent messages as they were and hold off connecting again"""
+        with self._lock:
+            self._unavailable_streak += 1
+            self._stats["connect_failures"] += 1
+            streak = self._unavailable_streak
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (streak - 1)))
+        self._retry_connect_at = time.time() + delay
+        EmailOutboxModel.release(message_ids, self._retry_connect_at, str(error))
+        if streak == 1:
+            print(f"SMTP server {self.host}:{self.port} unavailable, holding queued email and retrying: {error}")
+
+    def _fail(self, row: OutboxMessage, error: Exception) -> None:
+        EmailOutboxModel.mark_failed(row["message_id"], str(error))
+        with self._lock:
+            self._stats["failed"] += 1
+        print(f"Email {row['message_id']} to {row['recipient']} failed permanently: {error}")
+
+    def _build_message(self, row: OutboxMessage) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = row["subject"]
+        msg['From'] = self.sender
+        msg['To'] = row["recipient"]
+        msg.attach(MIMEText(row["text_body"], 'plain'))
+        if row.get("html_body"):
+            msg.attach(MIMEText(row["html_body"], 'html'))
+        return msg
+
+    # === SMTP connection ===
+
+    def _connection(self) -> smtplib.SMTP:
+        """The open connection, or a new one (SMTPUnavailable if connect, STARTTLS or login fails)"""
+        if self._smtp is not None:
+            return self._smtp
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        except (OSError, smtplib.SMTPException) as e:
+            raise SMTPUnavailable(f"connect failed: {e}") from e
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except (OSError, smtplib.SMTPException) as e:
+            smtp.close()
+            raise SMTPUnavailable(f"login failed: {e}") from e
+        self._smtp = smtp
+        self._last_used = time.time()
+        self._retry_connect_at = 0.0
+        with self._lock:
+            self._stats["connections_opened"] += 1
+            recovered = self._unavailable_streak
+            self._unavailable_streak = 0
+        if recovered:
+            print(f"SMTP server {self.host}:{self.port} reachable again after {recovered} failed attempts")
+        return smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    # === Background thread ===
+
+    def _ensure_thread(self) -> None:
+        # Called with self._lock held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                # Claims whose lease ran out (their sender died mid-batch) go back in the queue;
+                # a claim another live process is still sending is left alone
+                EmailOutboxModel.requeue_in_flight()
+                self.send_due()
+            except Exception as e:
+                print(f"Email sender error, will retry: {e}")
+            self._wakeup.wait(self._next_wait())
+            self._wakeup.clear()
+
+    def _next_wait(self) -> float:
+        timeout = self.poll_seconds
+        try:
+            next_due = EmailOutboxModel.next_due_at()
+        except Exception:
+            next_due = None
+        if next_due is not None:
+            timeout = min(timeout, max(0.0, next_due - time.time(), self._retry_connect_at - time.time()))
+
+        if self._smtp is not None:
+            idle_for = time.time() - self._last_used
+            if idle_for >= self.idle_timeout:
+                with self._send_lock:
+                    self._disconnect()
+            else:
+                timeout = min(timeout, self.idle_timeout - idle_for)
+        return timeout
+
+
+email_sender = EmailSender()
+atexit.register(email_sender.close)
@@ -0,0 +1,370 @@
+"""
+Turn tracing
+Structured spans for one conversation turn - the turn itself, every model
+call, tool call, session-service call and SQLite statement - written as JSONL,
+followed by one summary line per turn. Works offline; nothing leaves the box.
+
+Enable with CONTINUITY_TRACE_FILE=traces.jsonl, then summarize with
+
+    python -m services.tracing traces.jsonl
+
+Span lines:    {"type": "span", "trace_id", "span_id", "parent_id", "name", "kind",
+                "start", "duration_ms", "attrs", "error"}
+Summary lines: {"type": "turn", "trace_id", "session_id", "duration_ms",
+                "model", "tool", "db", "session", "tools"}   (count and ms per kind)
+"""
+
+import argparse
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from database.instrumentation import add_statement_hook, normalize_sql
+
+TRACE_FILE = os.getenv("CONTINUITY_TRACE_FILE")
+
+# Kinds totalled in the per-turn summary ("agent" spans wrap nested turns and are not)
+SUMMARY_KINDS = ("model", "tool", "db", "session")
+
+
+class Span:
+    """One timed operation; children point at it through parent_id"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "_started", "attrs")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"] = None, **attrs: Any):
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.attrs = attrs
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+
+# Innermost open span of the running task/thread (copied into the DB executor)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _restore(token: Token) -> None:
+    """Undo current_span.set(); a no-op if the block ended in another context"""
+    try:
+        current_span.reset(token)
+    except ValueError:
+        # e.g. a generator closed by the event loop after its consumer went away -
+        # the context that set the span is already gone with it
+        pass
+
+
+class Tracer:
+    """Writes spans to a JSONL file and keeps per-turn totals until the turn ends"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._turns: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    # === Spans ===
+
+    def start(self, name: str, kind: str, parent: Optional[Span] = None, **attrs: Any) -> Span:
+        return Span(name, kind, parent if parent is not None else current_span.get(), **attrs)
+
+    def finish(self, span: Span, error: Optional[BaseException] = None, **attrs: Any) -> None:
+        span.attrs.update(attrs)
+        self.emit(span, span.elapsed_ms(), error)
+
+    @contextlib.contextmanager
+    def span(self, name: str, kind: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Time the block as a child of the current span (no-op when tracing is off)"""
+        if not self.enabled:
+            yield None
+            return
+        span = self.start(name, kind, **attrs)
+        token = current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _restore(token)
+            self.finish(span, error)
+
+    @contextlib.contextmanager
+    def turn(self, session_id: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Root span for one user turn; writes the turn summary when it ends"""
+        if not self.enabled:
+            yield None
+            return
+        span = Span("turn", "turn", session_id=session_id, **attrs)
+        with self._lock:
+            self._turns[span.trace_id] = {kind: {"count": 0, "ms": 0.0} for kind in SUMMARY_KINDS}
+            self._turns[span.trace_id]["tools"] = {}
+        token = current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _restore(token)
+            elapsed = span.elapsed_ms()
+            self.emit(span, elapsed, error)
+            with self._lock:
+                totals = self._turns.pop(span.trace_id, None)
+            if totals is not None:
+                self._write(dict(
+                    totals, type="turn", trace_id=span.trace_id, session_id=session_id,
+                    duration_ms=elapsed, error=repr(error) if error else None,
+                ))
+
+    def emit(self, span: Span, duration_ms: float, error: Optional[BaseException] = None) -> None:
+        if span.kind in SUMMARY_KINDS:
+            with self._lock:
+                totals = self._turns.get(span.trace_id)
+                if totals is not None:
+                    totals[span.kind]["count"] += 1
+                    totals[span.kind]["ms"] += duration_ms
+                    if span.kind == "tool":
+                        tool = totals["tools"].setdefault(span.name, {"count": 0, "ms": 0.0})
+                        tool["count"] += 1
+                        tool["ms"] += duration_ms
+        self._write({
+            "type": "span",
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "kind": span.kind,
+            "start": span.start,
+            "duration_ms": duration_ms,
+            "attrs": span.attrs,
+            "error": repr(error) if error else None,
+        })
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # === Hooks ===
+
+    def on_statement(self, sql: str, elapsed_ms: float, rows: int, error: bool) -> None:
+        """database.instrumentation hook: one span per SQLite statement inside a turn"""
+        parent = current_span.get()
+        if parent is None:
+            return                                       # Background work outside any turn
+        span = Span(sql.split(None, 1)[0].upper() if sql.strip() else "SQL", "db", parent,
+                    sql=normalize_sql(sql), rows=rows)
+        span.start -= elapsed_ms / 1000
+        self.emit(span, elapsed_ms, RuntimeError("statement failed") if error else None)
+
+
+tracer = Tracer(TRACE_FILE)
+
+
+# === Agent callbacks ===
+
+def _chain(ours: Any, existing: Any, ours_first: bool) -> Any:
+    """Run our callback alongside one the agent already had (sync or async)"""
+    if existing is None:
+        return ours
+
+    async def chained(*args: Any, **kwargs: Any) -> Any:
+        if ours_first:
+            ours(*args, **kwargs)
+        result = existing(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        if not ours_first:
+            ours(*args, **kwargs)
+        return result
+    return chained
+
+
+class AgentTracer:
+    """Model and tool spans from LlmAgent before/after callbacks"""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        # Open model/tool spans; tool entries keep the token that made them current
+        self._open: Dict[Tuple[str, ...], Tuple[Span, Optional[Token]]] = {}
+
+    def install(self, root_agent: Any) -> None:
+        from agents.agent_tree import iter_llm_agents
+        for agent in iter_llm_agents(root_agent):
+            agent.before_model_callback = _chain(self.before_model, agent.before_model_callback, True)
+            agent.after_model_callback = _chain(self.after_model, agent.after_model_callback, False)
+            agent.before_tool_callback = _chain(self.before_tool, agent.before_tool_callback, True)
+            agent.after_tool_callback = _chain(self.after_tool, agent.after_tool_callback, False)
+            if hasattr(agent, "on_tool_error_callback"):
+                agent.on_tool_error_callback = _chain(self.on_tool_error, agent.on_tool_error_callback, True)
+            if hasattr(agent, "on_model_error_callback"):
+                agent.on_model_error_callback = _chain(self.on_model_error, agent.on_model_error_callback, True)
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> None:
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        span = self.tracer.start(
+            "model", "model", agent=callback_context.agent_name, model=getattr(llm_request, "model", None)
+        )
+        self._open[key] = (span, None)
+        return None
+
+    def after_model(self, callback_context: Any, llm_response: Any) -> None:
+        opened = self._open.pop(("model", callback_context.invocation_id, callback_context.agent_name), None)
+        if opened is not None:
+            usage = getattr(llm_response, "usage_metadata", None)
+            self.tracer.finish(
+                opened[0],
+                prompt_tokens=getattr(usage, "prompt_token_count", None),
+                output_tokens=getattr(usage, "candidates_token_count", None),
+            )
+        return None
+
+    def on_model_error(self, callback_context: Any, llm_request: Any, error: Exception) -> None:
+        opened = self._open.pop(("model", callback_context.invocation_id, callback_context.agent_name), None)
+        if opened is not None:
+            self.tracer.finish(opened[0], error)
+        return None
+
+    def before_tool(self, tool: Any, args: Dict[str, Any], tool_context: Any) -> None:
+        # AgentTool time is a nested agent turn, not tool work - keep it out of the tool totals
+        kind = "agent" if getattr(tool, "agent", None) is not None else "tool"
+        span = self.tracer.start(tool.name, kind, agent=tool_context.agent_name)
+        # DB statements the tool runs nest under it
+        self._open[("tool", tool_context.function_call_id)] = (span, current_span.set(span))
+        return None
+
+    def after_tool(self, tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> None:
+        opened = self._open.pop(("tool", tool_context.function_call_id), None)
+        if opened is not None:
+            span, token = opened
+            _restore(token)
+            success = tool_response.get("success") if isinstance(tool_response, dict) else None
+            self.tracer.finish(span, success=success)
+        return None
+
+    def on_tool_error(self, tool: Any, args: Dict[str, Any], tool_context: Any, error: Exception) -> None:
+        # after_tool is skipped when a tool raises - close its span here instead
+        opened = self._open.pop(("tool", tool_context.function_call_id), None)
+        if opened is not None:
+            span, token = opened
+            _restore(token)
+            self.tracer.finish(span, error)
+        return None
+
+
+# === Session service ===
+
+class TracedSessionService:
+    """Proxy that times every session-service read and write"""
+
+    TRACED = ("create_session", "get_session", "list_sessions", "delete_session", "append_event", "list_events")
+
+    def __init__(self, inner: Any, tracer: Tracer = tracer):
+        self._inner = inner
+        self._tracer = tracer
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._inner, name)
+        if name not in self.TRACED or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def traced(*args: Any, **kwargs: Any) -> Any:
+            with self._tracer.span(name, "session"):
+                return await attr(*args, **kwargs)
+        return traced
+
+
+def install_tracing(root_agent: Any, session_service: Any) -> Any:
+    """
+    Attach model/tool/DB tracing if CONTINUITY_TRACE_FILE is set.
+
+    Returns:
+        The session service to use (wrapped when tracing is on)
+    """
+    if not tracer.enabled:
+        return session_service
+    AgentTracer(tracer).install(root_agent)
+    add_statement_hook(tracer.on_statement)
+    print(f"Tracing turns to {tracer.path}")
+    return TracedSessionService(session_service, tracer)
+
+
+# === Offline summary ===
+
+def read_turns(path: str) -> List[Dict[str, Any]]:
+    """The turn summary lines of a trace file"""
+    turns = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("type") == "turn":
+                    turns.append(record)
+    return turns
+
+
+def summarize_turns(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Percentiles across turns, per span kind, plus totals per tool"""
+
+    def pct(values: List[float], p: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0.0
+
+    overall = {}
+    for kind in ("duration",) + SUMMARY_KINDS:
+        values = [t["duration_ms"] if kind == "duration" else t[kind]["ms"] for t in turns]
+        overall[kind] = {"p50_ms": pct(values, 50), "p95_ms": pct(values, 95), "max_ms": max(values, default=0.0)}
+    tools: Dict[str, Dict[str, float]] = {}
+    for t in turns:
+        for name, tool in t["tools"].items():
+            total = tools.setdefault(name, {"count": 0, "ms": 0.0})
+            total["count"] += tool["count"]
+            total["ms"] += tool["ms"]
+    return {"turns": len(turns), "per_turn": overall, "tools": tools}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize a Continuity trace file")
+    parser.add_argument("path", help="JSONL written with CONTINUITY_TRACE_FILE")
+    parser.add_argument("--turns", action="store_true", help="also print every turn summary line")
+    args = parser.parse_args(argv)
+
+    turns = read_turns(args.path)
+    if args.turns:
+        for turn in turns:
+            parts = ", ".join(f"{kind} {turn[kind]['ms']:.1f}ms/{turn[kind]['count']}" for kind in SUMMARY_KINDS)
+            print(f"{turn['trace_id'][:8]} {turn['duration_ms']:.1f}ms  {parts}")
+    print(json.dumps(summarize_turns(turns), indent=2))
+
+
+if __name__ == "__main__":
+    main()
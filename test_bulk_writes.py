@@ -0,0 +1,125 @@
+# test_bulk_writes.py
+import pytest
+
+from database import models
+from database.connection import DatabaseConnection
+from database.models import ImageModel, SceneModel, UserModel, VideoModel, user_cache
+
+
+@pytest.fixture
+def bulk_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "bulk.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    user_cache.clear()
+    yield db
+    user_cache.clear()
+    db.close_all()
+
+
+@pytest.fixture
+def video(bulk_db):
+    user = UserModel.create("bulk@example.com")
+    return VideoModel.create(user["user_id"], "Bulk")
+
+
+def _script(count, prefix="Scene"):
+    return [{"scene_number": n, "visual_description": f"{prefix} {n}"} for n in range(1, count + 1)]
+
+
+def test_script_is_one_commit(bulk_db, video):
+    before = bulk_db.pool_stats()["checkouts"]
+    ids = SceneModel.save_script(video["video_id"], "full script", _script(24))
+    assert bulk_db.pool_stats()["checkouts"] == before + 1
+    assert sorted(ids) == list(range(1, 25))
+
+    # Rewrite: shorter script keeps scene ids by number and drops the rest
+    rewritten = SceneModel.save_script(video["video_id"], "v2", _script(18, prefix="New"))
+    assert rewritten == {n: ids[n] for n in range(1, 19)}
+    scenes = SceneModel.list_for_video(video["video_id"])
+    assert [s["visual_description"] for s in scenes] == [f"New {n}" for n in range(1, 19)]
+    assert VideoModel.get_by_id(video["video_id"])["scene_count"] == 18
+
+
+def test_image_batch_updates_counters_and_cost(bulk_db, video):
+    scene_ids = SceneModel.upsert_many(video["video_id"], _script(3))
+    batch = [
+        {"scene_id": scene_ids[n], "image_path": f"img{n}.png", "generation_cost": 0.04}
+        for n in (1, 2, 3)
+    ] + [{"scene_id": scene_ids[1], "image_path": "img1b.png", "generation_cost": 0.04}]
+    image_ids = ImageModel.bulk_create(video["video_id"], batch)
+
+    attempts = [image["attempt_number"] for image in ImageModel.list_for_scene(scene_ids[1])]
+    assert attempts == [1, 2]
+
+    row = VideoModel.get_by_id(video["video_id"])
+    assert row["images_generated_count"] == 4
+    assert row["total_cost"] == pytest.approx(0.16)
+    assert UserModel.find_by_id(video["user_id"])["current_month_cost"] == pytest.approx(0.16)
+
+    # Re-sending the same images only charges the cost difference
+    result = ImageModel.upsert_many(video["video_id"], [
+        {"image_id": image_ids[0], "scene_id": scene_ids[1], "image_path": "img1.png", "generation_cost": 0.05},
+        {"scene_id": scene_ids[2], "image_path": "img2b.png", "generation_cost": 0.04},
+    ])
+    assert result == {"inserted": 1, "updated": 1}
+    row = VideoModel.get_by_id(video["video_id"])
+    assert row["images_generated_count"] == 5
+    assert row["total_cost"] == pytest.approx(0.21)
+
+
+def test_status_transitions(bulk_db, video):
+    scene_ids = SceneModel.upsert_many(video["video_id"], _script(2))
+    first, second = ImageModel.bulk_create(video["video_id"], [
+        {"scene_id": scene_ids[1], "image_path": "a.png"},
+        {"scene_id": scene_ids[2], "image_path": "b.png"},
+    ])
+
+    assert ImageModel.set_statuses([(first, "approved", None), (second, "rejected", "blurry")]) == 2
+    # rejected -> approved is not a valid transition
+    assert ImageModel.set_statuses([(second, "approved", None)]) == 0
+    assert VideoModel.get_by_id(video["video_id"])["approved_image_count"] == 1
+    with pytest.raises(ValueError):
+        ImageModel.set_statuses([(first, "deleted", None)])
+
+
+def test_failed_batch_writes_nothing(bulk_db, video):
+    scene_ids = SceneModel.upsert_many(video["video_id"], _script(1))
+    with pytest.raises(ValueError):
+        ImageModel.bulk_create("missing-video", [{"scene_id": scene_ids[1], "image_path": "x.png"}])
+    assert ImageModel.list_for_scene(scene_ids[1]) == []
+
+
+def test_upsert_keeps_reviewed_status(bulk_db, video):
+    scene_ids = SceneModel.upsert_many(video["video_id"], _script(1))
+    image = {"scene_id": scene_ids[1], "image_path": "a.png"}
+    (image_id,) = ImageModel.bulk_create(video["video_id"], [image])
+    ImageModel.set_statuses([(image_id, "approved", None)])
+
+    # Re-sending the image without a status (or as it was created) does not undo the review
+    ImageModel.upsert_many(video["video_id"], [dict(image, image_id=image_id, clip_path="a.mp4")])
+    assert ImageModel.list_for_scene(scene_ids[1])[0]["status"] == "approved"
+    with pytest.raises(ValueError):
+        ImageModel.upsert_many(video["video_id"], [dict(image, image_id=image_id, status="pending")])
+
+    # An explicit status still has to be a valid transition
+    ImageModel.upsert_many(video["video_id"], [dict(image, image_id=image_id, status="rejected", rejected_reason="blurry")])
+    stored = ImageModel.list_for_scene(scene_ids[1])[0]
+    assert (stored["status"], stored["rejected_reason"]) == ("rejected", "blurry")
+    assert VideoModel.get_by_id(video["video_id"])["approved_image_count"] == 0
+
+
+def test_rewritten_script_drops_images_of_removed_scenes(bulk_db, video):
+    scene_ids = SceneModel.save_script(video["video_id"], "v1", _script(3))
+    image_ids = ImageModel.bulk_create(video["video_id"], [
+        {"scene_id": scene_ids[n], "image_path": f"{n}.png"} for n in (1, 3)
+    ])
+    ImageModel.set_statuses([(image_id, "approved", None) for image_id in image_ids])
+
+    SceneModel.save_script(video["video_id"], "v2", _script(2))
+    with bulk_db.get_connection() as conn:
+        orphans = conn.execute(
+            "SELECT COUNT(*) FROM images WHERE scene_id NOT IN (SELECT scene_id FROM scenes)"
+        ).fetchone()[0]
+    assert orphans == 0
+    assert [image["image_id"] for image in ImageModel.list_for_scene(scene_ids[1])] == image_ids[:1]
+    assert VideoModel.get_by_id(video["video_id"])["approved_image_count"] == 1
@@ -0,0 +1,26 @@
+# test_checkpoint_writer.py
+import time
+
+from database import checkpoint_writer
+
+
+def test_failing_checkpoint_flush_backs_off_and_logs_once(monkeypatch, capsys):
+    attempts = []
+
+    def failing_write(checkpoints):
+        attempts.append(time.perf_counter())
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(checkpoint_writer, "write_checkpoints", failing_write)
+    writer = checkpoint_writer.CheckpointWriter(window_seconds=0.05, max_backoff_seconds=0.2)
+    writer.submit("v1", {"next_scene": 1})
+    time.sleep(1.0)
+    writer._stopped.set()
+    writer._wakeup.set()
+    writer._thread.join(1)
+
+    # 0.05, 0.1, 0.2, 0.2 ... instead of a retry every window
+    assert 3 <= len(attempts) <= 7
+    assert attempts[2] - attempts[1] > attempts[1] - attempts[0]
+    assert capsys.readouterr().out.count("Checkpoint flush failed") == 1
+    assert writer.has_pending("v1")
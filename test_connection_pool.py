@@ -0,0 +1,35 @@
+# test_connection_pool.py
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from database.connection import DatabaseConnection
+
+
+def test_connection_released_after_close_all_is_closed(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "pool.db"), pool_size=2)
+    with db.get_connection() as conn:
+        db.close_all()
+    assert db.pool_stats()["open_connections"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+def test_waiter_gets_replacement_for_dropped_connection(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "pool.db"), pool_size=1, checkout_timeout=5)
+    conn = db._checkout()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(db._checkout()))
+    waiter.start()
+    while db._waiters == 0:
+        time.sleep(0.01)
+
+    started = time.perf_counter()
+    db._release(conn, healthy=False)
+    waiter.join(5)
+    assert got and time.perf_counter() - started < 1
+    assert db.pool_stats()["open_connections"] == 1
+    db._release(got[0])
+    db.close_all()
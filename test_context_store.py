@@ -0,0 +1,34 @@
+# test_context_store.py
+import time
+
+from config import CURRENT_USER, CURRENT_VIDEO, FileContextStore, InMemoryContextStore
+
+
+def test_memory_store_is_bounded():
+    store = InMemoryContextStore(maxsize=2)
+    for key in ("web_a", "web_b", "web_c"):
+        store.set(key, CURRENT_USER, key)
+
+    assert store.get("web_a", CURRENT_USER) is None
+    assert store.get("web_c", CURRENT_USER) == "web_c"
+
+
+def test_memory_store_keys_expire():
+    store = InMemoryContextStore(ttl_seconds=0.05)
+    store.set("web_a", CURRENT_USER, "u1")
+    time.sleep(0.1)
+
+    assert store.get("web_a", CURRENT_USER) is None
+
+
+def test_discard_forgets_one_conversation(tmp_path):
+    for store in (InMemoryContextStore(), FileContextStore(tmp_path / ".continuity")):
+        for key in ("web_a", "web_b"):
+            store.set(key, CURRENT_USER, "u1")
+            store.set(key, CURRENT_VIDEO, "v1")
+
+        store.discard("web_a")
+
+        assert store.get("web_a", CURRENT_USER) is None
+        assert store.get("web_a", CURRENT_VIDEO) is None
+        assert store.get("web_b", CURRENT_VIDEO) == "v1"
@@ -0,0 +1,194 @@
+# test_email_outbox.py
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from database import models
+from database.connection import DatabaseConnection
+from database.models import EmailOutboxModel
+from database.records import OutboxMessage
+from services.email_outbox import EmailSender
+
+
+class RecordingHandler:
+    """Local SMTP stand-in: records messages and can refuse the first N with a code"""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.refuse = []                 # Queue of SMTP replies to give instead of 250
+        self.received = threading.Event()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        if self.refuse:
+            return self.refuse.pop(0)
+        self.messages.append(envelope)
+        self.received.set()
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def outbox_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "outbox.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    yield db
+    db.close_all()
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller
+    controller.stop()
+
+
+def _sender(controller, **kwargs):
+    return EmailSender(
+        host=controller.hostname, port=controller.port, starttls=False,
+        username="", password="", sender="noreply@continuity.test", **kwargs,
+    )
+
+
+def _statuses():
+    return EmailOutboxModel.count_by_status()
+
+
+def test_batch_reuses_one_connection(outbox_db, smtp_server):
+    handler, controller = smtp_server
+    sender = _sender(controller)
+    for i in range(5):
+        EmailOutboxModel.enqueue(f"user{i}@example.com", "Hi", "body", "<p>body</p>")
+
+    assert sender.send_due() == 5
+    assert len(handler.messages) == 5
+    assert len(handler.sessions) == 1
+    assert _statuses() == {"sent": 5}
+
+    stats = sender.stats()
+    assert stats["connections_opened"] == 1
+    assert stats["latency_ms"]["count"] == 5
+    sender.close()
+
+
+def test_transient_failure_is_retried_with_backoff(outbox_db, smtp_server):
+    handler, controller = smtp_server
+    handler.refuse = ["451 Try again later"]
+    sender = _sender(controller, backoff_seconds=0.2)
+    message_id = EmailOutboxModel.enqueue("user@example.com", "Hi", "body")
+
+    assert sender.send_due() == 0
+    assert _statuses() == {"pending": 1}
+    # Not due until the backoff has passed
+    assert sender.send_due() == 0
+
+    time.sleep(0.25)
+    assert sender.send_due() == 1
+    with outbox_db.get_connection() as conn:
+        row = conn.execute("SELECT * FROM email_outbox WHERE message_id = ?", (message_id,)).fetchone()
+    assert row["status"] == "sent"
+    assert row["attempts"] == 2
+    assert sender.stats()["retried"] == 1
+    sender.close()
+
+
+def test_permanent_failure_is_not_retried(outbox_db, smtp_server):
+    handler, controller = smtp_server
+    handler.refuse = ["550 No such user"]
+    sender = _sender(controller)
+    EmailOutboxModel.enqueue("nobody@example.com", "Hi", "body")
+
+    assert sender.send_due() == 0
+    assert _statuses() == {"failed": 1}
+    assert handler.messages == []
+    sender.close()
+
+
+def test_background_thread_delivers_after_wake(outbox_db, smtp_server):
+    handler, controller = smtp_server
+    sender = _sender(controller, poll_seconds=5)
+    EmailOutboxModel.enqueue("user@example.com", "Hi", "body")
+
+    started = time.perf_counter()
+    sender.wake()
+    assert handler.received.wait(5)
+    assert time.perf_counter() - started < 5
+    sender.close()
+    assert _statuses() == {"sent": 1}
+
+
+def test_stuck_messages_are_requeued_after_lease(outbox_db):
+    message_id = EmailOutboxModel.enqueue("user@example.com", "Hi", "body")
+    claimed, = EmailOutboxModel.claim_due()
+    assert isinstance(claimed, OutboxMessage)
+    assert (claimed.message_id, claimed["recipient"], claimed.attempts) == (message_id, "user@example.com", 0)
+    assert EmailOutboxModel.claim_due() == []
+    # Another sender may still be working on it
+    assert EmailOutboxModel.requeue_in_flight() == 0
+    expired = time.time() + EmailOutboxModel.LEASE_SECONDS + 1
+    assert EmailOutboxModel.requeue_in_flight(now=expired) == 1
+    assert len(EmailOutboxModel.claim_due()) == 1
+
+
+def _attempts():
+    with models.db_connection.get_connection() as conn:
+        return [row["attempts"] for row in conn.execute("SELECT attempts FROM email_outbox")]
+
+
+def test_unreachable_server_backs_off_without_failing(outbox_db):
+    sender = EmailSender(
+        host="127.0.0.1", port=_free_port(), starttls=False,
+        username="", password="", sender="noreply@continuity.test", backoff_seconds=0.2,
+    )
+    for i in range(3):
+        EmailOutboxModel.enqueue(f"user{i}@example.com", "Hi", "body")
+
+    assert sender.send_due() == 0
+    assert _statuses() == {"pending": 3}
+    assert _attempts() == [0, 0, 0]
+    # Held off: no new connection attempt until the backoff has passed
+    assert sender.send_due() == 0
+    assert sender.stats()["connect_failures"] == 1
+    sender.close()
+
+
+def test_rejected_login_is_retried_once_accepted(outbox_db):
+    handler = RecordingHandler()
+    accept = threading.Event()
+    controller = Controller(
+        handler, hostname="127.0.0.1", port=_free_port(), auth_require_tls=False,
+        authenticator=lambda *args: AuthResult(success=accept.is_set()),
+    )
+    controller.start()
+    try:
+        sender = EmailSender(
+            host=controller.hostname, port=controller.port, starttls=False,
+            username="user", password="wrong", sender="noreply@continuity.test", backoff_seconds=0.2,
+        )
+        EmailOutboxModel.enqueue("user@example.com", "Hi", "body")
+
+        assert sender.send_due() == 0                    # 535 from login
+        assert _statuses() == {"pending": 1}
+        assert _attempts() == [0]
+
+        accept.set()
+        time.sleep(0.25)
+        assert sender.send_due() == 1
+        assert _statuses() == {"sent": 1}
+        sender.close()
+    finally:
+        controller.stop()
@@ -0,0 +1,90 @@
+# test_fast_path.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from agents.fast_path import match_intent, try_fast_path
+from config import ACTIVE_VIDEO_KEY, InMemoryContextStore
+from database import models, prefetch
+from database.connection import DatabaseConnection
+from database.models import UserModel, VideoModel, user_cache
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("menu", ("menu", "")),
+    ("Show my videos", ("menu", "")),
+    ("more videos", ("more", "")),
+    ("continue Dragon Tale", ("continue", "Dragon Tale")),
+    ("new video: Robots", ("new_video", "Robots")),
+    ("new video called Robots", ("new_video", "Robots")),
+    ("create a new video titled 'Deep Sea'", ("new_video", "Deep Sea")),
+    ('create a video "Space Explorer"', ("new_video", "Space Explorer")),
+])
+def test_match_intent(message, intent):
+    assert match_intent(message) == intent
+
+
+@pytest.mark.parametrize("message", [
+    "create a video about a space explorer",
+    "new video with dragons please",
+    "new video",
+    "continue",
+    "hello",
+])
+def test_free_form_falls_through(message):
+    assert match_intent(message) is None
+
+
+class FakeSessionService:
+    """One session whose state follows the state_delta of appended events"""
+
+    def __init__(self, state):
+        self.session = SimpleNamespace(state=dict(state))
+        self.events = []
+
+    async def get_session(self, app_name, user_id, session_id):
+        return self.session
+
+    async def append_event(self, session, event):
+        self.events.append(event)
+        if event.actions and event.actions.state_delta:
+            session.state.update(event.actions.state_delta)
+
+
+@pytest.fixture
+def logged_in(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "fast_path.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    monkeypatch.setattr(config, "_context_store", InMemoryContextStore())
+    user_cache.clear()
+    prefetch.invalidate_all()
+    user = UserModel.create("fast@example.com")
+    yield FakeSessionService({"user:email": "fast@example.com", "user:verified_user_id": user["user_id"]})
+    user_cache.clear()
+    prefetch.invalidate_all()
+    db.close_all()
+
+
+def _turn(service, message):
+    return asyncio.run(try_fast_path(service, "continuity", "fast", message))
+
+
+def test_selected_video_hands_later_turns_to_the_workflow(logged_in):
+    assert _turn(logged_in, "new video called Robots") == "Created new video: Robots"
+    assert logged_in.session.state[ACTIVE_VIDEO_KEY]
+
+    # The next turn sees only persisted state; the workflow owns it now
+    logged_in.session.state = {k: v for k, v in logged_in.session.state.items() if not k.startswith("temp:")}
+    events = len(logged_in.events)
+    assert _turn(logged_in, "menu") is None
+    assert len(logged_in.events) == events
+
+
+def test_menu_without_a_workflow(logged_in):
+    VideoModel.create(logged_in.session.state["user:verified_user_id"], "Dragon Tale")
+    reply = _turn(logged_in, "menu")
+
+    assert "Dragon Tale" in reply
+    assert ACTIVE_VIDEO_KEY not in logged_in.session.state
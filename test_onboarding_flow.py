@@ -0,0 +1,120 @@
+# test_onboarding_flow.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from agents import onboarding_flow
+from agents.onboarding_flow import (
+    EMAIL_KEY, NAME_KEY, STEP_EMAIL, STEP_KEY, STEP_LLM, STEP_NAME, STEP_TOKEN, _TOKEN_RE, parse_name,
+    try_onboarding,
+)
+from config import InMemoryContextStore, load_current_user, use_context_key
+from database import models
+from database.connection import DatabaseConnection
+from database.models import UserModel, user_cache
+from services.auth_service import AuthService
+
+
+@pytest.mark.parametrize("message, allow_bare, name", [
+    ("My name is Sam", False, "Sam"),
+    ("hi, I'm Ann Lee.", False, "Ann Lee"),
+    ("call me José", False, "José"),
+    ("Sam", False, None),
+    ("Sam", True, "Sam"),
+    ("Mary Jane O'Neil-Smith", True, "Mary Jane O'Neil-Smith"),
+    ("what do you do?", True, None),
+    ("my name is 42", False, None),
+])
+def test_parse_name(message, allow_bare, name):
+    assert parse_name(message, allow_bare) == name
+
+
+def test_token_pattern():
+    token = "12345678-abcd-4bcd-8bcd-1234567890ab"
+    assert _TOKEN_RE.search(f"here it is: {token}").group(0) == token
+    assert _TOKEN_RE.search("12345678-abcd-4bcd-8bcd-1234567890") is None
+    assert _TOKEN_RE.search("my code is 123456") is None
+
+
+class FakeSessionService:
+    """One session whose state follows the state_delta of appended events, minus temp: keys"""
+
+    def __init__(self):
+        self.session = SimpleNamespace(state={})
+
+    async def get_session(self, app_name, user_id, session_id):
+        return self.session
+
+    async def append_event(self, session, event):
+        for key, value in ((event.actions and event.actions.state_delta) or {}).items():
+            if key.startswith("temp:"):
+                continue
+            if value is None:
+                session.state.pop(key, None)
+            else:
+                session.state[key] = value
+
+
+@pytest.fixture
+def visitor(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "onboarding.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    monkeypatch.setattr(config, "_context_store", InMemoryContextStore())
+    monkeypatch.setattr(onboarding_flow, "ONBOARDING_FLOW_ENABLED", True)
+    sent = []
+    monkeypatch.setattr(AuthService, "queue_magic_link", staticmethod(lambda email, token: sent.append((email, token)) or True))
+    user_cache.clear()
+    yield FakeSessionService(), sent
+    user_cache.clear()
+    db.close_all()
+
+
+def _say(service, message):
+    async def turn():
+        with use_context_key("web_onboarding"):
+            return await try_onboarding(service, "continuity", "visitor", message)
+    return asyncio.run(turn())
+
+
+def test_name_email_token(visitor):
+    service, sent = visitor
+    state = service.session.state
+
+    assert "what's your name" in _say(service, "hello")
+    assert state[STEP_KEY] == STEP_NAME
+    assert "Nice to meet you, Sam" in _say(service, "Sam")
+    assert state[STEP_KEY] == STEP_EMAIL and state[NAME_KEY] == "Sam"
+    assert "sent a code" in _say(service, "sure, it's sam@example.com")
+    assert state[STEP_KEY] == STEP_TOKEN and state[EMAIL_KEY] == "sam@example.com"
+
+    assert "doesn't match" in _say(service, "00000000-0000-0000-0000-000000000000")
+    assert state[STEP_KEY] == STEP_TOKEN
+    reply = _say(service, f"the code is {sent[-1][1]}")
+
+    assert reply == "Email verified! Welcome to Continuity, Sam!"
+    assert not {STEP_KEY, NAME_KEY, EMAIL_KEY} & set(state)
+    with use_context_key("web_onboarding"):
+        assert load_current_user() == UserModel.find_by_email("sam@example.com")["user_id"]
+
+
+def test_resend_code(visitor):
+    service, sent = visitor
+    _say(service, "My name is Sam")
+    _say(service, "sam@example.com")
+
+    assert "sent a code" in _say(service, "please resend")
+    assert [email for email, _ in sent] == ["sam@example.com", "sam@example.com"]
+    assert service.session.state[STEP_KEY] == STEP_TOKEN
+
+
+def test_free_form_hands_off_to_the_llm(visitor):
+    service, _ = visitor
+    assert _say(service, "what is this app?") is None
+    assert STEP_KEY not in service.session.state             # Nothing started yet - nothing to hand off
+
+    _say(service, "hey")
+    assert _say(service, "hmm, what do you do?") is None
+    assert service.session.state[STEP_KEY] == STEP_LLM
+    assert _say(service, "Sam") is None                      # greeting_agent owns the rest
@@ -0,0 +1,167 @@
+# test_prefetch.py
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from database import checkpoint_writer, models, prefetch, session_helpers
+from database.connection import DatabaseConnection
+from database.models import SceneModel, UserModel, VideoModel
+
+
+@pytest.fixture
+def prefetch_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "prefetch.db"), pool_size=2)
+    for module in (models, session_helpers, checkpoint_writer):
+        monkeypatch.setattr(module, "db_connection", db)
+    prefetch.invalidate_all()
+    yield db
+    prefetch.invalidate_all()
+    db.close_all()
+
+
+def _user_with_videos(count: int):
+    user_id = UserModel.create("prefetch@example.com")["user_id"]
+    video_ids = [VideoModel.create(user_id, f"Video {i}")["video_id"] for i in range(count)]
+    return user_id, video_ids
+
+
+def test_menu_served_from_prefetch(prefetch_db):
+    user_id, _ = _user_with_videos(3)
+    prefetch.start_login_prefetch(user_id)
+
+    page = asyncio.run(prefetch.warm_menu_page(user_id, prefetch.MENU_PAGE_SIZE))
+    before = prefetch_db.pool_stats()["checkouts"]
+    again = asyncio.run(prefetch.warm_menu_page(user_id, prefetch.MENU_PAGE_SIZE))
+
+    assert prefetch_db.pool_stats()["checkouts"] == before
+    assert again is page
+    assert page == VideoModel.list_page(user_id, prefetch.MENU_PAGE_SIZE)
+
+
+def test_smaller_pages_match_list_page(prefetch_db):
+    user_id, _ = _user_with_videos(5)
+    prefetch.start_login_prefetch(user_id)
+
+    assert asyncio.run(prefetch.warm_menu_page(user_id, 2)) == VideoModel.list_page(user_id, 2)
+    assert asyncio.run(prefetch.warm_menu_page(user_id, 50)) == VideoModel.list_page(user_id, 50)
+
+
+def test_writes_drop_warm_results(prefetch_db):
+    user_id, video_ids = _user_with_videos(2)
+    prefetch.start_login_prefetch(user_id, video_ids[0])
+    assert asyncio.run(prefetch.warm_menu_page(user_id, 10)) is not None
+
+    VideoModel.create(user_id, "Newest")
+    assert asyncio.run(prefetch.warm_menu_page(user_id, 10)) is None
+
+    assert asyncio.run(prefetch.warm_video(video_ids[0], user_id)) is not None
+    SceneModel.bulk_create(video_ids[0], [{"scene_number": 1, "visual_description": "x"}])
+    assert asyncio.run(prefetch.warm_video(video_ids[0], user_id)) is None
+    assert asyncio.run(prefetch.take_warm_state(video_ids[0], user_id)) is None
+
+
+def test_state_handed_out_once_and_owner_checked(prefetch_db):
+    user_id, video_ids = _user_with_videos(1)
+    prefetch.start_login_prefetch(user_id, video_ids[0])
+
+    assert asyncio.run(prefetch.warm_video(video_ids[0], "someone-else")) is None
+    state = asyncio.run(prefetch.take_warm_state(video_ids[0], user_id))
+    assert state["temp:video_id"] == video_ids[0]
+    assert state["user:verified_user_id"] == user_id
+    assert asyncio.run(prefetch.take_warm_state(video_ids[0], user_id)) is None
+
+
+def test_checkpoint_write_drops_prefetched_state(prefetch_db):
+    user_id, video_ids = _user_with_videos(1)
+    prefetch.start_login_prefetch(user_id, video_ids[0])
+    asyncio.run(prefetch.warm_video(video_ids[0], user_id))
+
+    session_helpers.save_checkpoint(video_ids[0], {"next_scene": 1})
+    assert asyncio.run(prefetch.take_warm_state(video_ids[0], user_id)) is None
+
+
+def _slow_fill(key, value):
+    """Submit a fill that finishes only when the returned event is set"""
+    release = threading.Event()
+
+    def read():
+        release.wait(5)
+        return value
+    prefetch._submit(key, read)
+    return release
+
+
+def test_unrelated_write_keeps_inflight_reads(prefetch_db):
+    release = _slow_fill(("video", "v1"), {"user_id": "u1"})
+    prefetch.invalidate_user("someone-else")
+    release.set()
+
+    assert asyncio.run(prefetch.warm_video("v1", "u1")) == {"user_id": "u1"}
+
+
+def test_waiter_does_not_get_value_dropped_while_waiting(prefetch_db):
+    release = _slow_fill(("video", "v1"), {"user_id": "u1"})
+
+    async def wait_then_drop():
+        waiter = asyncio.ensure_future(prefetch.warm_video("v1", "u1"))
+        await asyncio.sleep(0.05)                        # waiter now holds the in-flight future
+        prefetch.invalidate_video("v1")
+        release.set()
+        return await waiter
+
+    assert asyncio.run(wait_then_drop()) is None
+
+
+class FreshSessionService:
+    """Hands out a new Session object on every read, like DatabaseSessionService"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.reads = 0
+
+    async def get_session(self, app_name, user_id, session_id):
+        self.reads += 1
+        state = self.sessions.get(session_id)
+        return None if state is None else SimpleNamespace(id=session_id, state=dict(state))
+
+    async def create_session(self, app_name, user_id, session_id, state):
+        self.sessions[session_id] = dict(state)
+        return SimpleNamespace(id=session_id, state=dict(state))
+
+
+def test_cached_video_session_is_fetched_fresh(prefetch_db):
+    user_id, video_ids = _user_with_videos(1)
+    service = FreshSessionService()
+    session_helpers.session_cache.clear()
+
+    async def open_twice():
+        first = await session_helpers.get_or_create_adk_session_for_video(service, video_ids[0], user_id)
+        service.sessions[first.id]["temp:next_scene_to_generate"] = 3     # Another turn moved it on
+        second = await session_helpers.get_or_create_adk_session_for_video(service, video_ids[0], user_id)
+        return first, second
+
+    first, second = asyncio.run(open_twice())
+    assert second.id == first.id and second is not first
+    assert second.state["temp:next_scene_to_generate"] == 3
+    assert session_helpers.session_cache.get((user_id, video_ids[0])) == first.id
+
+
+def test_fill_finishing_during_lookup_is_not_missed(prefetch_db, monkeypatch):
+    release = _slow_fill(("video", "v1"), {"user_id": "u1"})
+    cache_get = prefetch.warm_cache.get
+
+    def get_while_fill_finishes(key):
+        value = cache_get(key)
+        release.set()
+        # Give the fill its chance to finish right between the cache and in-flight lookups
+        for _ in range(20):
+            if ("video", "v1") not in prefetch._inflight:
+                break
+            time.sleep(0.01)
+        return value
+
+    monkeypatch.setattr(prefetch.warm_cache, "get", get_while_fill_finishes)
+    assert asyncio.run(prefetch.warm_video("v1", "u1")) == {"user_id": "u1"}
@@ -0,0 +1,72 @@
+# test_query_stats.py
+import sqlite3
+
+import pytest
+
+from database import models
+from database.connection import DatabaseConnection
+from database.instrumentation import InstrumentedConnection, normalize_sql
+from database.models import SceneModel, UserModel, VideoModel, user_cache
+
+
+@pytest.fixture
+def stats_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "stats.db"), pool_size=2, instrument=True)
+    monkeypatch.setattr(models, "db_connection", db)
+    user_cache.clear()
+    db.query_stats.reset()
+    yield db
+    user_cache.clear()
+    db.close_all()
+
+
+def _statement(snapshot, prefix):
+    return next(s for s in snapshot["statements"] if s["sql"].startswith(prefix))
+
+
+def test_normalize_sql_groups_one_query_shape():
+    a = normalize_sql("SELECT *\n  FROM scenes WHERE video_id = 'abc' AND scene_number IN (?, ?, ?) LIMIT 5")
+    b = normalize_sql("SELECT * FROM scenes WHERE video_id = 'x' AND scene_number IN (?,?) LIMIT 10")
+    assert a == b == "SELECT * FROM scenes WHERE video_id = ? AND scene_number IN (...) LIMIT ?"
+    assert normalize_sql("ALTER TABLE t_v5 RENAME TO t") == "ALTER TABLE t_v5 RENAME TO t"
+
+
+def test_statements_rows_and_transactions_are_recorded(stats_db):
+    user = UserModel.create("q@example.com")
+    video = VideoModel.create(user["user_id"], "Stats")
+    SceneModel.bulk_create(video["video_id"], [{"scene_number": n, "visual_description": f"S{n}"} for n in range(1, 6)])
+    for _ in range(3):
+        assert len(SceneModel.list_for_video(video["video_id"])) == 5
+    with stats_db.get_connection() as conn:
+        assert len([row for row in conn.execute("SELECT scene_id FROM scenes")]) == 5
+
+    snapshot = stats_db.query_stats_snapshot()
+    listing = _statement(snapshot, "SELECT scene_id, video_id, scene_number")
+    assert listing["count"] == 3 and listing["rows"] == 15
+    assert sum(listing["buckets"].values()) == 3
+    assert _statement(snapshot, "SELECT scene_id FROM scenes")["rows"] == 5
+    assert _statement(snapshot, "INSERT INTO scenes")["rows_changed"] == 5
+    assert snapshot["transactions"]["count"] >= 3
+
+
+def test_slow_queries_capture_query_plan(stats_db):
+    stats_db.query_stats.slow_query_ms = 0.0
+    user = UserModel.create("slow@example.com")
+    VideoModel.list_page(user["user_id"])
+
+    slow = [entry for entry in stats_db.query_stats_snapshot()["slow_queries"] if "FROM videos" in entry["sql"]]
+    assert slow
+    assert any("idx_videos_user_updated" in line for line in slow[-1]["plan"])
+
+
+def test_instrumentation_is_opt_in(tmp_path):
+    db = DatabaseConnection(str(tmp_path / "plain.db"), pool_size=1, instrument=False)
+    with db.get_connection() as conn:
+        assert type(conn) is sqlite3.Connection
+    assert db.query_stats_snapshot() == {"enabled": False}
+    db.close_all()
+
+    db = DatabaseConnection(str(tmp_path / "traced.db"), pool_size=1, instrument=True)
+    with db.get_connection() as conn:
+        assert isinstance(conn, InstrumentedConnection)
+    db.close_all()
@@ -0,0 +1,54 @@
+# test_records.py
+import json
+import pickle
+
+import pytest
+
+from database import models
+from database.connection import DatabaseConnection
+from database.models import SceneModel, UserModel, VideoModel, user_cache
+from database.records import SceneRecord, VideoRecord, VideoSummary
+
+
+@pytest.fixture
+def records_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "records.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    user_cache.clear()
+    yield db
+    user_cache.clear()
+    db.close_all()
+
+
+def test_record_reads_like_a_dict():
+    scene = SceneRecord.of(scene_id="s1", scene_number=2, visual_description="A robot")
+    assert scene["scene_number"] == 2 and scene.scene_number == 2
+    assert scene.get("voiceover") is None and scene.get("missing", "x") == "x"
+    assert "visual_description" in scene and "A robot" not in scene
+    assert dict(scene) == scene.to_dict()
+    assert list(scene.keys()) == list(SceneRecord.COLUMNS)
+    with pytest.raises(KeyError):
+        scene["missing"]
+    with pytest.raises(TypeError):
+        SceneRecord.of(nope=1)
+    assert pickle.loads(pickle.dumps(scene)) == scene
+
+
+def test_models_return_records_with_every_column(records_db):
+    user = UserModel.create("r@example.com")
+    video = VideoModel.create(user["user_id"], "Records")
+    SceneModel.bulk_create(video["video_id"], [{"scene_number": 1, "visual_description": "Opening"}])
+
+    row = VideoModel.get_by_id(video["video_id"])
+    assert isinstance(row, VideoRecord)
+    with records_db.get_connection() as conn:
+        raw = conn.execute("SELECT * FROM videos WHERE video_id = ?", (video["video_id"],)).fetchone()
+    assert row.to_dict() == dict(raw)
+
+    [summary] = VideoModel.list_for_user(user["user_id"])
+    assert isinstance(summary, VideoSummary)
+    assert summary["scene_count"] == 1
+    json.dumps(summary.to_dict())
+
+    [scene] = SceneModel.list_for_video(video["video_id"])
+    assert scene.video_id == video["video_id"] and scene.visual_description == "Opening"
@@ -0,0 +1,149 @@
+# test_schema_migrations.py
+import sqlite3
+
+import pytest
+
+from database.connection import DatabaseConnection
+from database.migrations import MIGRATIONS, SCHEMA_VERSION, get_schema_version, run_migrations
+
+# Hot query shapes from tools/video_tools.py, database/session_helpers.py and database/models.py
+HOT_QUERIES = {
+    "list_user_videos": (
+        """
+        SELECT video_id, title, status, created_at, updated_at, scene_count, approved_image_count
+        FROM videos
+        WHERE user_id = ?
+        ORDER BY updated_at DESC, video_id DESC
+        LIMIT 11
+        """,
+        ("user-1",),
+    ),
+    "list_user_videos_next_page": (
+        """
+        SELECT video_id, title, status, created_at, updated_at, scene_count, approved_image_count
+        FROM videos
+        WHERE user_id = ?
+        AND (updated_at, video_id) < (?, ?)
+        ORDER BY updated_at DESC, video_id DESC
+        LIMIT 11
+        """,
+        ("user-1", "2025-01-01 00:00:00", "video-9"),
+    ),
+    "scenes_for_video": (
+        """
+        SELECT scene_number, visual_description
+        FROM scenes
+        WHERE video_id = ?
+        ORDER BY scene_number
+        """,
+        ("video-1",),
+    ),
+    "approved_images_for_video": (
+        """
+        SELECT s.scene_number, i.image_path
+        FROM images i
+        JOIN scenes s ON i.scene_id = s.scene_id
+        WHERE s.video_id = ?
+        AND i.status = 'approved'
+        ORDER BY s.scene_number
+        """,
+        ("video-1",),
+    ),
+    "verify_token": (
+        """
+        UPDATE verification_tokens
+        SET used = 1, expires_at = ?
+        WHERE token = ?
+        AND used = 0
+        AND expires_at > ?
+        RETURNING email
+        """,
+        (1700000000, "token-1", 1700000000),
+    ),
+    "delete_expired_tokens_chunk": (
+        """
+        DELETE FROM verification_tokens
+        WHERE rowid IN (
+            SELECT rowid FROM verification_tokens
+            WHERE expires_at < ?
+            LIMIT ?
+        )
+        """,
+        (1700000000, 500),
+    ),
+}
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = DatabaseConnection(db_path=str(tmp_path / "continuity.db"))
+    yield database
+    database.close_all()
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params: tuple) -> list:
+    return [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def test_schema_is_current_after_init(db):
+    with db.get_connection() as conn:
+        assert get_schema_version(conn) == SCHEMA_VERSION
+
+
+def test_migrations_skip_when_current(db):
+    with db.get_connection() as conn:
+        assert run_migrations(conn) == []
+
+
+def test_migrations_upgrade_unversioned_database(tmp_path, capsys, caplog):
+    """Databases created before versioning (user_version = 0) are brought up to date"""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, email TEXT UNIQUE NOT NULL)")
+    conn.close()
+
+    database = DatabaseConnection(db_path=str(path))
+    with caplog.at_level("INFO", logger="database.migrations"):
+        with database.get_connection() as conn:
+            assert get_schema_version(conn) == SCHEMA_VERSION
+    database.close_all()
+
+    # Progress goes to the log; stdout stays clean for callers that print JSON
+    assert capsys.readouterr().out == ""
+    assert f"Applied migration {SCHEMA_VERSION}: {MIGRATIONS[-1][1]}" in caplog.messages
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(db, name):
+    sql, params = HOT_QUERIES[name]
+    with db.get_connection() as conn:
+        plan = _plan(conn, sql, params)
+
+    assert plan, f"{name}: empty query plan"
+    for detail in plan:
+        assert not detail.startswith("SCAN"), f"{name}: full scan in plan {plan}"
+        assert "TEMP B-TREE" not in detail, f"{name}: sort not served by index {plan}"
+    assert any("INDEX" in detail for detail in plan), f"{name}: no index used {plan}"
+
+
+def test_token_expiry_migrated_to_epoch(tmp_path):
+    """ISO expiry strings from before migration 5 become epoch seconds; used tokens expire"""
+    path = tmp_path / "tokens.db"
+    conn = sqlite3.connect(path)
+    for version, _, statements in MIGRATIONS[:4]:
+        for statement in statements:
+            conn.execute(statement)
+    conn.execute("PRAGMA user_version = 4")
+    conn.executemany(
+        "INSERT INTO verification_tokens (token, email, expires_at, used) VALUES (?, ?, ?, ?)",
+        [("live", "a@example.com", "2100-01-01T00:00:00.123456", 0),
+         ("spent", "b@example.com", "2100-01-01T00:00:00", 1)],
+    )
+    conn.commit()
+    conn.close()
+
+    database = DatabaseConnection(db_path=str(path))
+    with database.get_connection() as conn:
+        rows = {row["token"]: row["expires_at"] for row in conn.execute("SELECT * FROM verification_tokens")}
+    database.close_all()
+    assert rows == {"live": 4102444800, "spent": 0}
@@ -0,0 +1,90 @@
+# test_server.py
+import asyncio
+import json
+
+import config
+import server
+from config import CURRENT_USER, InMemoryContextStore, load_current_user, save_current_user
+from server import ChatServer
+
+
+async def _request(port: int, raw: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+def _chat(conversation: str) -> bytes:
+    body = json.dumps({"session": conversation, "message": "hi"}).encode()
+    return b"POST /chat HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+
+
+def _run(chat_server: ChatServer, *requests: bytes):
+    async def go():
+        listener = await asyncio.start_server(chat_server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await asyncio.gather(*(_request(port, raw) for raw in requests))
+    return asyncio.run(go())
+
+
+def test_malformed_requests_get_400():
+    responses = _run(
+        ChatServer(),
+        b"GARBAGE\r\n\r\n",
+        b"POST /chat HTTP/1.1\r\nContent-Length: lots\r\n\r\n",
+        b"POST /chat HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+    )
+    assert all(response.startswith(b"HTTP/1.1 400 ") for response in responses)
+
+
+def test_inflight_cap_is_per_user_not_per_conversation(monkeypatch):
+    async def prepare_session(anonymous_session_id):
+        return "user-1", []                              # Both conversations belong to one user
+
+    async def stream_turn(session_id, message):
+        await asyncio.sleep(0.2)
+        yield "ok"
+
+    monkeypatch.setattr(server, "prepare_session", prepare_session)
+    monkeypatch.setattr(server, "stream_turn", stream_turn)
+    first, second = _run(ChatServer(max_inflight_per_user=1), _chat("tab-1"), _chat("tab-2"))
+
+    statuses = sorted(response.split(b" ", 2)[1] for response in (first, second))
+    assert statuses == [b"200", b"429"]
+
+
+def test_context_key_is_minted_by_the_server(monkeypatch):
+    seen = []
+
+    async def prepare_session(anonymous_session_id):
+        seen.append((anonymous_session_id, config._context_key.get()))
+        if len(seen) == 1:
+            save_current_user("user-1")
+            return "user-1", []
+        save_current_user("half-open")
+        raise RuntimeError("session DB unavailable")
+
+    async def stream_turn(session_id, message):
+        yield load_current_user()
+
+    store = InMemoryContextStore()
+    monkeypatch.setattr(config, "_context_store", store)
+    monkeypatch.setattr(server, "prepare_session", prepare_session)
+    monkeypatch.setattr(server, "stream_turn", stream_turn)
+    chat_server = ChatServer()
+    first, = _run(chat_server, _chat("../cli"))
+    again, = _run(chat_server, _chat("../cli"))
+    failed, = _run(chat_server, _chat("tab-2"))
+
+    assert b'{"text": "user-1"}' in first and b'{"text": "user-1"}' in again
+    assert len(seen) == 2
+    (anonymous_id, context_key), (failed_id, failed_key) = seen
+    assert context_key == anonymous_id and context_key.startswith("web_") and "cli" not in context_key
+    assert store.get("../cli", CURRENT_USER) is None
+    # A conversation that failed to open leaves nothing behind
+    assert failed.startswith(b"HTTP/1.1 500 ")
+    assert store.get(failed_key, CURRENT_USER) is None
@@ -0,0 +1,94 @@
+# test_session_compaction.py
+import json
+import sqlite3
+
+import pytest
+
+from database.session_compaction import (
+    COMPACTED_COUNT_STATE_KEY, SUMMARY_STATE_KEY, compact_session, compact_sessions,
+)
+
+
+@pytest.fixture
+def session_db(tmp_path):
+    """Just the columns of ADK's events/sessions tables that compaction touches"""
+    path = str(tmp_path / "adk_sessions.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (app_name TEXT, user_id TEXT, id TEXT, state TEXT)")
+    conn.execute(
+        """
+        CREATE TABLE events (
+            id TEXT, app_name TEXT, user_id TEXT, session_id TEXT,
+            author TEXT, content TEXT, actions BLOB, timestamp REAL
+        )
+        """
+    )
+    conn.execute("INSERT INTO sessions VALUES ('continuity', 'u1', 's1', '{}')")
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def _add_events(conn, authors):
+    start = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO events VALUES (?, 'continuity', 'u1', 's1', ?, ?, '', ?)",
+        [
+            (f"e{start + i}", author, json.dumps({"parts": [{"text": f"message {start + i}"}]}), float(start + i))
+            for i, author in enumerate(authors)
+        ],
+    )
+    conn.commit()
+
+
+def _kept(conn):
+    return [row[0] for row in conn.execute("SELECT id FROM events ORDER BY timestamp")]
+
+
+def test_cut_moves_back_to_a_user_turn(session_db):
+    _, conn = session_db
+    _add_events(conn, ["user", "root_agent"] * 5)               # e0..e9, user turns at even ids
+
+    with conn:
+        result = compact_session(conn, "continuity", "u1", "s1", keep_events=3)
+
+    # The last 3 would start at e7 (a reply); the window grows back to e6
+    assert result["events_removed"] == 6
+    assert _kept(conn) == ["e6", "e7", "e8", "e9"]
+    state = json.loads(conn.execute("SELECT state FROM sessions").fetchone()[0])
+    assert state[COMPACTED_COUNT_STATE_KEY] == 6
+    assert state[SUMMARY_STATE_KEY].splitlines()[0] == "user: message 0"
+
+
+def test_no_user_turn_keeps_everything(session_db):
+    _, conn = session_db
+    _add_events(conn, ["root_agent"] * 8)
+
+    with conn:
+        result = compact_session(conn, "continuity", "u1", "s1", keep_events=3)
+
+    assert result["events_removed"] == 0
+    assert len(_kept(conn)) == 8
+
+
+def test_tail_without_user_turn_is_kept(session_db):
+    _, conn = session_db
+    _add_events(conn, ["user"] + ["root_agent"] * 9)             # One long tool-calling turn
+
+    with conn:
+        result = compact_session(conn, "continuity", "u1", "s1", keep_events=3)
+
+    assert result["events_removed"] == 0
+    assert len(_kept(conn)) == 10
+
+
+def test_compact_sessions_by_threshold(session_db):
+    path, conn = session_db
+    _add_events(conn, ["user", "root_agent"] * 4)
+
+    assert compact_sessions(db_path=path, keep_events=2, threshold=10)["events_removed"] == 0
+    stats = compact_sessions(db_path=path, keep_events=2, threshold=4, user_id="u1")
+
+    assert stats["sessions_compacted"] == 1
+    assert stats["events_removed"] == 6
+    assert _kept(conn) == ["e6", "e7"]
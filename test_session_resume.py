@@ -0,0 +1,116 @@
+# test_session_resume.py
+import time
+from datetime import datetime
+
+import pytest
+
+from database import checkpoint_writer, models, prefetch, session_helpers
+from database.connection import DatabaseConnection
+from database.models import ImageModel, SceneModel, UserModel, VideoModel, user_cache
+from database.session_helpers import build_state_from_db, get_resume_snapshot, save_checkpoint
+
+
+@pytest.fixture
+def resume_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "resume.db"), pool_size=2)
+    for module in (models, session_helpers, checkpoint_writer):
+        monkeypatch.setattr(module, "db_connection", db)
+    user_cache.clear()
+    prefetch.invalidate_all()
+    yield db
+    user_cache.clear()
+    prefetch.invalidate_all()
+    db.close_all()
+
+
+@pytest.fixture
+def video(resume_db):
+    """Four scenes, the first two with approved images"""
+    user = UserModel.create("resume@example.com", user_name="Ada")
+    video = VideoModel.create(user["user_id"], "Resume")
+    scene_ids = SceneModel.save_script(
+        video["video_id"], "script",
+        [{"scene_number": n, "visual_description": f"Scene {n}"} for n in range(1, 5)],
+    )
+    image_ids = ImageModel.bulk_create(video["video_id"], [
+        {"scene_id": scene_ids[n], "image_path": f"/img/{n}.png", "status": "approved"} for n in (1, 2)
+    ])
+    return {"user_id": user["user_id"], "video_id": video["video_id"], "image_ids": image_ids}
+
+
+def _checkpoint(video_id):
+    save_checkpoint(video_id, {
+        "next_scene": 3,
+        "current_batch": 2,
+        "character_reference_path": "/img/ref.png",
+        "session_cost": 1.5,
+        "last_updated_at": datetime.utcnow().isoformat() + "Z",
+    })
+
+
+def _carried(checkpoint):
+    return (checkpoint["current_batch"], checkpoint["character_reference_path"], checkpoint["session_cost"])
+
+
+def test_resume_from_checkpoint(video):
+    _checkpoint(video["video_id"])
+    snapshot = get_resume_snapshot(video["video_id"], video["user_id"])
+
+    assert snapshot["next_scene"] == 3
+    assert _carried(snapshot["checkpoint"]) == (2, "/img/ref.png", 1.5)
+
+
+def test_regressed_checkpoint_keeps_its_fields(video):
+    _checkpoint(video["video_id"])
+    time.sleep(0.005)                                   # Past the checkpoint's millisecond, not its second
+    ImageModel.set_statuses([(video["image_ids"][0], "rejected", "blurry")])
+    snapshot = get_resume_snapshot(video["video_id"], video["user_id"])
+
+    assert snapshot["next_scene"] == 1
+    assert _carried(snapshot["checkpoint"]) == (2, "/img/ref.png", 1.5)
+
+
+def test_resume_without_checkpoint(video):
+    snapshot = get_resume_snapshot(video["video_id"], video["user_id"])
+
+    assert snapshot["checkpoint"] is None
+    assert snapshot["next_scene"] == 3
+
+
+def test_state_from_db(video):
+    long_prompt = "x" * 300
+    SceneModel.upsert_many(video["video_id"], [{"scene_number": 4, "visual_description": long_prompt}])
+    _checkpoint(video["video_id"])
+    state = build_state_from_db(video["video_id"], video["user_id"])
+
+    assert state["temp:next_scene_to_generate"] == 3
+    assert state["temp:total_scenes"] == 4
+    assert state["temp:current_batch_number"] == 2
+    assert state["temp:session_cost"] == 1.5
+    assert state["user:name"] == "Ada"
+    summary = state["temp:scenes_summary"]
+    assert [s["scene_number"] for s in summary] == [1, 2, 3, 4]
+    assert summary[3]["short_prompt"] == long_prompt[:120]
+
+
+def test_all_scenes_approved_points_past_the_end(video):
+    scenes = SceneModel.list_for_video(video["video_id"])
+    ImageModel.bulk_create(video["video_id"], [
+        {"scene_id": s["scene_id"], "image_path": "/img/x.png", "status": "approved"} for s in scenes[2:]
+    ])
+    assert get_resume_snapshot(video["video_id"], video["user_id"])["next_scene"] == 5
+
+
+def test_missing_video_raises(resume_db):
+    assert get_resume_snapshot("no-such-video", "anyone") is None
+    with pytest.raises(ValueError):
+        build_state_from_db("no-such-video", "anyone")
+
+
+def test_missing_user_still_rebuilds(video):
+    state = build_state_from_db(video["video_id"], "no-such-user")
+
+    assert state["user:verified_user_id"] is None
+    assert state["user:email"] is None
+    assert state["user:total_lifetime_cost"] == 0.0
+    assert state["temp:total_scenes"] == 4
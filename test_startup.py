@@ -0,0 +1,76 @@
+"""
+Startup stays cheap: importing main loads no agent/model modules, and nothing
+touches the disk until it is first used.
+"""
+
+import os
+import subprocess
+import sys
+
+from config import FileContextStore
+from database.connection import DatabaseConnection
+
+
+def test_import_main_defers_agent_stack(tmp_path):
+    check = (
+        "import sys, main\n"
+        "heavy = sorted(m for m in sys.modules if m.split('.')[0] in ('google', 'agents'))\n"
+        "assert not heavy, heavy\n"
+    )
+    env = dict(os.environ, DATABASE_PATH=str(tmp_path / "startup.db"), HOME=str(tmp_path))
+    result = subprocess.run(
+        [sys.executable, "-c", check], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / "startup.db").exists()
+    assert not (tmp_path / ".continuity").exists()
+
+
+def test_schema_is_created_on_first_checkout(tmp_path):
+    path = tmp_path / "lazy.db"
+    db = DatabaseConnection(str(path), pool_size=1)
+    assert not path.exists()
+
+    with db.get_connection() as conn:
+        tables = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    db.close_all()
+    assert {"users", "videos", "scenes"} <= tables
+
+
+def test_context_directory_created_on_first_write(tmp_path):
+    store = FileContextStore(tmp_path / ".continuity")
+    assert store.get("cli", "current_user_id") is None
+    assert not (tmp_path / ".continuity").exists()
+
+    store.set("cli", "current_user_id", "u1")
+    assert store.get("cli", "current_user_id") == "u1"
+
+
+def test_dotenv_settings_apply_before_modules_read_them(tmp_path):
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / ".env").write_text(f"DATABASE_PATH={tmp_path / 'from_env.db'}\n")
+    check = (
+        "import sys\n"
+        f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+        "import main\n"
+        "from database.connection import db_connection\n"
+        "print(db_connection.db_path)\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_PATH"}
+    env["HOME"] = str(tmp_path)
+    result = subprocess.run([sys.executable, "-c", check], cwd=workdir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == str(tmp_path / "from_env.db")
+
+
+def test_context_keys_stay_inside_the_directory(tmp_path):
+    store = FileContextStore(tmp_path / ".continuity")
+    store.set("a/../../escape", "current_user_id", "u1")
+    store.set("web_tab-1", "current_user_id", "u2")
+
+    assert not (tmp_path / "escape").exists()
+    assert all(path.parent == tmp_path / ".continuity" for path in (tmp_path / ".continuity").iterdir())
+    assert store.get("a/../../escape", "current_user_id") == "u1"
+    assert (tmp_path / ".continuity" / "current_user_id.web_tab-1").read_text() == "u2"
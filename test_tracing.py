@@ -0,0 +1,117 @@
+# test_tracing.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from database import models
+from database.async_models import AsyncUserModel
+from database.connection import DatabaseConnection
+from database.instrumentation import add_statement_hook, remove_statement_hook
+from database.models import UserModel, user_cache
+from services.tracing import AgentTracer, TracedSessionService, Tracer, current_span, read_turns, summarize_turns
+
+
+class FakeSessionService:
+    async def get_session(self, app_name, user_id, session_id):
+        await asyncio.sleep(0)
+        return SimpleNamespace(id=session_id, state={})
+
+
+@pytest.fixture
+def traced(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "trace.db"), pool_size=2, instrument=True)
+    monkeypatch.setattr(models, "db_connection", db)
+    user_cache.clear()
+    tracer = Tracer(str(tmp_path / "trace.jsonl"))
+    add_statement_hook(tracer.on_statement)
+    yield tracer
+    remove_statement_hook(tracer.on_statement)
+    tracer.close()
+    user_cache.clear()
+    db.close_all()
+
+
+def _records(tracer):
+    tracer.close()
+    with open(tracer.path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_turn_spans_nest_and_summarize(traced):
+    UserModel.create("t@example.com")
+    sessions = TracedSessionService(FakeSessionService(), traced)
+    agents = AgentTracer(traced)
+    tool = SimpleNamespace(name="check_and_restore_user_tool")
+    tool_context = SimpleNamespace(agent_name="root_agent", function_call_id="call-1")
+    callback_context = SimpleNamespace(invocation_id="inv-1", agent_name="root_agent")
+
+    async def turn():
+        with traced.turn("s1"):
+            await sessions.get_session(app_name="continuity", user_id="s1", session_id="s1")
+            agents.before_model(callback_context, SimpleNamespace(model="gemini-2.0-flash"))
+            agents.after_model(callback_context, SimpleNamespace(usage_metadata=None))
+            agents.before_tool(tool, {}, tool_context)
+            user = await AsyncUserModel.find_by_email("t@example.com")
+            agents.after_tool(tool, {}, tool_context, {"success": user is not None})
+
+    asyncio.run(turn())
+    records = _records(traced)
+    spans = {r["kind"]: r for r in records if r["type"] == "span"}
+    root = spans["turn"]
+    assert spans["session"]["parent_id"] == root["span_id"]
+    assert spans["model"]["attrs"]["model"] == "gemini-2.0-flash"
+    # The DB statement ran on the executor thread but still nests under the tool
+    assert spans["db"]["parent_id"] == spans["tool"]["span_id"]
+    assert spans["tool"]["attrs"]["success"] is True
+    assert {r["trace_id"] for r in records} == {root["trace_id"]}
+
+    [summary] = read_turns(traced.path)
+    assert summary["model"]["count"] == 1 and summary["session"]["count"] == 1
+    assert summary["db"]["count"] >= 1
+    assert summary["tools"]["check_and_restore_user_tool"]["count"] == 1
+    assert summarize_turns([summary])["turns"] == 1
+
+
+def test_statements_outside_a_turn_are_not_traced(traced):
+    UserModel.create("bg@example.com")
+    with traced.turn("s1"):
+        pass
+    assert [r["kind"] for r in _records(traced) if r["type"] == "span"] == ["turn"]
+
+
+def test_disabled_tracer_is_a_no_op(tmp_path):
+    tracer = Tracer(None)
+    with tracer.turn("s1") as turn, tracer.span("x", "tool") as span:
+        assert turn is None and span is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tool_error_closes_its_span(traced):
+    agents = AgentTracer(traced)
+    tool = SimpleNamespace(name="select_video_tool")
+    tool_context = SimpleNamespace(agent_name="root_agent", function_call_id="call-1")
+
+    with traced.turn("s1") as turn:
+        agents.before_tool(tool, {}, tool_context)
+        agents.on_tool_error(tool, {}, tool_context, RuntimeError("boom"))
+        assert current_span.get() is turn
+    spans = [r for r in _records(traced) if r["type"] == "span"]
+    assert [(r["kind"], r["error"]) for r in spans] == [("tool", "RuntimeError('boom')"), ("turn", None)]
+
+
+def test_span_closed_in_another_context_does_not_raise(traced):
+    async def stream():
+        with traced.span("stream", "session"):
+            yield "a"
+            yield "b"
+
+    async def main():
+        agen = stream()
+        # The consumer task stops early; the generator is closed later from another task
+        await asyncio.create_task(agen.__anext__())
+        await asyncio.create_task(agen.aclose())
+
+    asyncio.run(main())
+    assert current_span.get() is None
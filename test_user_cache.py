@@ -0,0 +1,51 @@
+# test_user_cache.py
+import pytest
+
+from database import models
+from database.connection import DatabaseConnection
+from database.models import UserModel, user_cache
+
+
+@pytest.fixture
+def user_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "users.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    user_cache.clear()
+    yield db
+    user_cache.clear()
+    db.close_all()
+
+
+def test_lookups_hit_cache_after_first_read(user_db):
+    user = UserModel.create("a@example.com", user_name="A")
+    UserModel.find_by_id(user["user_id"])
+    before = user_db.pool_stats()["checkouts"]
+
+    assert UserModel.find_by_id(user["user_id"])["email"] == "a@example.com"
+    assert UserModel.find_by_email("a@example.com")["user_id"] == user["user_id"]
+    assert user_db.pool_stats()["checkouts"] == before
+
+
+def test_misses_are_not_cached(user_db):
+    assert UserModel.find_by_email("new@example.com") is None
+    UserModel.create("new@example.com")
+    assert UserModel.find_by_email("new@example.com") is not None
+
+
+def test_updates_invalidate_both_keys(user_db):
+    user = UserModel.create("a@example.com")
+    UserModel.find_by_email("a@example.com")
+
+    UserModel.add_cost(user["user_id"], 2.5)
+    assert UserModel.find_by_email("a@example.com")["current_month_cost"] == 2.5
+    UserModel.set_plan_tier(user["user_id"], "pro")
+    assert UserModel.find_by_id(user["user_id"])["plan_tier"] == "pro"
+    assert UserModel.find_by_email("a@example.com")["plan_tier"] == "pro"
+
+
+def test_cached_rows_are_immutable(user_db):
+    user = UserModel.create("a@example.com")
+    row = UserModel.find_by_id(user["user_id"])
+    with pytest.raises(TypeError):
+        row["email"] = "changed"
+    assert UserModel.find_by_id(user["user_id"]) is row
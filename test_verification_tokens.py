@@ -0,0 +1,70 @@
+# test_verification_tokens.py
+import asyncio
+import time
+
+import pytest
+
+from database import models
+from database.async_models import AsyncVerificationTokenModel
+from database.connection import DatabaseConnection
+from database.maintenance import start_token_sweeper
+from database.models import VerificationTokenModel
+
+
+@pytest.fixture
+def token_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "tokens.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    yield db
+    db.close_all()
+
+
+def _count(db):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM verification_tokens").fetchone()[0]
+
+
+def test_token_verifies_once(token_db):
+    token = VerificationTokenModel.create_token("user@example.com")
+    assert VerificationTokenModel.verify_token(token) == "user@example.com"
+    assert VerificationTokenModel.verify_token(token) is None
+
+
+def test_expired_token_is_rejected(token_db):
+    token = VerificationTokenModel.create_token("user@example.com")
+    with token_db.get_connection() as conn:
+        conn.execute("UPDATE verification_tokens SET expires_at = 1 WHERE token = ?", (token,))
+    assert VerificationTokenModel.verify_token(token) is None
+
+
+def test_sweep_removes_expired_and_consumed_in_chunks(token_db):
+    live = VerificationTokenModel.create_token("live@example.com")
+    with token_db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO verification_tokens (token, email, expires_at) VALUES (?, ?, 1)",
+            [(f"old-{i}", "old@example.com") for i in range(25)],
+        )
+
+    assert VerificationTokenModel.delete_expired_chunk(limit=10) == 10
+    assert asyncio.run(AsyncVerificationTokenModel.cleanup_expired_tokens(chunk_size=4)) == 15
+
+    # A consumed token expires "now" - it goes on the next sweep
+    consumed = VerificationTokenModel.create_token("used@example.com")
+    VerificationTokenModel.verify_token(consumed)
+    assert VerificationTokenModel.delete_expired_chunk(now=int(time.time()) + 1) == 1
+    with token_db.get_connection() as conn:
+        remaining = [row["token"] for row in conn.execute("SELECT token FROM verification_tokens")]
+    assert remaining == [live]
+
+
+def test_sweeper_is_quiet_when_nothing_expired(token_db, capsys):
+    VerificationTokenModel.create_token("live@example.com")
+    capsys.readouterr()
+
+    async def one_sweep():
+        sweeper = start_token_sweeper(interval_seconds=60)
+        await asyncio.sleep(0.2)
+        sweeper.cancel()
+
+    asyncio.run(one_sweep())
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,93 @@
+# test_video_counts.py
+import random
+import uuid
+
+import pytest
+
+from database import models
+from database.connection import DatabaseConnection
+from database.models import UserModel, VideoModel, decode_video_cursor
+
+RECOUNT_SQL = """
+    SELECT v.video_id, v.scene_count, v.approved_image_count,
+           (SELECT COUNT(*) FROM scenes s WHERE s.video_id = v.video_id) AS real_scenes,
+           (SELECT COUNT(*) FROM images i JOIN scenes s ON i.scene_id = s.scene_id
+            WHERE s.video_id = v.video_id AND i.status = 'approved') AS real_approved
+    FROM videos v
+"""
+
+
+@pytest.fixture
+def video_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "videos.db"), pool_size=2)
+    monkeypatch.setattr(models, "db_connection", db)
+    yield db
+    db.close_all()
+
+
+def test_counts_follow_scene_and_image_changes(video_db):
+    rng = random.Random(7)
+    user = UserModel.create("counts@example.com")
+    videos = [VideoModel.create(user["user_id"], f"Video {i}")["video_id"] for i in range(4)]
+    scenes, images = [], []
+
+    with video_db.get_connection() as conn:
+        for step in range(400):
+            op = rng.random()
+            if op < 0.3 or not scenes:
+                scene_id = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO scenes (scene_id, video_id, scene_number, visual_description) VALUES (?, ?, ?, 'x')",
+                    (scene_id, rng.choice(videos), step),
+                )
+                scenes.append(scene_id)
+            elif op < 0.6:
+                image_id = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO images (image_id, scene_id, image_path, status) VALUES (?, ?, 'p', ?)",
+                    (image_id, rng.choice(scenes), rng.choice(["pending", "approved"])),
+                )
+                images.append(image_id)
+            elif op < 0.8 and images:
+                conn.execute(
+                    "UPDATE images SET status = ? WHERE image_id = ?",
+                    (rng.choice(["pending", "approved", "rejected"]), rng.choice(images)),
+                )
+            elif op < 0.87 and images:
+                image_id = images.pop(rng.randrange(len(images)))
+                conn.execute("DELETE FROM images WHERE image_id = ?", (image_id,))
+            elif op < 0.94:
+                conn.execute(
+                    "UPDATE scenes SET video_id = ? WHERE scene_id = ?",
+                    (rng.choice(videos), rng.choice(scenes)),
+                )
+            else:
+                scene_id = scenes.pop(rng.randrange(len(scenes)))
+                conn.execute("DELETE FROM scenes WHERE scene_id = ?", (scene_id,))
+
+        for row in conn.execute(RECOUNT_SQL):
+            assert row["scene_count"] == row["real_scenes"], dict(row)
+            assert row["approved_image_count"] == row["real_approved"], dict(row)
+
+
+def test_keyset_pages_cover_every_video_once(video_db):
+    user = UserModel.create("pages@example.com")
+    created = {VideoModel.create(user["user_id"], f"Video {i}")["video_id"] for i in range(23)}
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = VideoModel.list_page(user["user_id"], limit=5, cursor=cursor)
+        seen.extend(video["video_id"] for video in page["videos"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 5
+    assert len(seen) == len(set(seen)) == 23
+    assert set(seen) == created
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_video_cursor("not-a-cursor")
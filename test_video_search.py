@@ -0,0 +1,85 @@
+# test_video_search.py
+import uuid
+
+import pytest
+
+from database import models
+from database.connection import DatabaseConnection
+from database.models import UserModel, VideoModel
+from database.search import build_match_query, check_search_index, rebuild_search_index
+
+
+@pytest.fixture
+def search_db(tmp_path, monkeypatch):
+    db = DatabaseConnection(str(tmp_path / "search.db"), pool_size=1)
+    monkeypatch.setattr(models, "db_connection", db)
+    yield db
+    db.close_all()
+
+
+def _titles(user_id, query):
+    return [match["title"] for match in VideoModel.search_for_user(user_id, query)]
+
+
+def test_match_query_is_sanitized():
+    assert build_match_query('Robot "Quest') == '"robot" "quest"*'
+    assert build_match_query("  -- ; ") is None
+
+
+def test_search_is_scoped_to_user_and_follows_edits(search_db):
+    user = UserModel.create("me@example.com")
+    other = UserModel.create("them@example.com")
+    quest = VideoModel.create(user["user_id"], "Robot Quest")
+    VideoModel.create(user["user_id"], "Dragon Tale")
+    VideoModel.create(other["user_id"], "Robot Wars")
+
+    assert _titles(user["user_id"], "robot que") == ["Robot Quest"]
+
+    with search_db.get_connection() as conn:
+        conn.execute("UPDATE videos SET title = 'Space Quest' WHERE video_id = ?", (quest["video_id"],))
+        conn.execute(
+            "INSERT INTO scenes (scene_id, video_id, scene_number, visual_description) VALUES (?, ?, 1, ?)",
+            (str(uuid.uuid4()), quest["video_id"], "A robot waves from the launch pad"),
+        )
+    assert _titles(user["user_id"], "space") == ["Space Quest"]
+    matches = VideoModel.search_for_user(user["user_id"], "launch pad")
+    assert [(m["title"], m["matched_scene"]) for m in matches] == [("Space Quest", 1)]
+
+    with search_db.get_connection() as conn:
+        conn.execute("DELETE FROM scenes WHERE video_id = ?", (quest["video_id"],))
+        conn.execute("DELETE FROM videos WHERE video_id = ?", (quest["video_id"],))
+        assert check_search_index(conn)
+    assert _titles(user["user_id"], "space") == []
+
+
+def test_index_survives_vacuum(search_db):
+    user = UserModel.create("me@example.com")
+    videos = [VideoModel.create(user["user_id"], f"Video number {i}") for i in range(20)]
+    with search_db.get_connection() as conn:
+        conn.executemany("DELETE FROM videos WHERE video_id = ?", [(v["video_id"],) for v in videos[:10]])
+    with search_db.get_connection() as conn:
+        conn.execute("VACUUM")                  # May renumber rowids; search keys stay put
+        assert check_search_index(conn)
+    assert sorted(_titles(user["user_id"], "number 15")) == ["Video number 15"]
+
+    VideoModel.create(user["user_id"], "Video number 20")
+    with search_db.get_connection() as conn:
+        rebuild_search_index(conn)
+        assert check_search_index(conn)
+    assert _titles(user["user_id"], "number 20") == ["Video number 20"]
+
+
+def test_other_users_scenes_are_not_matched(search_db):
+    user = UserModel.create("me@example.com")
+    other = UserModel.create("them@example.com")
+    mine = VideoModel.create(user["user_id"], "Mine")
+    theirs = VideoModel.create(other["user_id"], "Theirs")
+    with search_db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO scenes (scene_id, video_id, scene_number, visual_description) VALUES (?, ?, 1, ?)",
+            [(str(uuid.uuid4()), mine["video_id"], "a lighthouse at dusk"),
+             (str(uuid.uuid4()), theirs["video_id"], "a lighthouse at dawn")],
+        )
+    matches = VideoModel.search_for_user(user["user_id"], "lighthouse")
+    assert [m["title"] for m in matches] == ["Mine"]
+    assert VideoModel.search_for_user(other["user_id"], "dusk") == []
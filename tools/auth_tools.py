@@ -8,7 +8,7 @@ def validate_email_format(email: str) -> bool:
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
-def check_and_restore_user_tool(tool_context: ToolContext, email: str) -> Dict[str, Any]:
+async def check_and_restore_user_tool(tool_context: ToolContext, email: str) -> Dict[str, Any]:
     """
     Check if user exists in DB and restore their identity to state.
     
@@ -20,7 +20,7 @@ def check_and_restore_user_tool(tool_context: ToolContext, email: str) -> Dict[s
     Returns:
         dict with status (existing_user, new_user, or invalid_email)
     """
-    from database.models import UserModel
+    from database.async_models import AsyncUserModel
     
     # Validate email format
     if not validate_email_format(email):
@@ -30,7 +30,7 @@ def check_and_restore_user_tool(tool_context: ToolContext, email: str) -> Dict[s
         }
     
     # Check if user exists in DB
-    user = UserModel.find_by_email(email)
+    user = await AsyncUserModel.find_by_email(email)
     
     if user:
         # EXISTING USER - restore to state
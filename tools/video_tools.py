@@ -1,15 +1,22 @@
 from google.adk.tools import ToolContext
 from typing import Dict, Any, List
-from config import save_current_video
+from config import ACTIVE_VIDEO_KEY, clear_current_video, save_current_video
 
-def list_user_videos_tool(tool_context: ToolContext) -> Dict[str, Any]:
+MENU_CURSOR_KEY = "menu_next_cursor"      # Where "more videos" continues from (cleared once a video is picked)
+
+async def list_user_videos_tool(tool_context: ToolContext, cursor: str = "", limit: int = 10) -> Dict[str, Any]:
     """
-    List all videos for user.
+    List the user's videos, most recently worked on first, one page at a time.
+    
+    Args:
+        cursor: next_cursor from the previous call, or "" for the first page
+        limit: Videos per page (max 50)
     
     Returns:
-        dict with list of user's videos
+        dict with a page of the user's videos and next_cursor ("" on the last page)
     """
-    from database.connection import db_connection
+    from database.async_models import AsyncVideoModel
+    from database.prefetch import warm_menu_page
     
     user_id = tool_context.state.get("user:verified_user_id")
     
@@ -19,40 +26,89 @@ def list_user_videos_tool(tool_context: ToolContext) -> Dict[str, Any]:
             "error": "User does not exist"
         }
     
-    # Get user's videos from DB
-    with db_connection.get_connection() as conn:
-        rows = conn.execute(
-            """
-            SELECT video_id, title, status, created_at,
-                   (SELECT COUNT(*) FROM scenes WHERE scenes.video_id = videos.video_id) as scene_count
-            FROM videos
-            WHERE user_id = ?
-            ORDER BY updated_at DESC
-            LIMIT 10
-            """,
-            (user_id,)
-        ).fetchall()
-    
-    videos = [dict(row) for row in rows]
+    limit = max(1, min(int(limit), 50))
+    # The first page is usually already loaded by the login prefetch
+    page = await warm_menu_page(user_id, limit) if not cursor else None
+    
+    # Otherwise get one page of the user's videos from DB
+    if page is None:
+        try:
+            page = await AsyncVideoModel.list_page(user_id, limit=limit, cursor=cursor or None)
+        except ValueError:
+            return {
+                "success": False,
+                "error": "Invalid cursor - list again from the first page"
+            }
+    videos = page["videos"]
     
     if not videos:
         return {
             "success": True,
             "videos": [],
-            "message": "You don't have any videos yet."
+            "next_cursor": "",
+            "message": "You don't have any videos yet." if not cursor else "No more videos."
+        }
+    
+    return {
+        "success": True,
+        "videos": [video.to_dict() for video in videos],
+        "count": len(videos),
+        "next_cursor": page["next_cursor"] or "",
+        "has_more": page["next_cursor"] is not None
+    }
+
+
+async def search_user_videos_tool(tool_context: ToolContext, query: str, limit: int = 5) -> Dict[str, Any]:
+    """
+    Find the user's videos by name or content (title, script, scene descriptions).
+    Use this to resolve "continue <video name>" instead of scanning the list.
+    
+    Args:
+        query: Words the user used for the video, e.g. "robot quest"
+        limit: Maximum matches to return (max 20)
+    
+    Returns:
+        dict with ranked matches (best first), each with video_id and title
+    """
+    from database.async_models import AsyncVideoModel
+    
+    user_id = tool_context.state.get("user:verified_user_id")
+    
+    if not user_id:
+        return {
+            "success": False,
+            "error": "User does not exist"
+        }
+    
+    matches = await AsyncVideoModel.search_for_user(user_id, query, limit=max(1, min(int(limit), 20)))
+    
+    if not matches:
+        return {
+            "success": True,
+            "matches": [],
+            "message": f"No videos match '{query}'."
         }
     
     return {
         "success": True,
-        "videos": videos,
-        "count": len(videos)
+        "matches": [
+            {
+                "video_id": match["video_id"],
+                "title": match["title"],
+                "status": match["status"],
+                "matched_scene": match["matched_scene"],
+                "snippet": match["snippet"],
+            }
+            for match in matches
+        ],
+        "count": len(matches)
     }
 
 
-def select_video_tool(tool_context: ToolContext, video_id: str) -> Dict[str, Any]:
+async def select_video_tool(tool_context: ToolContext, video_id: str) -> Dict[str, Any]:
     """
     Select a video to work on.
-    Sets temp:selected_video_id in state.
+    Sets temp:selected_video_id and active_video_id in state.
     
     Args:
         video_id: The video to work on
@@ -60,16 +116,13 @@ def select_video_tool(tool_context: ToolContext, video_id: str) -> Dict[str, Any
     Returns:
         dict with video info
     """
-    from database.connection import db_connection
+    from database.async_models import AsyncVideoModel
+    from database.prefetch import warm_video
     
     user_id = tool_context.state.get("user:verified_user_id")
     
-    # Verify video belongs to user
-    with db_connection.get_connection() as conn:
-        video = conn.execute(
-            "SELECT * FROM videos WHERE video_id = ? AND user_id = ?",
-            (video_id, user_id)
-        ).fetchone()
+    # Verify video belongs to user (the video being resumed is usually prefetched)
+    video = await warm_video(video_id, user_id) or await AsyncVideoModel.get_for_user(video_id, user_id)
     
     if not video:
         return {
@@ -77,8 +130,11 @@ def select_video_tool(tool_context: ToolContext, video_id: str) -> Dict[str, Any
             "error": "Video not found or doesn't belong to you"
         }
     
-    # Set selected video in state
+    # Set selected video in state (the menu is done with)
     tool_context.state["temp:selected_video_id"] = video_id
+    tool_context.state[ACTIVE_VIDEO_KEY] = video_id
+    if tool_context.state.get(MENU_CURSOR_KEY):
+        tool_context.state[MENU_CURSOR_KEY] = None
     
     # UPDATE FILE!
     save_current_video(video_id)
@@ -92,7 +148,7 @@ def select_video_tool(tool_context: ToolContext, video_id: str) -> Dict[str, Any
     }
 
 
-def create_new_video_tool(tool_context: ToolContext, title: str) -> Dict[str, Any]:
+async def create_new_video_tool(tool_context: ToolContext, title: str) -> Dict[str, Any]:
     """
     Create a new video for the user.
     
@@ -102,8 +158,7 @@ def create_new_video_tool(tool_context: ToolContext, title: str) -> Dict[str, An
     Returns:
         dict with new video info
     """
-    import uuid
-    from database.connection import db_connection
+    from database.async_models import AsyncVideoModel
     
     user_id = tool_context.state.get("user:verified_user_id")
     
@@ -114,19 +169,14 @@ def create_new_video_tool(tool_context: ToolContext, title: str) -> Dict[str, An
         }
     
     # Create video in DB
-    video_id = str(uuid.uuid4())
-    
-    with db_connection.get_connection() as conn:
-        conn.execute(
-            """
-            INSERT INTO videos (video_id, user_id, title, status)
-            VALUES (?, ?, ?, 'in_progress')
-            """,
-            (video_id, user_id, title)
-        )
-    
-    # Set as selected video
+    video = await AsyncVideoModel.create(user_id, title)
+    video_id = video["video_id"]
+    
+    # Set as selected video (the menu is done with)
     tool_context.state["temp:selected_video_id"] = video_id
+    tool_context.state[ACTIVE_VIDEO_KEY] = video_id
+    if tool_context.state.get(MENU_CURSOR_KEY):
+        tool_context.state[MENU_CURSOR_KEY] = None
     
     # UPDATE FILE!
     save_current_video(video_id)
@@ -136,4 +186,27 @@ def create_new_video_tool(tool_context: ToolContext, title: str) -> Dict[str, An
         "video_id": video_id,
         "title": title,
         "message": f"Created new video: {title}"
-    }
\ No newline at end of file
+    }
+
+
+async def leave_video_tool(tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Stop working on the selected video and go back to the menu.
+    
+    Returns:
+        dict with the video that was left
+    """
+    video_id = tool_context.state.get(ACTIVE_VIDEO_KEY)
+    
+    # Clear the selection (a None value removes the key from session state)
+    tool_context.state[ACTIVE_VIDEO_KEY] = None
+    tool_context.state["temp:selected_video_id"] = None
+    
+    # UPDATE FILE!
+    clear_current_video()
+    
+    return {
+        "success": True,
+        "video_id": video_id,
+        "message": "Back to the menu."
+    }